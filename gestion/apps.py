@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class GestionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gestion'
+
+    def ready(self):
+        # Registrar receptores de señales (invalidación de cache del catálogo)
+        from gestion import signals  # noqa: F401
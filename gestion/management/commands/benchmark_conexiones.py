@@ -0,0 +1,91 @@
+import copy
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la latencia de un request mínimo (tomar conexión + SELECT 1 + liberarla) "
+        "abriendo una conexión nueva cada vez vs. con el pool de psycopg (PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests por thread y modo")
+        parser.add_argument("--threads", type=int, default=4)
+
+    def _wrapper(self, modo):
+        base = connections["default"].settings_dict
+        settings_dict = copy.deepcopy(base)
+        settings_dict["CONN_MAX_AGE"] = 0
+        if modo == "pool":
+            settings_dict["OPTIONS"]["pool"] = base["OPTIONS"].get("pool") or True
+        else:
+            settings_dict["OPTIONS"].pop("pool", None)
+        return load_backend(settings_dict["ENGINE"]).DatabaseWrapper(settings_dict, alias=f"benchmark_{modo}")
+
+    def _medir(self, modo, requests, threads):
+        tiempos, errores = [], []
+        lock = threading.Lock()
+
+        def trabajar():
+            conexion = self._wrapper(modo)
+            propios = []
+            try:
+                for _ in range(requests):
+                    inicio = time.perf_counter()
+                    conexion.ensure_connection()
+                    with conexion.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                        cursor.fetchone()
+                    # Fin del request: sin pool se cierra, con pool vuelve al pool
+                    conexion.close()
+                    propios.append((time.perf_counter() - inicio) * 1000)
+            except Exception as exc:
+                errores.append(exc)
+            with lock:
+                tiempos.extend(propios)
+
+        if modo == "pool":
+            # El pool se abre al arrancar el worker; no es parte de la latencia de un request
+            pool = self._wrapper(modo).pool
+            pool.open()
+            pool.wait()
+        hilos = [threading.Thread(target=trabajar) for _ in range(threads)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        total = time.perf_counter() - inicio
+        if modo == "pool":
+            self._wrapper(modo).close_pool()
+        if errores:
+            raise CommandError(f"{modo}: {errores[0]}")
+        return tiempos, total
+
+    def handle(self, *args, **options):
+        if connections["default"].vendor != "postgresql":
+            raise CommandError("El benchmark requiere PostgreSQL (el pool es de psycopg).")
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            raise CommandError("psycopg-pool no está instalado (pip install psycopg-pool).")
+
+        self.stdout.write(f"{options['threads']} threads x {options['requests']} requests por modo")
+        for modo in ("sin_pool", "pool"):
+            tiempos, total = self._medir(modo, options["requests"], options["threads"])
+            self.stdout.write(
+                f"{modo:>9}: p50 {statistics.median(tiempos):7.2f} ms  p95 {_percentil(tiempos, 95):7.2f} ms  "
+                f"p99 {_percentil(tiempos, 99):7.2f} ms  max {max(tiempos):7.2f} ms  "
+                f"{len(tiempos) / total:,.0f} req/s"
+            )
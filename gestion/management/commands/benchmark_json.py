@@ -0,0 +1,75 @@
+import time
+from decimal import Decimal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from gestion.models import Categoria, Cliente, Producto, Sucursal, Venta
+from gestion.renderizadores import ORJSONRenderer
+from gestion.serializadores.producto import ProductoSerializer
+from gestion.serializadores.venta import VentaSerializer
+
+
+def _ventas(n):
+    """Ventas en memoria (sin BD) con sus relaciones ya asignadas"""
+    sucursal = Sucursal(id=1, nombre="Central")
+    ahora = timezone.now()
+    ventas = []
+    for i in range(n):
+        cliente = Cliente(id=i + 1, nombre=f"Cliente {i}", apellido="Pérez", email=f"c{i}@demo.com")
+        ventas.append(Venta(
+            id=i + 1, cliente=cliente, sucursal=sucursal,
+            total=Decimal("1234.50") + i, tipo_pago="contado", canal_venta="tienda",
+            estado="completado", estado_pago="pagado", fecha=ahora - timedelta(minutes=i),
+        ))
+    return ventas
+
+
+def _productos(n):
+    """Productos en memoria con el rango de precios ya anotado"""
+    categoria = Categoria(id=1, nombre="Ropa")
+    productos = []
+    for i in range(n):
+        p = Producto(
+            id=i + 1, categoria=categoria, nombre=f"Polera {i}", descripcion="Algodón 100%",
+            codigo_base=f"POL-{i}", precio_base=Decimal("99.90"), estado="activo",
+        )
+        p.variantes_precio_min = Decimal("89.90")
+        p.variantes_precio_max = Decimal("129.90")
+        productos.append(p)
+    return productos
+
+
+class Command(BaseCommand):
+    help = "Compara el tiempo de render JSON (DRF vs orjson) de listados de ventas y productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=10000)
+        parser.add_argument("--repeticiones", type=int, default=5)
+
+    def handle(self, *args, **options):
+        filas = options["filas"]
+        repeticiones = options["repeticiones"]
+        payloads = {
+            "ventas": VentaSerializer(_ventas(filas), many=True).data,
+            "productos": ProductoSerializer(_productos(filas), many=True).data,
+        }
+        renderers = {"drf": JSONRenderer(), "orjson": ORJSONRenderer()}
+
+        self.stdout.write(f"{filas} filas, mejor de {repeticiones} repeticiones")
+        for nombre, data in payloads.items():
+            tiempos = {}
+            for clave, renderer in renderers.items():
+                mejor = None
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    contenido = renderer.render(data)
+                    duracion = time.perf_counter() - inicio
+                    mejor = duracion if mejor is None else min(mejor, duracion)
+                tiempos[clave] = mejor
+                self.stdout.write(
+                    f"  {nombre:<10} {clave:<7} {mejor * 1000:8.2f} ms  {len(contenido) / 1024:8.1f} KiB"
+                )
+            self.stdout.write(f"  {nombre:<10} speedup x{tiempos['drf'] / tiempos['orjson']:.1f}")
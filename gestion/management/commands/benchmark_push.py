@@ -0,0 +1,84 @@
+import math
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from gestion.models import Rol, Usuario
+from gestion.services import push_notifications
+from gestion.services.push_local import TransporteLocal
+
+
+def _crear_usuarios(n):
+    """Usuarios sintéticos con tokens únicos (bulk_create en lotes)"""
+    rol = Rol.objects.create(nombre="benchmark")
+    Usuario.objects.bulk_create(
+        (
+            Usuario(nombre=f"Bench {i}", email=f"bench{i}@demo.com", password_hash="x", rol=rol,
+                    fcm_token=f"bench-{i:08d}")
+            for i in range(n)
+        ),
+        batch_size=5000,
+    )
+    return Usuario.objects.filter(rol=rol)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide send_push_to_usuarios contra el transporte local (sin red): throughput, "
+        "lotes y manejo de tokens inválidos y errores transitorios. Los usuarios se crean "
+        "en una BD de prueba temporal (test_<NAME>, requiere permiso para crear bases) y "
+        "se leen en streaming como en un envío real."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=100000)
+        parser.add_argument("--latencia-ms", type=float, default=50, help="Latencia por llamada a FCM")
+        parser.add_argument("--latencia-token-ms", type=float, default=0.2, help="Latencia adicional por token")
+        parser.add_argument("--tasa-invalidos", type=float, default=0.02)
+        parser.add_argument("--tasa-errores", type=float, default=0.001)
+        parser.add_argument("--semilla", type=int, default=1)
+
+    def handle(self, *args, **options):
+        nombre_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._medir(options)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+    def _medir(self, options):
+        usuarios = _crear_usuarios(options["usuarios"])
+        transporte = TransporteLocal(
+            latencia_ms=options["latencia_ms"],
+            latencia_token_ms=options["latencia_token_ms"],
+            tasa_invalidos=options["tasa_invalidos"],
+            tasa_errores=options["tasa_errores"],
+            semilla=options["semilla"],
+        )
+
+        anterior = push_notifications.obtener_transporte()
+        push_notifications.configurar_transporte(transporte)
+        try:
+            inicio = time.perf_counter()
+            # Con el QuerySet los tokens se leen con iterar_tokens (DISTINCT + iterator)
+            enviados, fallidos = push_notifications.send_push_to_usuarios(usuarios, "Benchmark", "Mensaje de prueba")
+            segundos = time.perf_counter() - inicio
+        finally:
+            push_notifications.configurar_transporte(anterior)
+
+        total = options["usuarios"]
+        # Filas que limpiar_tokens_invalidos dejó sin token (todas lo tenían al empezar)
+        podados = usuarios.filter(fcm_token__isnull=True).count()
+        lotes = math.ceil(total / push_notifications.TAMANO_LOTE_FCM)
+        self.stdout.write(f"Usuarios: {total}  workers: {push_notifications.cantidad_workers()}")
+        self.stdout.write(f"Lotes: {transporte.llamadas} (esperados {lotes}), tokens enviados: {transporte.tokens}")
+        self.stdout.write(f"Tiempo: {segundos:.2f} s  throughput: {total / segundos:,.0f} notificaciones/s")
+        self.stdout.write(
+            f"Éxitos: {enviados}  fallos: {fallidos} "
+            f"(tokens eliminados de la BD: {podados}, transitorios: {fallidos - podados})"
+        )
+        if transporte.tokens != total or enviados + fallidos != total:
+            self.stderr.write(self.style.ERROR("Hay notificaciones sin resultado"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Todas las notificaciones tienen resultado"))
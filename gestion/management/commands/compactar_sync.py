@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from gestion.services.sync import compactar
+
+
+class Command(BaseCommand):
+    help = "Elimina del registro de /sync/ los cambios superados por uno posterior del mismo objeto."
+
+    def handle(self, *args, **options):
+        eliminados = compactar()
+        self.stdout.write(f"{eliminados} registros de sync compactados")
@@ -0,0 +1,19 @@
+import glob
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gestion.services.imagenes import CARPETA_PRODUCTOS, generar_miniaturas
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas que falten para las imágenes almacenadas por contenido."
+
+    def handle(self, *args, **options):
+        patron = os.path.join(settings.MEDIA_ROOT, CARPETA_PRODUCTOS, "??", "*.*")
+        originales = [r for r in glob.glob(patron) if "_w" not in os.path.basename(r)]
+        total = 0
+        for ruta in originales:
+            total += generar_miniaturas(ruta)
+        self.stdout.write(f"{len(originales)} imágenes revisadas, {total} miniaturas creadas")
@@ -0,0 +1,32 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.services.importacion import ErrorImportacion, importar_catalogo, leer_csv
+
+
+class Command(BaseCommand):
+    help = "Importa productos, variantes y stock desde un CSV (ver gestion/services/importacion.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta al CSV (UTF-8)")
+        parser.add_argument("--dry-run", action="store_true", help="Valida e informa sin guardar cambios")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            with open(options["archivo"], encoding="utf-8-sig", newline="") as fh:
+                columnas, filas = leer_csv(fh)
+                resumen = importar_catalogo(columnas, filas, dry_run=options["dry_run"])
+        except (OSError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+        except csv.Error as exc:
+            raise CommandError(f"CSV inválido: {exc}")
+        except ErrorImportacion as exc:
+            for error in exc.errores[:50]:
+                self.stderr.write(f"fila {error['fila']}: {'; '.join(error['errores'])}")
+            raise CommandError(f"{exc}; no se importó nada")
+        duracion = time.perf_counter() - inicio
+        detalle = ", ".join(f"{k}={v}" for k, v in resumen.items())
+        self.stdout.write(self.style.SUCCESS(f"Importación completa en {duracion:.2f}s: {detalle}"))
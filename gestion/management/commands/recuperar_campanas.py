@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gestion.services.campanas import recuperar_campanas
+
+
+class Command(BaseCommand):
+    help = (
+        "Cierra como 'interrumpida' las campañas que quedaron 'enviando' sin progreso (worker "
+        "reiniciado a mitad del envío) y envía las pendientes que nunca arrancaron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutos", type=int, default=getattr(settings, "CAMPANAS_TIMEOUT_MINUTOS", 15),
+            help="Minutos sin progreso para considerar una campaña abandonada",
+        )
+
+    def handle(self, *args, **options):
+        interrumpidas, reencoladas = recuperar_campanas(timedelta(minutes=options["minutos"]))
+        # Las reencoladas se envían en threads de este proceso: el comando termina al completarlas
+        self.stdout.write(f"{interrumpidas} campañas interrumpidas, {reencoladas} reencoladas")
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def normalizar_y_enlazar_clientes(apps, schema_editor):
+    """
+    Normaliza Cliente.email (trim + minúsculas), fusiona clientes duplicados
+    por email (las ventas pasan al cliente más antiguo) y enlaza cada Usuario
+    con el Cliente de su mismo email.
+    """
+    Cliente = apps.get_model('gestion', 'Cliente')
+    Venta = apps.get_model('gestion', 'Venta')
+    Usuario = apps.get_model('gestion', 'Usuario')
+
+    por_email = {}
+    for cliente in Cliente.objects.order_by('id').iterator():
+        email = (cliente.email or '').strip().lower() or None
+        if email != cliente.email:
+            cliente.email = email
+            cliente.save(update_fields=['email'])
+        if email is None:
+            continue
+        principal = por_email.get(email)
+        if principal is None:
+            por_email[email] = cliente
+            continue
+        # Duplicado: completar datos faltantes del principal y mover sus ventas
+        cambios = []
+        for campo in ('apellido', 'telefono', 'documento', 'direccion'):
+            if not getattr(principal, campo) and getattr(cliente, campo):
+                setattr(principal, campo, getattr(cliente, campo))
+                cambios.append(campo)
+        if cambios:
+            principal.save(update_fields=cambios)
+        Venta.objects.filter(cliente_id=cliente.id).update(cliente_id=principal.id)
+        cliente.delete()
+
+    # Usuario.cliente es uno a uno: con usuarios cuyo email solo difiere en
+    # mayúsculas, el Cliente queda enlazado al más antiguo y el resto sin enlazar
+    vinculados = set(Usuario.objects.filter(cliente__isnull=False).values_list('cliente_id', flat=True))
+    for usuario in Usuario.objects.filter(cliente__isnull=True).order_by('id').iterator():
+        cliente = por_email.get((usuario.email or '').strip().lower())
+        if cliente is not None and cliente.id not in vinculados:
+            usuario.cliente_id = cliente.id
+            usuario.save(update_fields=['cliente'])
+            vinculados.add(cliente.id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0003_usuario_fcm_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='cliente',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='usuario', to='gestion.cliente'),
+        ),
+        migrations.RunPython(normalizar_y_enlazar_clientes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:15
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0004_usuario_cliente'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='cliente',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='cliente_email_normalizado_uniq'),
+        ),
+    ]
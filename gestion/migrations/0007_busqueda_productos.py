@@ -0,0 +1,142 @@
+import logging
+
+from django.db import migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# ---------- PostgreSQL: unaccent + pg_trgm + índices de expresión ----------
+POSTGRES_EXTENSIONES = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+]
+
+POSTGRES_SQL = [
+    # unaccent() no es IMMUTABLE; este envoltorio sí, para poder indexarlo
+    """
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS producto_busqueda_tsv_idx ON producto USING gin (
+        to_tsvector('spanish', f_unaccent(coalesce(nombre, '') || ' ' || coalesce(descripcion, '')))
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS producto_nombre_trgm_idx ON producto USING gin (f_unaccent(lower(nombre)) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS producto_variante_codigo_trgm_idx ON producto_variante USING gin (upper(codigo) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS producto_variante_codigo_barras_trgm_idx ON producto_variante USING gin (codigo_barras gin_trgm_ops)",
+]
+
+POSTGRES_REVERSA = [
+    "DROP INDEX IF EXISTS producto_variante_codigo_barras_trgm_idx",
+    "DROP INDEX IF EXISTS producto_variante_codigo_trgm_idx",
+    "DROP INDEX IF EXISTS producto_nombre_trgm_idx",
+    "DROP INDEX IF EXISTS producto_busqueda_tsv_idx",
+    "DROP FUNCTION IF EXISTS f_unaccent(text)",
+]
+
+# ---------- SQLite: tabla FTS5 sincronizada por triggers ----------
+SQLITE_CODIGOS = """coalesce((
+    SELECT group_concat(coalesce(v.codigo, '') || ' ' || coalesce(v.codigo_barras, ''), ' ')
+    FROM producto_variante v WHERE v.producto_id = {producto_id}
+), '')"""
+
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE producto_busqueda USING fts5(
+        nombre, descripcion, codigos, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    INSERT INTO producto_busqueda (rowid, nombre, descripcion, codigos)
+    SELECT p.id, p.nombre, coalesce(p.descripcion, ''), {SQLITE_CODIGOS.format(producto_id='p.id')}
+    FROM producto p
+    """,
+    f"""
+    CREATE TRIGGER producto_busqueda_ai AFTER INSERT ON producto BEGIN
+        INSERT INTO producto_busqueda (rowid, nombre, descripcion, codigos)
+        VALUES (new.id, new.nombre, coalesce(new.descripcion, ''), {SQLITE_CODIGOS.format(producto_id='new.id')});
+    END
+    """,
+    """
+    CREATE TRIGGER producto_busqueda_au AFTER UPDATE ON producto BEGIN
+        UPDATE producto_busqueda SET nombre = new.nombre, descripcion = coalesce(new.descripcion, '')
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER producto_busqueda_ad AFTER DELETE ON producto BEGIN
+        DELETE FROM producto_busqueda WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER producto_variante_busqueda_ai AFTER INSERT ON producto_variante BEGIN
+        UPDATE producto_busqueda SET codigos = {SQLITE_CODIGOS.format(producto_id='new.producto_id')}
+        WHERE rowid = new.producto_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER producto_variante_busqueda_au AFTER UPDATE ON producto_variante BEGIN
+        UPDATE producto_busqueda SET codigos = {SQLITE_CODIGOS.format(producto_id='old.producto_id')}
+        WHERE rowid = old.producto_id;
+        UPDATE producto_busqueda SET codigos = {SQLITE_CODIGOS.format(producto_id='new.producto_id')}
+        WHERE rowid = new.producto_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER producto_variante_busqueda_ad AFTER DELETE ON producto_variante BEGIN
+        UPDATE producto_busqueda SET codigos = {SQLITE_CODIGOS.format(producto_id='old.producto_id')}
+        WHERE rowid = old.producto_id;
+    END
+    """,
+]
+
+SQLITE_REVERSA = [
+    "DROP TRIGGER IF EXISTS producto_variante_busqueda_ad",
+    "DROP TRIGGER IF EXISTS producto_variante_busqueda_au",
+    "DROP TRIGGER IF EXISTS producto_variante_busqueda_ai",
+    "DROP TRIGGER IF EXISTS producto_busqueda_ad",
+    "DROP TRIGGER IF EXISTS producto_busqueda_au",
+    "DROP TRIGGER IF EXISTS producto_busqueda_ai",
+    "DROP TABLE IF EXISTS producto_busqueda",
+]
+
+
+def crear_indices_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        try:
+            # En Azure las extensiones deben estar permitidas (azure.extensions);
+            # si no lo están, la búsqueda usa icontains y la migración no falla.
+            with transaction.atomic():
+                for sql in POSTGRES_EXTENSIONES:
+                    schema_editor.execute(sql)
+        except Exception as exc:
+            logger.warning("No se pudieron crear unaccent/pg_trgm, búsqueda sin índices: %s", exc)
+            return
+        for sql in POSTGRES_SQL:
+            schema_editor.execute(sql)
+    elif vendor == "sqlite":
+        for sql in SQLITE_SQL:
+            schema_editor.execute(sql)
+
+
+def eliminar_indices_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for sql in POSTGRES_REVERSA:
+            schema_editor.execute(sql)
+    elif vendor == "sqlite":
+        for sql in SQLITE_REVERSA:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0006_versiontabla'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_busqueda, eliminar_indices_busqueda),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0007_busqueda_productos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['sucursal', 'fecha'], name='movstock_sucursal_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['fecha'], name='movstock_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['sucursal', 'id'], name='stock_sucursal_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['-fecha', '-id'], name='venta_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['sucursal', '-fecha'], name='venta_sucursal_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['cliente', '-fecha'], name='venta_cliente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['estado', '-fecha'], name='venta_estado_fecha_idx'),
+        ),
+    ]
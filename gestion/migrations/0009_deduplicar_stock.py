@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:27
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def deduplicar_stock(apps, schema_editor):
+    """
+    Fusiona filas de stock repetidas para la misma variante y sucursal:
+    la más antigua queda con la suma de las cantidades y el resto se elimina.
+    """
+    Stock = apps.get_model('gestion', 'Stock')
+    repetidos = (
+        Stock.objects.values('producto_variante_id', 'sucursal_id')
+        .annotate(filas=Count('id'), primera=Min('id'), total=Sum('cantidad'))
+        .filter(filas__gt=1)
+    )
+    for grupo in repetidos.iterator():
+        Stock.objects.filter(id=grupo['primera']).update(cantidad=grupo['total'])
+        Stock.objects.filter(
+            producto_variante_id=grupo['producto_variante_id'], sucursal_id=grupo['sucursal_id']
+        ).exclude(id=grupo['primera']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0008_indices_filtros'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicar_stock, migrations.RunPython.noop),
+    ]
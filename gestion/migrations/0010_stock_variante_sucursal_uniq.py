@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0009_deduplicar_stock'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='stock',
+            constraint=models.UniqueConstraint(fields=('producto_variante', 'sucursal'), name='stock_variante_sucursal_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0010_stock_variante_sucursal_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioSync',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tabla', models.CharField(max_length=32)),
+                ('objeto_id', models.BigIntegerField()),
+                ('eliminado', models.BooleanField(default=False)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'cambio_sync',
+                'managed': True,
+                'indexes': [models.Index(fields=['tabla', 'objeto_id'], name='cambio_sync_tabla_objeto_idx')],
+            },
+        ),
+    ]
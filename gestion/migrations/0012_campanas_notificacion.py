@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0011_cambiosync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampanaNotificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('roles', models.JSONField(blank=True, null=True)),
+                ('estado', models.CharField(default='pendiente', max_length=20)),
+                ('total_destinatarios', models.IntegerField(default=0)),
+                ('total_lotes', models.IntegerField(default=0)),
+                ('enviados', models.IntegerField(default=0)),
+                ('fallidos', models.IntegerField(default=0)),
+                ('tokens_invalidos', models.IntegerField(default=0)),
+                ('creada_en', models.DateTimeField(auto_now_add=True)),
+                ('finalizada_en', models.DateTimeField(blank=True, null=True)),
+                ('enviado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='gestion.usuario')),
+            ],
+            options={
+                'db_table': 'campana_notificacion',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='ResultadoLoteCampana',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.IntegerField()),
+                ('tokens', models.IntegerField()),
+                ('enviados', models.IntegerField()),
+                ('fallidos', models.IntegerField()),
+                ('tokens_invalidos', models.IntegerField(default=0)),
+                ('duracion_ms', models.IntegerField(default=0)),
+                ('campana', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes', to='gestion.campananotificacion')),
+            ],
+            options={
+                'db_table': 'resultado_lote_campana',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0012_campanas_notificacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(condition=models.Q(('fcm_token__isnull', False), models.Q(('fcm_token', ''), _negated=True)), fields=['fcm_token'], name='usuario_fcm_token_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(condition=models.Q(('fcm_token__isnull', False), models.Q(('fcm_token', ''), _negated=True)), fields=['rol', 'fcm_token'], name='usuario_rol_fcm_token_idx'),
+        ),
+    ]
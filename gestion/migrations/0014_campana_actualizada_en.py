@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def inicializar(apps, schema_editor):
+    # Campañas previas: sin otro dato, su último progreso es la creación
+    CampanaNotificacion = apps.get_model('gestion', 'CampanaNotificacion')
+    CampanaNotificacion.objects.filter(estado='enviando').update(actualizada_en=F('creada_en'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0013_usuario_fcm_token_parcial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campananotificacion',
+            name='actualizada_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(inicializar, migrations.RunPython.noop),
+    ]
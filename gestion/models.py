@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 # ================== CATEGORÍA ==================
 class Categoria(models.Model):
@@ -73,6 +74,14 @@ class Stock(models.Model):
     class Meta:
         managed = True
         db_table = 'stock'
+        indexes = [
+            # Filtro ?sucursal= recorriendo en el orden del cursor (id)
+            models.Index(fields=['sucursal', 'id'], name='stock_sucursal_id_idx'),
+        ]
+        constraints = [
+            # Una fila por variante y sucursal (permite upserts en la importación masiva)
+            models.UniqueConstraint(fields=['producto_variante', 'sucursal'], name='stock_variante_sucursal_uniq'),
+        ]
 
 class MovimientoStock(models.Model):
     producto_variante = models.ForeignKey(ProductoVariante, on_delete=models.CASCADE)
@@ -84,6 +93,10 @@ class MovimientoStock(models.Model):
     class Meta:
         managed = True
         db_table = 'movimiento_stock'
+        indexes = [
+            models.Index(fields=['sucursal', 'fecha'], name='movstock_sucursal_fecha_idx'),
+            models.Index(fields=['fecha'], name='movstock_fecha_idx'),
+        ]
 
 # ================== CLIENTES Y VENTAS ==================
 class Cliente(models.Model):
@@ -100,6 +113,10 @@ class Cliente(models.Model):
     class Meta:
         managed = True
         db_table = 'cliente'
+        constraints = [
+            # Un cliente por email, sin distinguir mayúsculas (sirve también de índice de búsqueda)
+            models.UniqueConstraint(Lower('email'), name='cliente_email_normalizado_uniq'),
+        ]
 
 class Venta(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
@@ -114,6 +131,13 @@ class Venta(models.Model):
     class Meta:
         managed = True
         db_table = 'venta'
+        indexes = [
+            # Orden del listado (cursor -fecha,-id) y filtros ?desde/?hasta
+            models.Index(fields=['-fecha', '-id'], name='venta_fecha_id_idx'),
+            models.Index(fields=['sucursal', '-fecha'], name='venta_sucursal_fecha_idx'),
+            models.Index(fields=['cliente', '-fecha'], name='venta_cliente_fecha_idx'),
+            models.Index(fields=['estado', '-fecha'], name='venta_estado_fecha_idx'),
+        ]
 
 class VentaDetalle(models.Model):
     venta = models.ForeignKey(Venta, on_delete=models.CASCADE)
@@ -154,10 +178,24 @@ class Usuario(models.Model):
     password_hash = models.TextField()
     rol = models.ForeignKey(Rol, on_delete=models.CASCADE)
     fcm_token = models.CharField(max_length=512, blank=True, null=True)
+    cliente = models.OneToOneField(
+        Cliente, on_delete=models.SET_NULL, blank=True, null=True, related_name='usuario'
+    )
 
     class Meta:
         managed = True
         db_table = 'usuario'
+        # Parciales: solo usuarios con token (destinatarios de push), para leer los tokens del índice
+        indexes = [
+            models.Index(
+                fields=['fcm_token'], name='usuario_fcm_token_idx',
+                condition=models.Q(fcm_token__isnull=False) & ~models.Q(fcm_token=''),
+            ),
+            models.Index(
+                fields=['rol', 'fcm_token'], name='usuario_rol_fcm_token_idx',
+                condition=models.Q(fcm_token__isnull=False) & ~models.Q(fcm_token=''),
+            ),
+        ]
 
 
 # ================== TOKENS DE API (Auth simple) ==================
@@ -169,3 +207,76 @@ class ApiToken(models.Model):
     class Meta:
         managed = True
         db_table = 'api_token'
+
+
+# ================== VERSIONES DE TABLAS (cache HTTP) ==================
+class VersionTabla(models.Model):
+    """
+    Contador de cambios por tabla. Se incrementa tras cada alta/baja/modificación
+    y sirve para calcular ETags sin leer las filas.
+    """
+    tabla = models.CharField(max_length=64, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'version_tabla'
+
+
+# ================== REGISTRO DE CAMBIOS (sync incremental) ==================
+class CambioSync(models.Model):
+    """
+    Registro secuencial de altas/modificaciones/bajas de las tablas que la app
+    móvil guarda en cache. El id es el cursor de sincronización; `eliminado`
+    marca las bajas (tombstones).
+    """
+    id = models.BigAutoField(primary_key=True)
+    tabla = models.CharField(max_length=32)
+    objeto_id = models.BigIntegerField()
+    eliminado = models.BooleanField(default=False)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = True
+        db_table = 'cambio_sync'
+        indexes = [
+            models.Index(fields=['tabla', 'objeto_id'], name='cambio_sync_tabla_objeto_idx'),
+        ]
+
+
+# ================== CAMPAÑAS DE NOTIFICACIONES ==================
+class CampanaNotificacion(models.Model):
+    """Envío push masivo (notificación global) con sus estadísticas de entrega"""
+    titulo = models.CharField(max_length=200)
+    mensaje = models.TextField()
+    data = models.JSONField(blank=True, null=True)
+    roles = models.JSONField(blank=True, null=True)  # filtro de roles (vacío = todos)
+    enviado_por = models.ForeignKey(Usuario, on_delete=models.SET_NULL, blank=True, null=True)
+    estado = models.CharField(max_length=20, default='pendiente')  # pendiente/enviando/finalizada/error/interrumpida
+    total_destinatarios = models.IntegerField(default=0)
+    total_lotes = models.IntegerField(default=0)
+    enviados = models.IntegerField(default=0)
+    fallidos = models.IntegerField(default=0)
+    tokens_invalidos = models.IntegerField(default=0)
+    creada_en = models.DateTimeField(auto_now_add=True)
+    finalizada_en = models.DateTimeField(blank=True, null=True)
+    actualizada_en = models.DateTimeField(blank=True, null=True)  # último progreso del envío
+
+    class Meta:
+        managed = True
+        db_table = 'campana_notificacion'
+
+
+class ResultadoLoteCampana(models.Model):
+    """Resultado de un lote (hasta 500 tokens) de una campaña"""
+    campana = models.ForeignKey(CampanaNotificacion, on_delete=models.CASCADE, related_name='lotes')
+    numero = models.IntegerField()
+    tokens = models.IntegerField()
+    enviados = models.IntegerField()
+    fallidos = models.IntegerField()
+    tokens_invalidos = models.IntegerField(default=0)
+    duracion_ms = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'resultado_lote_campana'
@@ -0,0 +1,24 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacion(CursorPagination):
+    """
+    Paginación por cursor para los ViewSets del router.
+    - Orden estable: `cursor_ordering` del ViewSet (default: id).
+    - Tamaño de página: REST_FRAMEWORK['PAGE_SIZE'] (env API_PAGE_SIZE).
+    - Los clientes que necesiten más filas piden ?page_size=<n> explícitamente,
+      acotado por API_MAX_PAGE_SIZE.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
@@ -0,0 +1,116 @@
+"""
+Renderer y parser JSON rápidos basados en orjson.
+Si orjson no está instalado se comportan igual que los de DRF.
+"""
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """
+    Tipos que orjson no serializa de forma nativa (Decimal, lazy strings,
+    QuerySets, timedelta...): misma conversión que el encoder de DRF.
+    """
+    return _encoder.default(obj)
+
+
+if orjson is not None:
+    # UTC como "Z" (igual que DRF); claves no-str para agregaciones con ints/fechas
+    ORJSON_OPCIONES = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+else:  # pragma: no cover
+    ORJSON_OPCIONES = 0
+
+
+def _default_decimal_texto(obj):
+    """Como _default, pero Decimal -> str (mismo formato que los serializers, sin perder precisión)"""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    return _encoder.default(obj)
+
+
+class _JSONEncoderDecimalTexto(JSONEncoder):
+    def default(self, obj):
+        return _default_decimal_texto(obj)
+
+
+def dumps(data, decimal_como_texto: bool = False) -> bytes:
+    """
+    Serializa a JSON compacto (bytes) con las mismas conversiones que el renderer.
+    Con decimal_como_texto los Decimal salen como string (filas crudas de .values()).
+    """
+    if orjson is None:  # pragma: no cover
+        encoder = _JSONEncoderDecimalTexto if decimal_como_texto else JSONEncoder
+        return json.dumps(data, cls=encoder, ensure_ascii=False, separators=(",", ":")).encode()
+    default = _default_decimal_texto if decimal_como_texto else _default
+    return orjson.dumps(data, default=default, option=ORJSON_OPCIONES)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson. Decimal -> float y datetime ISO 8601, como DRF.
+    Para salida indentada (p.ej. Browsable API) delega en el renderer de DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = dumps(data)
+        # Igual que DRF: escapar U+2028/U+2029 para que sea un subconjunto válido de JS
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser con orjson (solo UTF-8; otras codificaciones usan el parser de DRF)."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+def respuesta_json(data, status: int = 200) -> HttpResponse:
+    """Respuesta JSON para vistas async de Django (sin DRF), con el mismo formato que el renderer"""
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def leer_json(request):
+    """
+    Body JSON de un request de Django como dict (vacío si no hay body o no es
+    un objeto). None si el JSON es inválido.
+    """
+    if not request.body:
+        return {}
+    try:
+        data = orjson.loads(request.body) if orjson is not None else json.loads(request.body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else {}
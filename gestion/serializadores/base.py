@@ -0,0 +1,71 @@
+from typing import List, Optional, Set
+
+
+def _parametro_lista(request, nombre) -> Optional[Set[str]]:
+    """Lee un query param CSV (solo en lecturas). None si no se envió."""
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None
+    valor = request.query_params.get(nombre)
+    if valor is None:
+        return None
+    return {v.strip() for v in valor.split(",") if v.strip()}
+
+
+def campos_solicitados(request) -> Optional[Set[str]]:
+    """Campos pedidos con ?fields=a,b,c (None = todos)"""
+    return _parametro_lista(request, "fields")
+
+
+def expansiones_solicitadas(request) -> Optional[Set[str]]:
+    """Relaciones a expandir pedidas con ?expand=a,b (None = las de siempre)"""
+    return _parametro_lista(request, "expand")
+
+
+class CamposDinamicosMixin:
+    """
+    Sparse fieldsets para ModelSerializers.
+    - ?fields=id,nombre      -> solo esos campos en la respuesta.
+    - ?expand=rel1,rel2      -> solo esas relaciones anidadas; ?expand= (vacío) no expande
+      ninguna y devuelve el id. Sin el parámetro se mantiene la salida de siempre.
+
+    En Meta se pueden declarar:
+    - dependencias: {campo: [columnas]} para campos calculados (SerializerMethodField).
+    - expandibles: {campo: [columnas]} columnas extra que necesita la versión expandida.
+    Con eso `columnas_para()` indica al ViewSet qué columnas leer (only/select_related).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = campos_solicitados(self.context.get("request"))
+        if campos is not None:
+            for nombre in set(self.fields) - campos:
+                self.fields.pop(nombre)
+
+    def expandir(self, campo: str) -> bool:
+        expand = expansiones_solicitadas(self.context.get("request"))
+        return expand is None or campo in expand
+
+    @classmethod
+    def columnas_para(cls, campos: Set[str], expand: Optional[Set[str]]) -> Optional[List[str]]:
+        """
+        Columnas (rutas ORM) necesarias para serializar `campos`.
+        Retorna None si algún campo calculado no declara sus dependencias
+        (en ese caso se cargan todas las columnas).
+        """
+        dependencias = getattr(cls.Meta, "dependencias", {})
+        expandibles = getattr(cls.Meta, "expandibles", {})
+        fields = cls().fields
+        columnas = []
+        for nombre in campos:
+            field = fields.get(nombre)
+            if field is None:
+                continue
+            if nombre in dependencias:
+                columnas.extend(dependencias[nombre])
+            elif field.source == "*":
+                return None
+            else:
+                columnas.append(field.source.replace(".", "__"))
+            if nombre in expandibles and (expand is None or nombre in expand):
+                columnas.extend(expandibles[nombre])
+        return columnas
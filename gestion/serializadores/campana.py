@@ -0,0 +1,27 @@
+from rest_framework import serializers
+from gestion.models import CampanaNotificacion, ResultadoLoteCampana
+
+
+class ResultadoLoteCampanaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ResultadoLoteCampana
+        fields = ['numero', 'tokens', 'enviados', 'fallidos', 'tokens_invalidos', 'duracion_ms']
+
+
+class CampanaNotificacionSerializer(serializers.ModelSerializer):
+    enviado_por_email = serializers.CharField(source='enviado_por.email', read_only=True, default=None)
+    lotes_completados = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CampanaNotificacion
+        fields = [
+            'id', 'titulo', 'mensaje', 'data', 'roles', 'enviado_por', 'enviado_por_email', 'estado',
+            'total_destinatarios', 'total_lotes', 'lotes_completados', 'enviados', 'fallidos',
+            'tokens_invalidos', 'creada_en', 'actualizada_en', 'finalizada_en',
+        ]
+
+    def get_lotes_completados(self, obj):
+        """Progreso del envío (anotado por la vista; si no, se cuenta)"""
+        if hasattr(obj, 'lotes_completados'):
+            return obj.lotes_completados
+        return obj.lotes.count()
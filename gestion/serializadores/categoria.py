@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import Categoria
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class CategoriaSerializer(serializers.ModelSerializer):
+class CategoriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Categoria
         fields = '__all__'
@@ -1,7 +1,17 @@
 from rest_framework import serializers
 from gestion.models import Cliente
+from gestion.serializadores.base import CamposDinamicosMixin
+from gestion.services.clientes import buscar_cliente_por_email, normalizar_email
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = '__all__'
+
+    def validate_email(self, value):
+        """Normaliza el email y evita duplicados (único sin distinguir mayúsculas)"""
+        email = normalizar_email(value)
+        existente = buscar_cliente_por_email(email)
+        if existente and (self.instance is None or existente.pk != self.instance.pk):
+            raise serializers.ValidationError("ya existe un cliente con este email")
+        return email
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import MovimientoStock
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class MovimientoStockSerializer(serializers.ModelSerializer):
+class MovimientoStockSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = MovimientoStock
         fields = '__all__'
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import Pago
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class PagoSerializer(serializers.ModelSerializer):
+class PagoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Pago
         fields = '__all__'
@@ -1,7 +1,22 @@
+from django.db.models import Min, Max, Q
 from rest_framework import serializers
 from gestion.models import Producto, ProductoVariante
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class ProductoSerializer(serializers.ModelSerializer):
+
+def anotar_rango_precios(queryset):
+    """
+    Agrega al queryset de productos el rango de precios de sus variantes,
+    calculado en SQL (ignora variantes sin precio, igual que antes).
+    """
+    con_precio = Q(productovariante__precio__gt=0)
+    return queryset.annotate(
+        variantes_precio_min=Min('productovariante__precio', filter=con_precio),
+        variantes_precio_max=Max('productovariante__precio', filter=con_precio),
+    )
+
+
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
     precio = serializers.SerializerMethodField()
     precio_min = serializers.SerializerMethodField()
@@ -10,39 +25,39 @@ class ProductoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = '__all__'
+        # El rango de precios sale de anotaciones (ver anotar_rango_precios)
+        dependencias = {
+            'precio': ['precio_base'],
+            'precio_min': ['precio_base'],
+            'precio_max': ['precio_base'],
+        }
     
-    def _get_variantes(self, obj):
-        """Obtener variantes de forma optimizada"""
-        # Intentar usar variantes prefetched
-        if hasattr(obj, '_prefetched_objects_cache') and 'productovariante_set' in obj._prefetched_objects_cache:
-            return list(obj._prefetched_objects_cache['productovariante_set'])
-        # Fallback: consulta directa
-        return list(ProductoVariante.objects.filter(producto=obj))
-    
+    def _rango_precios(self, obj):
+        """Rango (min, max) de precios de variantes, desde las anotaciones SQL"""
+        if not hasattr(obj, 'variantes_precio_min'):
+            # Fallback (instancias sin anotar, p.ej. tras create/update): una sola consulta
+            agg = ProductoVariante.objects.filter(producto=obj, precio__gt=0).aggregate(
+                pmin=Min('precio'), pmax=Max('precio')
+            )
+            obj.variantes_precio_min = agg['pmin']
+            obj.variantes_precio_max = agg['pmax']
+        return obj.variantes_precio_min, obj.variantes_precio_max
+
+    def _precio_base(self, obj):
+        return float(obj.precio_base) if obj.precio_base else 0.0
+
     def get_precio(self, obj):
         """Retorna precio_base como precio (compatibilidad) o precio mínimo de variantes"""
-        variantes = self._get_variantes(obj)
-        if variantes:
-            precios = [float(v.precio) for v in variantes if v.precio]
-            if precios:
-                return min(precios)
+        precio_min, _ = self._rango_precios(obj)
         # Si no hay variantes o no tienen precio, usar precio_base
-        return float(obj.precio_base) if obj.precio_base else 0.0
+        return float(precio_min) if precio_min is not None else self._precio_base(obj)
     
     def get_precio_min(self, obj):
         """Precio mínimo de todas las variantes"""
-        variantes = self._get_variantes(obj)
-        if variantes:
-            precios = [float(v.precio) for v in variantes if v.precio]
-            if precios:
-                return min(precios)
-        return float(obj.precio_base) if obj.precio_base else 0.0
+        precio_min, _ = self._rango_precios(obj)
+        return float(precio_min) if precio_min is not None else self._precio_base(obj)
     
     def get_precio_max(self, obj):
         """Precio máximo de todas las variantes"""
-        variantes = self._get_variantes(obj)
-        if variantes:
-            precios = [float(v.precio) for v in variantes if v.precio]
-            if precios:
-                return max(precios)
-        return float(obj.precio_base) if obj.precio_base else 0.0
+        _, precio_max = self._rango_precios(obj)
+        return float(precio_max) if precio_max is not None else self._precio_base(obj)
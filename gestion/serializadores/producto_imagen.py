@@ -1,7 +1,19 @@
 from rest_framework import serializers
 from gestion.models import ProductoImagen
+from gestion.serializadores.base import CamposDinamicosMixin
+from gestion.services.imagenes import hash_desde_url, urls_miniaturas
+
+class ProductoImagenSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    miniaturas = serializers.SerializerMethodField()
 
-class ProductoImagenSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductoImagen
         fields = '__all__'
+        dependencias = {
+            'miniaturas': ['url'],
+        }
+
+    def get_miniaturas(self, obj):
+        """URLs por ancho (webp/jpg) si la imagen se subió al almacenamiento por contenido"""
+        hash_hex = hash_desde_url(obj.url)
+        return urls_miniaturas(hash_hex) if hash_hex else None
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import ProductoVariante
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class ProductoVarianteSerializer(serializers.ModelSerializer):
+class ProductoVarianteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # Campo adicional para mostrar el nombre del producto
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
     
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import Rol
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class RolSerializer(serializers.ModelSerializer):
+class RolSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Rol
         fields = '__all__'
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import Stock
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class StockSerializer(serializers.ModelSerializer):
+class StockSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # Campos adicionales para mostrar nombres en lugar de solo IDs
     producto = serializers.SerializerMethodField()
     producto_variante_id = serializers.IntegerField(source='producto_variante.id', read_only=True)
@@ -12,6 +13,9 @@ class StockSerializer(serializers.ModelSerializer):
         model = Stock
         fields = ['id', 'producto_variante', 'producto_variante_id', 'producto', 'sucursal', 'sucursal_id', 'sucursal_nombre', 'cantidad']
         read_only_fields = ['producto_variante_id', 'producto', 'sucursal_id', 'sucursal_nombre']
+        dependencias = {
+            'producto': ['producto_variante__producto__nombre'],
+        }
     
     def get_producto(self, obj):
         # Retornar el nombre del producto desde producto_variante.producto.nombre
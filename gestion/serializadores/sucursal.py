@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import Sucursal
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class SucursalSerializer(serializers.ModelSerializer):
+class SucursalSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Sucursal
         fields = '__all__'
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import Usuario
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Usuario
         fields = '__all__'
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from gestion.models import Venta
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class VentaSerializer(serializers.ModelSerializer):
+class VentaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # Campos adicionales para mostrar nombres en lugar de solo IDs
     cliente_nombre = serializers.SerializerMethodField()
     sucursal_nombre = serializers.CharField(source='sucursal.nombre', read_only=True)
@@ -9,6 +10,9 @@ class VentaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Venta
         fields = '__all__'
+        dependencias = {
+            'cliente_nombre': ['cliente__nombre', 'cliente__apellido', 'cliente__email'],
+        }
     
     def get_cliente_nombre(self, obj):
         """Retorna el nombre completo del cliente"""
@@ -1,15 +1,28 @@
 from rest_framework import serializers
 from gestion.models import VentaDetalle
+from gestion.serializadores.base import CamposDinamicosMixin
 
-class VentaDetalleSerializer(serializers.ModelSerializer):
+class VentaDetalleSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     producto_variante = serializers.SerializerMethodField()
     
     class Meta:
         model = VentaDetalle
         fields = '__all__'
+        dependencias = {
+            'producto_variante': ['producto_variante'],
+        }
+        expandibles = {
+            'producto_variante': [
+                'producto_variante__talla',
+                'producto_variante__color',
+                'producto_variante__producto__nombre',
+            ],
+        }
     
     def get_producto_variante(self, obj):
-        """Incluir información completa del producto variante"""
+        """Incluir información completa del producto variante (o solo su id sin ?expand)"""
+        if not self.expandir('producto_variante'):
+            return obj.producto_variante_id
         if obj.producto_variante:
             return {
                 'id': obj.producto_variante.id,
@@ -0,0 +1,124 @@
+"""
+Búsqueda de productos por nombre, descripción, SKU (codigo) y código de barras,
+insensible a acentos y con ranking.
+- PostgreSQL: tsvector + pg_trgm sobre índices de expresión (migración 0007).
+- SQLite (desarrollo): tabla FTS5 `producto_busqueda` mantenida por triggers.
+- Si el motor no tiene esos índices, se usa un icontains como respaldo.
+"""
+import logging
+import re
+from typing import List
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from gestion.models import Producto
+
+logger = logging.getLogger(__name__)
+
+_TERMINO = re.compile(r"\w+", re.UNICODE)
+_pg_indices_disponibles = None
+
+SQL_POSTGRES = """
+SELECT p.id,
+       ts_rank(to_tsvector('spanish', f_unaccent(coalesce(p.nombre, '') || ' ' || coalesce(p.descripcion, ''))),
+               to_tsquery('spanish', f_unaccent(%(tsquery)s)))
+       + similarity(f_unaccent(lower(p.nombre)), f_unaccent(lower(%(q)s)))
+       + CASE WHEN p.id IN (
+             SELECT v.producto_id FROM producto_variante v
+             WHERE upper(v.codigo) = upper(%(q)s) OR v.codigo_barras = %(q)s
+         ) THEN 1 ELSE 0 END AS rank
+FROM producto p
+WHERE to_tsvector('spanish', f_unaccent(coalesce(p.nombre, '') || ' ' || coalesce(p.descripcion, '')))
+          @@ to_tsquery('spanish', f_unaccent(%(tsquery)s))
+   OR f_unaccent(lower(p.nombre)) %% f_unaccent(lower(%(q)s))
+   OR p.id IN (
+         SELECT v.producto_id FROM producto_variante v
+         WHERE upper(v.codigo) LIKE %(like)s OR v.codigo_barras LIKE %(like)s
+      )
+ORDER BY rank DESC, p.id
+LIMIT %(limit)s
+"""
+
+SQL_SQLITE = """
+SELECT rowid FROM producto_busqueda
+WHERE producto_busqueda MATCH %s
+ORDER BY bm25(producto_busqueda, 10.0, 1.0, 5.0), rowid
+LIMIT %s
+"""
+
+
+def _terminos(q: str) -> List[str]:
+    return _TERMINO.findall(q or "")
+
+
+def _escapar_like(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _postgres_disponible() -> bool:
+    """Los índices/funciones de búsqueda existen solo si la migración pudo crear las extensiones"""
+    global _pg_indices_disponibles
+    if _pg_indices_disponibles is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regprocedure('f_unaccent(text)') IS NOT NULL")
+            _pg_indices_disponibles = bool(cursor.fetchone()[0])
+        if not _pg_indices_disponibles:
+            logger.warning("Búsqueda sin índices (faltan unaccent/pg_trgm); se usa icontains")
+    return _pg_indices_disponibles
+
+
+def _buscar_postgres(q: str, terminos: List[str], limit: int) -> List[int]:
+    params = {
+        "q": q,
+        "tsquery": " & ".join(f"{t}:*" for t in terminos),
+        "like": "%" + _escapar_like(q.upper()) + "%",
+        "limit": limit,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_POSTGRES, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _buscar_sqlite(terminos: List[str], limit: int) -> List[int]:
+    # Cada término como prefijo entre comillas (evita operadores FTS5 inyectados)
+    match = " ".join('"%s"*' % t for t in terminos)
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_SQLITE, [match, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _buscar_icontains(q: str, terminos: List[str], limit: int) -> List[int]:
+    filtro = Q()
+    for termino in terminos:
+        filtro &= (
+            Q(nombre__icontains=termino)
+            | Q(descripcion__icontains=termino)
+            | Q(productovariante__codigo__icontains=termino)
+            | Q(productovariante__codigo_barras__icontains=termino)
+        )
+    qs = (
+        Producto.objects.filter(filtro)
+        .annotate(coincide_nombre=Case(
+            When(nombre__icontains=q, then=Value(1)), default=Value(0), output_field=IntegerField()
+        ))
+        .order_by("-coincide_nombre", "id")
+        .values_list("id", flat=True)
+        .distinct()
+    )
+    return list(qs[:limit])
+
+
+def buscar_productos(q: str, limit: int = 20) -> List[int]:
+    """
+    Retorna los ids de productos que coinciden con `q`, ordenados por relevancia.
+    """
+    q = (q or "").strip()
+    terminos = _terminos(q)
+    if not terminos:
+        return []
+    if connection.vendor == "postgresql" and _postgres_disponible():
+        return _buscar_postgres(q, terminos, limit)
+    if connection.vendor == "sqlite":
+        return _buscar_sqlite(terminos, limit)
+    return _buscar_icontains(q, terminos, limit)
@@ -0,0 +1,178 @@
+"""
+Helpers sobre el cache de Django (backend según CACHE_BACKEND en settings).
+
+- Claves versionadas: cada espacio ("catalogo", "producto:12", ...) tiene un
+  contador en `<espacio>:version`; invalidar() lo incrementa y las entradas
+  viejas quedan huérfanas hasta expirar, sin borrar nada. Un contador ausente
+  (cache vacío, reiniciado o purgado) arranca en time.time_ns(), así nunca
+  vuelve a un valor ya usado cuyas entradas pudieran seguir en el cache.
+- obtener_o_calcular(): lectura con single-flight. Ante un fallo de cache solo
+  un thread del proceso calcula el valor y el resto espera su resultado. Entre
+  procesos la exclusión es un candado en el cache (add): con redis es atómico;
+  con FileBasedCache add/incr no lo son, así que dos workers pueden llegar a
+  calcular lo mismo (nunca se sirve un valor incorrecto, solo se repite trabajo).
+Las variantes a* usan la API async del cache (vistas async bajo ASGI).
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+_NADA = object()
+# Cálculos en curso en este proceso (clave -> evento que se marca al terminar).
+# El candado solo se toma para consultar/reclamar una clave, nunca mientras se calcula.
+_EN_VUELO: Dict[str, threading.Event] = {}
+_EN_VUELO_LOCK = threading.Lock()
+
+
+def obtener_version(espacio: str) -> int:
+    key = f"{espacio}:version"
+    version = cache.get(key)
+    if version is None:
+        semilla = time.time_ns()
+        cache.add(key, semilla, timeout=None)
+        version = cache.get(key, semilla)
+    return version
+
+
+def invalidar(espacio: str) -> None:
+    key = f"{espacio}:version"
+    try:
+        cache.incr(key)
+    except ValueError:
+        # La clave no existe (cache vacío o reiniciado): un valor nuevo, no uno ya usado
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def clave(espacio: str, *partes: Any) -> str:
+    """`<espacio>:<partes>:v<versión actual del espacio>`"""
+    return ":".join([espacio, *(str(p) for p in partes), f"v{obtener_version(espacio)}"])
+
+
+def _espera() -> float:
+    return float(getattr(settings, "CACHE_SINGLE_FLIGHT_ESPERA", 10))
+
+
+def _ttl(timeout):
+    """Las entradas de datos siempre expiran (las huérfanas por versión no se borran)"""
+    if timeout is None:
+        return int(getattr(settings, "CACHE_TIMEOUT_MAXIMO", 60 * 60 * 24))
+    return timeout
+
+
+def _calcular_entre_procesos(key: str, calcular: Callable[[], Any], timeout) -> Any:
+    """Calcula y guarda `key` tomando el candado compartido `<key>:calculando` (best-effort)"""
+    candado = f"{key}:calculando"
+    espera = _espera()
+    propio = cache.add(candado, 1, timeout=int(espera) + 1)
+    limite = time.monotonic() + espera
+    while not propio and time.monotonic() < limite:
+        time.sleep(0.05)
+        valor = cache.get(key, _NADA)
+        if valor is not _NADA:
+            return valor
+        # Quien calculaba terminó sin guardar (error o None): tomar el relevo
+        propio = cache.add(candado, 1, timeout=int(espera) + 1)
+    if not propio:
+        logger.warning("Single-flight: %s sigue calculándose tras %.0f s, se calcula de nuevo", key, espera)
+
+    try:
+        valor = calcular()
+        if valor is not None:
+            cache.set(key, valor, timeout=_ttl(timeout))
+    finally:
+        if propio:
+            cache.delete(candado)
+    return valor
+
+
+def obtener_o_calcular(key: str, calcular: Callable[[], Any], timeout=DEFAULT_TIMEOUT) -> Any:
+    """
+    Valor cacheado en `key` o el resultado de `calcular()` (que se guarda con
+    `timeout`; None se reemplaza por CACHE_TIMEOUT_MAXIMO). Un None calculado no
+    se guarda. Si quien calcula tarda más de CACHE_SINGLE_FLIGHT_ESPERA segundos,
+    los que esperan calculan por su cuenta.
+    """
+    valor = cache.get(key, _NADA)
+    if valor is not _NADA:
+        return valor
+
+    limite = time.monotonic() + _espera()
+    while True:
+        with _EN_VUELO_LOCK:
+            evento = _EN_VUELO.get(key)
+            if evento is None:
+                evento = _EN_VUELO[key] = threading.Event()
+                break
+        # Otro thread lo está calculando: esperar su resultado sin bloquear otras claves
+        if not evento.wait(max(0.0, limite - time.monotonic())):
+            logger.warning("Single-flight: %s sigue calculándose, se calcula de nuevo", key)
+            return _calcular_entre_procesos(key, calcular, timeout)
+        valor = cache.get(key, _NADA)
+        if valor is not _NADA:
+            return valor
+        # Terminó sin guardar (error o None): reclamar la clave y calcular
+
+    try:
+        valor = cache.get(key, _NADA)
+        if valor is not _NADA:
+            return valor
+        return _calcular_entre_procesos(key, calcular, timeout)
+    finally:
+        with _EN_VUELO_LOCK:
+            if _EN_VUELO.get(key) is evento:
+                del _EN_VUELO[key]
+        evento.set()
+
+
+async def aobtener_version(espacio: str) -> int:
+    key = f"{espacio}:version"
+    version = await cache.aget(key)
+    if version is None:
+        semilla = time.time_ns()
+        await cache.aadd(key, semilla, timeout=None)
+        version = await cache.aget(key, semilla)
+    return version
+
+
+async def aclave(espacio: str, *partes: Any) -> str:
+    return ":".join([espacio, *(str(p) for p in partes), f"v{await aobtener_version(espacio)}"])
+
+
+async def aobtener_o_calcular(key: str, calcular: Callable[[], Awaitable[Any]], timeout=DEFAULT_TIMEOUT) -> Any:
+    """
+    Como obtener_o_calcular con `calcular` async. La exclusión es solo por el
+    candado en el cache (compartido con las vistas sync); la espera no bloquea el loop.
+    """
+    valor = await cache.aget(key, _NADA)
+    if valor is not _NADA:
+        return valor
+
+    candado = f"{key}:calculando"
+    espera = _espera()
+    propio = await cache.aadd(candado, 1, timeout=int(espera) + 1)
+    limite = time.monotonic() + espera
+    while not propio and time.monotonic() < limite:
+        await asyncio.sleep(0.05)
+        valor = await cache.aget(key, _NADA)
+        if valor is not _NADA:
+            return valor
+        propio = await cache.aadd(candado, 1, timeout=int(espera) + 1)
+    if not propio:
+        logger.warning("Single-flight: %s sigue calculándose tras %.0f s, se calcula de nuevo", key, espera)
+
+    try:
+        valor = await calcular()
+        if valor is not None:
+            await cache.aset(key, valor, timeout=_ttl(timeout))
+    finally:
+        if propio:
+            await cache.adelete(candado)
+    return valor
@@ -0,0 +1,246 @@
+"""
+Campañas de notificaciones push (envíos masivos desde NotificacionGlobalView).
+La campaña se guarda antes de enviar y el envío corre en segundo plano:
+cada tanto se persisten los resultados por lote (bulk_create) y se acumulan
+los totales en la campaña, así un admin puede consultar el progreso.
+Si el worker muere a mitad de un envío, recuperar_campanas() (comando
+`recuperar_campanas`, corre al arrancar) cierra las campañas sin progreso reciente;
+CampanaNotificacionView hace lo mismo al consultar una de ellas (recuperar_si_abandonada).
+"""
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from gestion.models import CampanaNotificacion, ResultadoLoteCampana, Usuario
+from gestion.services.push_notifications import (
+    TAMANO_LOTE_FCM, enviar_por_lotes, iterar_tokens, limpiar_tokens_invalidos,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántos lotes (o segundos) se guardan los resultados parciales
+GUARDAR_CADA_LOTES = 20
+GUARDAR_CADA_SEGUNDOS = 2.0
+
+_executor = None
+_lock = threading.Lock()
+
+
+def destinatarios(roles: Optional[List[str]] = None):
+    """Usuarios con token FCM, opcionalmente filtrados por nombre de rol"""
+    usuarios = Usuario.objects.exclude(fcm_token__isnull=True).exclude(fcm_token="")
+    if roles:
+        usuarios = usuarios.filter(rol__nombre__in=roles)
+    return usuarios
+
+
+def contar_destinatarios(roles: Optional[List[str]] = None) -> int:
+    """Tokens distintos a los que llegaría la campaña (un COUNT(DISTINCT) sobre el índice)"""
+    return destinatarios(roles).order_by().values("fcm_token").distinct().count()
+
+
+async def acontar_destinatarios(roles: Optional[List[str]] = None) -> int:
+    return await destinatarios(roles).order_by().values("fcm_token").distinct().acount()
+
+
+def _nueva_campana(titulo, mensaje, data, roles, enviado_por, total) -> CampanaNotificacion:
+    return CampanaNotificacion(
+        titulo=titulo,
+        mensaje=mensaje,
+        data=data or {},
+        roles=roles,
+        enviado_por=enviado_por,
+        total_destinatarios=total,
+        total_lotes=math.ceil(total / TAMANO_LOTE_FCM),
+    )
+
+
+def crear_campana(
+    titulo: str,
+    mensaje: str,
+    data: Optional[Dict[str, Any]],
+    roles: List[str],
+    enviado_por: Optional[Usuario],
+    total: Optional[int] = None,
+) -> CampanaNotificacion:
+    if total is None:
+        total = contar_destinatarios(roles)
+    campana = _nueva_campana(titulo, mensaje, data, roles, enviado_por, total)
+    campana.save()
+    return campana
+
+
+async def acrear_campana(
+    titulo: str,
+    mensaje: str,
+    data: Optional[Dict[str, Any]],
+    roles: List[str],
+    enviado_por: Optional[Usuario],
+    total: int,
+) -> CampanaNotificacion:
+    campana = _nueva_campana(titulo, mensaje, data, roles, enviado_por, total)
+    await campana.asave()
+    return campana
+
+
+def _guardar_lotes(campana_id: int, pendientes: List[ResultadoLoteCampana]) -> None:
+    if not pendientes:
+        return
+    ResultadoLoteCampana.objects.bulk_create(pendientes)
+    CampanaNotificacion.objects.filter(id=campana_id).update(
+        enviados=F("enviados") + sum(r.enviados for r in pendientes),
+        fallidos=F("fallidos") + sum(r.fallidos for r in pendientes),
+        tokens_invalidos=F("tokens_invalidos") + sum(r.tokens_invalidos for r in pendientes),
+        actualizada_en=timezone.now(),
+    )
+
+
+def _totales(campana: CampanaNotificacion) -> Dict[str, int]:
+    """Estadísticas desde los lotes guardados (fuente de verdad)"""
+    totales = campana.lotes.aggregate(
+        enviados=Sum("enviados"), fallidos=Sum("fallidos"),
+        tokens_invalidos=Sum("tokens_invalidos"), destinatarios=Sum("tokens"),
+    )
+    return {
+        "total_destinatarios": totales["destinatarios"] or 0,
+        "total_lotes": campana.lotes.count(),
+        "enviados": totales["enviados"] or 0,
+        "fallidos": totales["fallidos"] or 0,
+        "tokens_invalidos": totales["tokens_invalidos"] or 0,
+    }
+
+
+def ejecutar_campana(campana_id: int) -> CampanaNotificacion:
+    """Envía la campaña, registra los resultados por lote y deja las estadísticas finales"""
+    campana = CampanaNotificacion.objects.get(id=campana_id)
+    # Solo se envía una campaña pendiente: evita un segundo envío si se encoló dos veces
+    if not CampanaNotificacion.objects.filter(id=campana_id, estado="pendiente").update(
+        estado="enviando", actualizada_en=timezone.now(),
+    ):
+        logger.warning("La campaña %s ya no está pendiente (%s), no se envía", campana_id, campana.estado)
+        return campana
+    try:
+        tokens = iterar_tokens(destinatarios(campana.roles))
+        pendientes, invalidos = [], []
+        ultimo_guardado = time.monotonic()
+        for numero, resultado in enviar_por_lotes(
+            tokens, campana.titulo, campana.mensaje, campana.data, deduplicar=False,
+        ):
+            pendientes.append(ResultadoLoteCampana(
+                campana_id=campana_id,
+                numero=numero,
+                tokens=resultado.enviados + resultado.fallidos,
+                enviados=resultado.enviados,
+                fallidos=resultado.fallidos,
+                tokens_invalidos=len(resultado.invalidos),
+                duracion_ms=resultado.duracion_ms,
+            ))
+            invalidos.extend(resultado.invalidos)
+            if len(pendientes) >= GUARDAR_CADA_LOTES or time.monotonic() - ultimo_guardado >= GUARDAR_CADA_SEGUNDOS:
+                _guardar_lotes(campana_id, pendientes)
+                pendientes, ultimo_guardado = [], time.monotonic()
+        _guardar_lotes(campana_id, pendientes)
+        limpiar_tokens_invalidos(invalidos)
+
+        CampanaNotificacion.objects.filter(id=campana_id).update(
+            estado="finalizada", finalizada_en=timezone.now(), **_totales(campana),
+        )
+    except Exception as exc:
+        logger.exception("Error en la campaña %s: %s", campana_id, exc)
+        CampanaNotificacion.objects.filter(id=campana_id).update(estado="error", finalizada_en=timezone.now())
+    campana.refresh_from_db()
+    logger.info(
+        "Campaña %s %s: enviados=%s fallidos=%s tokens_invalidos=%s",
+        campana_id, campana.estado, campana.enviados, campana.fallidos, campana.tokens_invalidos,
+    )
+    return campana
+
+
+def _ejecutar_en_segundo_plano(campana_id: int) -> None:
+    close_old_connections()
+    try:
+        ejecutar_campana(campana_id)
+    finally:
+        # El thread no pasa por el ciclo request/response: cerrar su conexión
+        connection.close()
+
+
+def encolar_campana(campana_id: int) -> None:
+    """Encola el envío en el pool de campañas (PUSH_CAMPANAS_WORKERS threads)"""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "PUSH_CAMPANAS_WORKERS", 2), thread_name_prefix="campanas"
+                )
+    _executor.submit(_ejecutar_en_segundo_plano, campana_id)
+
+
+def programar_campana(campana_id: int) -> None:
+    """Encola el envío al confirmar la transacción (no bloquea la respuesta HTTP)"""
+    transaction.on_commit(partial(encolar_campana, campana_id))
+
+
+def _sin_progreso_default() -> timedelta:
+    return timedelta(minutes=getattr(settings, "CAMPANAS_TIMEOUT_MINUTOS", 15))
+
+
+def _interrumpir(campana: CampanaNotificacion) -> bool:
+    # Condicional sobre actualizada_en: si el envío siguió avanzando, no se toca
+    if not CampanaNotificacion.objects.filter(
+        id=campana.id, estado="enviando", actualizada_en=campana.actualizada_en,
+    ).update(estado="interrumpida", finalizada_en=timezone.now(), **_totales(campana)):
+        return False
+    logger.warning("Campaña %s interrumpida (sin progreso desde %s)", campana.id, campana.actualizada_en)
+    return True
+
+
+def recuperar_si_abandonada(campana: CampanaNotificacion) -> bool:
+    """
+    Marca "interrumpida" una campaña "enviando" sin progreso en CAMPANAS_TIMEOUT_MINUTOS
+    (su worker murió). Actualiza `campana` y retorna si se interrumpió.
+    """
+    if campana.estado != "enviando" or campana.actualizada_en >= timezone.now() - _sin_progreso_default():
+        return False
+    if not _interrumpir(campana):
+        return False
+    campana.refresh_from_db()
+    return True
+
+
+def recuperar_campanas(sin_progreso: Optional[timedelta] = None) -> Tuple[int, int]:
+    """
+    Campañas que quedaron a medias porque su worker se reinició o murió:
+    - "enviando" sin progreso en `sin_progreso` (default CAMPANAS_TIMEOUT_MINUTOS):
+      se marcan "interrumpida" con las estadísticas de los lotes guardados. No se
+      reenvían: no se sabe qué tokens del último lote recibieron la notificación.
+    - "pendiente" creadas hace más de ese tiempo (nunca empezaron): se vuelven a encolar.
+    Retorna (interrumpidas, reencoladas).
+    """
+    if sin_progreso is None:
+        sin_progreso = _sin_progreso_default()
+    limite = timezone.now() - sin_progreso
+
+    interrumpidas = sum(
+        _interrumpir(campana)
+        for campana in CampanaNotificacion.objects.filter(estado="enviando", actualizada_en__lt=limite)
+    )
+
+    pendientes = list(
+        CampanaNotificacion.objects.filter(estado="pendiente", creada_en__lt=limite).values_list("id", flat=True)
+    )
+    for campana_id in pendientes:
+        logger.info("Campaña %s pendiente desde hace más de %s, se vuelve a encolar", campana_id, sin_progreso)
+        programar_campana(campana_id)
+    return interrumpidas, len(pendientes)
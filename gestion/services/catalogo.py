@@ -0,0 +1,67 @@
+import logging
+from typing import Tuple
+
+from django.conf import settings
+
+from gestion.renderizadores import ORJSONRenderer
+from gestion.models import Categoria, Producto, ProductoVariante, ProductoImagen
+from gestion.serializadores.categoria import CategoriaSerializer
+from gestion.serializadores.producto import ProductoSerializer, anotar_rango_precios
+from gestion.serializadores.producto_variante import ProductoVarianteSerializer
+from gestion.serializadores.producto_imagen import ProductoImagenSerializer
+from gestion.services.cache import invalidar, obtener_o_calcular, obtener_version
+
+logger = logging.getLogger(__name__)
+
+CATALOGO_SNAPSHOT_KEY = "catalogo:snapshot:{version}"
+
+
+def obtener_version_catalogo() -> int:
+    """
+    Versión actual del catálogo. Se incrementa cada vez que cambia
+    un producto, variante, imagen o categoría.
+    """
+    return obtener_version("catalogo")
+
+
+def invalidar_catalogo() -> None:
+    """
+    Incrementa la versión del catálogo; los snapshots anteriores quedan
+    huérfanos y expiran solos.
+    """
+    invalidar("catalogo")
+
+
+def construir_catalogo() -> bytes:
+    """
+    Serializa el catálogo completo (categorías, productos, variantes e imágenes)
+    a bytes JSON, con los mismos serializers que los endpoints individuales.
+    """
+    productos = anotar_rango_precios(Producto.objects.select_related("categoria")).order_by("id")
+    variantes = ProductoVariante.objects.select_related("producto").order_by("id")
+    data = {
+        "categorias": CategoriaSerializer(Categoria.objects.order_by("id"), many=True).data,
+        "productos": ProductoSerializer(productos, many=True).data,
+        "producto_variantes": ProductoVarianteSerializer(variantes, many=True).data,
+        "producto_imagenes": ProductoImagenSerializer(ProductoImagen.objects.order_by("id"), many=True).data,
+    }
+    return ORJSONRenderer().render(data)
+
+
+def obtener_catalogo() -> Tuple[int, bytes]:
+    """
+    Retorna (versión, snapshot en bytes). En un acierto de cache no toca el ORM
+    ni los serializers; ante un fallo un solo worker lo genera (single-flight).
+    """
+    version = obtener_version_catalogo()
+
+    def generar():
+        contenido = construir_catalogo()
+        logger.info("Snapshot de catálogo v%s generado (%s bytes)", version, len(contenido))
+        return contenido
+
+    contenido = obtener_o_calcular(
+        CATALOGO_SNAPSHOT_KEY.format(version=version), generar,
+        timeout=getattr(settings, "CATALOGO_CACHE_TIMEOUT", 60 * 60 * 24),
+    )
+    return version, contenido
@@ -0,0 +1,74 @@
+from typing import Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from gestion.models import Cliente, Usuario
+
+
+def normalizar_email(email: Optional[str]) -> Optional[str]:
+    """
+    Normaliza un email para búsquedas y unicidad (sin espacios, en minúsculas).
+    Retorna None si queda vacío.
+    """
+    email_clean = (email or "").strip().lower()
+    return email_clean or None
+
+
+def buscar_cliente_por_email(email: Optional[str]) -> Optional[Cliente]:
+    """
+    Busca un cliente por email normalizado usando el índice único LOWER(email).
+    """
+    email_norm = normalizar_email(email)
+    if not email_norm:
+        return None
+    return (
+        Cliente.objects.alias(email_normalizado=Lower("email"))
+        .filter(email_normalizado=email_norm)
+        .first()
+    )
+
+
+def obtener_o_crear_cliente(email: Optional[str], nombre: Optional[str] = None) -> Tuple[Cliente, bool]:
+    """
+    Equivalente a get_or_create por email normalizado.
+    Si dos requests crean el mismo cliente a la vez, la restricción única decide
+    y el perdedor reutiliza el registro existente.
+    """
+    email_norm = normalizar_email(email)
+    if not email_norm:
+        raise ValueError("email requerido para identificar al cliente")
+    cliente = buscar_cliente_por_email(email_norm)
+    if cliente:
+        return cliente, False
+    try:
+        with transaction.atomic():
+            return Cliente.objects.create(email=email_norm, nombre=nombre or email_norm), True
+    except IntegrityError:
+        return buscar_cliente_por_email(email_norm), False
+
+
+class ClienteYaVinculado(Exception):
+    """El Cliente del email ya está enlazado a otro Usuario (Usuario.cliente es uno a uno)"""
+
+
+def vincular_cliente(usuario: Usuario, nombre: Optional[str] = None) -> Cliente:
+    """
+    Asegura que el usuario tenga su Cliente enlazado (Usuario.cliente) y lo retorna.
+    Lanza ClienteYaVinculado si el Cliente de su email pertenece a otro usuario.
+    """
+    if usuario.cliente_id:
+        return usuario.cliente
+    cliente, _ = obtener_o_crear_cliente(usuario.email, nombre or usuario.nombre)
+    mensaje = f"el cliente {cliente.email} ya está vinculado a otro usuario"
+    if Usuario.objects.filter(cliente=cliente).exclude(id=usuario.id).exists():
+        raise ClienteYaVinculado(mensaje)
+    usuario.cliente = cliente
+    try:
+        with transaction.atomic():
+            usuario.save(update_fields=["cliente"])
+    except IntegrityError:
+        # Otro request lo vinculó entre la consulta y el UPDATE
+        usuario.cliente = None
+        raise ClienteYaVinculado(mensaje)
+    return cliente
@@ -0,0 +1,292 @@
+"""
+Almacenamiento de imágenes de producto direccionado por contenido.
+- Cada archivo se guarda una sola vez en media/products/<h[:2]>/<sha256>.<ext>
+  (re-subir los mismos bytes no duplica nada).
+- Las miniaturas (WebP y JPEG a anchos fijos) se generan en segundo plano:
+  <sha256>_w<ancho>.webp / .jpg junto al original.
+Como el nombre depende del contenido, todas las URLs pueden cachearse como inmutables.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+CARPETA_PRODUCTOS = "products"
+EXTENSIONES = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif"}
+_URL_ORIGINAL = re.compile(r"products/[0-9a-f]{2}/(?P<hash>[0-9a-f]{64})\.(?:jpg|png|webp|gif)$")
+_RUTA_INMUTABLE = re.compile(r"^products/[0-9a-f]{2}/[0-9a-f]{64}(?:_w\d+)?\.(?:jpg|png|webp|gif)$")
+# Nombre = hash del contenido: la URL nunca cambia de contenido
+CACHE_CONTROL_INMUTABLE = "public, max-age=31536000, immutable"
+
+_executor = None
+
+
+def anchos_miniaturas():
+    return tuple(getattr(settings, "IMAGEN_ANCHOS_MINIATURAS", (160, 480, 960)))
+
+
+def _carpeta(hash_hex: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, CARPETA_PRODUCTOS, hash_hex[:2])
+
+
+def _url(hash_hex: str, nombre: str) -> str:
+    return f"{settings.MEDIA_URL}{CARPETA_PRODUCTOS}/{hash_hex[:2]}/{nombre}"
+
+
+def urls_miniaturas(hash_hex: str) -> Dict[str, Dict[str, str]]:
+    """URLs de cada miniatura: {"160": {"webp": ..., "jpg": ...}, ...}"""
+    return {
+        str(ancho): {
+            "webp": _url(hash_hex, f"{hash_hex}_w{ancho}.webp"),
+            "jpg": _url(hash_hex, f"{hash_hex}_w{ancho}.jpg"),
+        }
+        for ancho in anchos_miniaturas()
+    }
+
+
+def hash_desde_url(url: Optional[str]) -> Optional[str]:
+    """Hash de una URL de imagen direccionada por contenido (None para URLs externas/antiguas)"""
+    match = _URL_ORIGINAL.search(url or "")
+    return match.group("hash") if match else None
+
+
+def es_inmutable(ruta: str) -> bool:
+    """True para originales y miniaturas direccionados por contenido (ruta relativa a MEDIA_ROOT)"""
+    return bool(_RUTA_INMUTABLE.match(ruta or ""))
+
+
+def detectar_formato(ruta: str) -> Optional[str]:
+    """Formato real de la imagen según su contenido (JPEG, PNG, ...); None si no es imagen"""
+    if Image is None:  # pragma: no cover
+        return None
+    try:
+        with Image.open(ruta) as img:
+            img.verify()
+            return img.format
+    except Exception:
+        return None
+
+
+def _escribir_atomico(destino: str, escribir) -> None:
+    """Escribe en un temporal y renombra: nunca queda un archivo a medias con el nombre final"""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            escribir(fh)
+        os.replace(tmp, destino)
+    except Exception:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class ImagenInvalida(ValueError):
+    """El contenido no es una imagen soportada o excede el tamaño permitido"""
+
+
+class ImagenDemasiadoGrande(ImagenInvalida):
+    """Se supera un límite de tamaño (imagen, chunk o tamaño declarado): HTTP 413"""
+
+
+def tamano_maximo() -> int:
+    return int(getattr(settings, "IMAGEN_MAX_BYTES", 15 * 1024 * 1024))
+
+
+def sniff_formato(cabecera: bytes) -> Optional[str]:
+    """Formato según los primeros bytes (firma del archivo), sin decodificar la imagen"""
+    if cabecera.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if cabecera[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+BYTES_FIRMA = 12
+
+
+class EscritorImagen:
+    """
+    Escritura incremental en `fh` con memoria acotada (un chunk a la vez).
+    - Si se empieza desde el byte 0, valida la firma antes de escribir nada.
+    - Corta con ImagenDemasiadoGrande al superar IMAGEN_MAX_BYTES.
+    """
+
+    def __init__(self, fh, ya_escritos: int = 0, sha=None):
+        self.fh = fh
+        self.ya_escritos = ya_escritos
+        self.sha = sha
+        self.limite = tamano_maximo()
+        self.escritos = 0
+        self.pendiente = b""
+        self.validado = ya_escritos > 0
+
+    def escribir(self, chunk: bytes) -> None:
+        if not self.validado:
+            self.pendiente += chunk
+            if len(self.pendiente) < BYTES_FIRMA:
+                return
+            if sniff_formato(self.pendiente) not in EXTENSIONES:
+                raise ImagenInvalida("el archivo no es una imagen soportada (jpg, png, webp, gif)")
+            chunk, self.pendiente, self.validado = self.pendiente, b"", True
+        if self.ya_escritos + self.escritos + len(chunk) > self.limite:
+            raise ImagenDemasiadoGrande(f"la imagen supera el máximo de {self.limite} bytes")
+        if self.sha is not None:
+            self.sha.update(chunk)
+        self.fh.write(chunk)
+        self.escritos += len(chunk)
+
+    def cerrar(self) -> None:
+        if not self.validado and self.ya_escritos == 0:
+            # Archivo más corto que la firma: no puede ser una imagen
+            raise ImagenInvalida("el archivo no es una imagen soportada (jpg, png, webp, gif)")
+
+
+def escribir_chunks(fh, chunks: Iterable[bytes], ya_escritos: int = 0, sha=None) -> int:
+    """Escribe chunks con EscritorImagen. Retorna los bytes escritos."""
+    escritor = EscritorImagen(fh, ya_escritos, sha)
+    for chunk in chunks:
+        escritor.escribir(chunk)
+    escritor.cerrar()
+    return escritor.escritos
+
+
+def _hash_archivo(ruta: str) -> str:
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as fh:
+        for bloque in iter(lambda: fh.read(1024 * 1024), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def registrar_archivo(ruta_tmp: str, hash_hex: Optional[str] = None, nombre_original: str = "") -> Dict:
+    """
+    Mueve un archivo ya escrito a su ubicación por contenido (o lo descarta si
+    ya existía uno idéntico) y encola sus miniaturas.
+    Retorna {url, hash, duplicada, miniaturas}. Lanza ImagenInvalida si no es una imagen.
+    """
+    try:
+        formato = detectar_formato(ruta_tmp)
+        if Image is not None and formato not in EXTENSIONES:
+            raise ImagenInvalida("el archivo no es una imagen soportada (jpg, png, webp, gif)")
+        ext = EXTENSIONES.get(formato) or os.path.splitext(nombre_original)[1].lower() or ".jpg"
+
+        hash_hex = hash_hex or _hash_archivo(ruta_tmp)
+        destino = os.path.join(_carpeta(hash_hex), f"{hash_hex}{ext}")
+        duplicada = os.path.exists(destino)
+        if duplicada:
+            os.unlink(ruta_tmp)
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.move(ruta_tmp, destino)
+    except Exception:
+        if os.path.exists(ruta_tmp):
+            os.unlink(ruta_tmp)
+        raise
+
+    programar_miniaturas(destino)
+    return {
+        "url": _url(hash_hex, os.path.basename(destino)),
+        "hash": hash_hex,
+        "duplicada": duplicada,
+        "miniaturas": urls_miniaturas(hash_hex),
+    }
+
+
+def archivo_temporal():
+    """(fd, ruta) de un temporal junto a los originales (el registro final es un rename)"""
+    carpeta_tmp = os.path.join(settings.MEDIA_ROOT, CARPETA_PRODUCTOS)
+    os.makedirs(carpeta_tmp, exist_ok=True)
+    return tempfile.mkstemp(dir=carpeta_tmp, suffix=".upload")
+
+
+def guardar_imagen(chunks: Iterable[bytes], nombre_original: str = "") -> Dict:
+    """
+    Guarda una imagen calculando su SHA-256 mientras se escribe a disco.
+    La firma se valida antes de escribir el primer byte y el tamaño se acota
+    a IMAGEN_MAX_BYTES. Si ya existía un archivo con el mismo contenido,
+    se descarta la copia nueva.
+    """
+    sha = hashlib.sha256()
+    fd, tmp = archivo_temporal()
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            escribir_chunks(fh, chunks, sha=sha)
+    except Exception:
+        os.unlink(tmp)
+        raise
+    return registrar_archivo(tmp, sha.hexdigest(), nombre_original)
+
+
+def generar_miniaturas(ruta_original: str) -> int:
+    """
+    Genera las miniaturas que falten para un original. Retorna cuántas se crearon.
+    """
+    if Image is None:  # pragma: no cover
+        logger.warning("Pillow no está instalado; no se generan miniaturas")
+        return 0
+    hash_hex = os.path.splitext(os.path.basename(ruta_original))[0]
+    carpeta = os.path.dirname(ruta_original)
+    creadas = 0
+    with Image.open(ruta_original) as original:
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ("RGB", "RGBA"):
+            con_alfa = img.mode in ("LA", "PA") or "transparency" in img.info
+            img = img.convert("RGBA" if con_alfa else "RGB")
+        for ancho in anchos_miniaturas():
+            destino_webp = os.path.join(carpeta, f"{hash_hex}_w{ancho}.webp")
+            destino_jpg = os.path.join(carpeta, f"{hash_hex}_w{ancho}.jpg")
+            if os.path.exists(destino_webp) and os.path.exists(destino_jpg):
+                continue
+            miniatura = img.copy()
+            miniatura.thumbnail((ancho, ancho * 10), Image.LANCZOS)
+            _escribir_atomico(destino_webp, lambda fh: miniatura.save(fh, "WEBP", quality=80, method=4))
+            if miniatura.mode == "RGBA":
+                # JPEG no admite transparencia: fondo blanco
+                fondo = Image.new("RGB", miniatura.size, (255, 255, 255))
+                fondo.paste(miniatura, mask=miniatura.getchannel("A"))
+                miniatura = fondo
+            _escribir_atomico(
+                destino_jpg, lambda fh: miniatura.save(fh, "JPEG", quality=82, optimize=True, progressive=True)
+            )
+            creadas += 2
+    return creadas
+
+
+def _generar_miniaturas_seguro(ruta_original: str) -> None:
+    try:
+        creadas = generar_miniaturas(ruta_original)
+        if creadas:
+            logger.info("Miniaturas generadas para %s: %s", os.path.basename(ruta_original), creadas)
+    except Exception as exc:
+        logger.error("Error generando miniaturas de %s: %s", ruta_original, exc)
+
+
+def programar_miniaturas(ruta_original: str) -> None:
+    """Encola la generación de miniaturas en el pool de fondo (no bloquea la respuesta)"""
+    global _executor
+    if Image is None:  # pragma: no cover
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "IMAGEN_WORKERS", 2), thread_name_prefix="miniaturas"
+        )
+    _executor.submit(_generar_miniaturas_seguro, ruta_original)
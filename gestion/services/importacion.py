@@ -0,0 +1,318 @@
+"""
+Importación masiva de catálogo y stock desde CSV.
+Una fila por variante (SKU) y sucursal:
+
+    codigo,producto,categoria,precio,sucursal,cantidad[,talla,color,modelo,codigo_barras,codigo_base,descripcion,precio_base]
+
+- Se valida todo el archivo antes de escribir; si hay errores no se importa nada.
+- Los SKUs existentes se resuelven en una consulta por lote y variantes y stock se
+  escriben con bulk_create(update_conflicts=True) (INSERT ... ON CONFLICT DO UPDATE).
+- `sucursal` acepta id o nombre; las sucursales no se crean desde la importación.
+- `cantidad` fija el stock de esa variante en esa sucursal (vacío = no tocar el stock).
+Como las operaciones masivas no disparan señales, al confirmar se invalida el
+catálogo, se incrementan las versiones de las tablas tocadas y se registran
+los cambios para /sync/.
+"""
+import csv
+import io
+import logging
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import connection, transaction
+from django.db.models import Q
+
+from gestion.models import Categoria, Producto, ProductoVariante, Stock, Sucursal
+from gestion.services.catalogo import invalidar_catalogo
+from gestion.services.sync import registrar_cambios
+from gestion.services.versiones import incrementar_version
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_REQUERIDAS = ("codigo", "producto", "categoria", "precio", "sucursal", "cantidad")
+COLUMNAS_VARIANTE = ("talla", "color", "modelo", "codigo_barras")
+# Columna del CSV -> campo del modelo donde se guarda (límites de largo y precisión)
+CAMPOS_MODELO = {
+    "codigo": (ProductoVariante, "codigo"),
+    "producto": (Producto, "nombre"),
+    "categoria": (Categoria, "nombre"),
+    "talla": (ProductoVariante, "talla"),
+    "color": (ProductoVariante, "color"),
+    "modelo": (ProductoVariante, "modelo"),
+    "codigo_barras": (ProductoVariante, "codigo_barras"),
+    "codigo_base": (Producto, "codigo_base"),
+    "precio": (ProductoVariante, "precio"),
+    "precio_base": (Producto, "precio_base"),
+}
+
+
+class ErrorImportacion(ValueError):
+    """El archivo tiene filas inválidas; `errores` = [{"fila": n, "errores": [...]}]"""
+
+    def __init__(self, errores: List[Dict]):
+        super().__init__(f"{len(errores)} filas con errores")
+        self.errores = errores
+
+
+def tamano_lote() -> int:
+    return int(getattr(settings, "IMPORT_BATCH_SIZE", 2000))
+
+
+def _lotes(valores: List, tamano: int) -> Iterable[List]:
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+def _lote_consulta() -> int:
+    # SQLite limita la cantidad de parámetros por consulta; en PostgreSQL va en un solo IN
+    if connection.vendor == "sqlite":
+        return connection.features.max_query_params or 999
+    return 100000
+
+
+def leer_csv(contenido) -> Tuple[List[str], Iterable[Dict[str, str]]]:
+    """
+    Lector de filas a partir de un archivo (bytes o texto) o un str.
+    Retorna (columnas normalizadas, iterador de dicts).
+    """
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode("utf-8-sig")
+    if isinstance(contenido, str):
+        contenido = io.StringIO(contenido)
+    lector = csv.reader(contenido)
+    columnas = [c.strip().lower() for c in next(lector, [])]
+    return columnas, (dict(zip(columnas, fila)) for fila in lector if any(c.strip() for c in fila))
+
+
+def _decimal(valor: str):
+    valor = (valor or "").strip().replace(",", ".")
+    if not valor:
+        return None
+    try:
+        numero = Decimal(valor)
+    except InvalidOperation:
+        raise ValueError
+    if not numero.is_finite() or numero < 0:
+        raise ValueError
+    return numero
+
+
+def _errores_de_limites(dato: Dict) -> List[str]:
+    """Largo máximo de los textos y dígitos/decimales de los precios según los modelos"""
+    problemas = []
+    for columna, (modelo, nombre) in CAMPOS_MODELO.items():
+        valor = dato.get(columna)
+        if valor is None:
+            continue
+        campo = modelo._meta.get_field(nombre)
+        if isinstance(valor, Decimal):
+            try:
+                DecimalValidator(campo.max_digits, campo.decimal_places)(valor)
+            except ValidationError:
+                problemas.append(
+                    f"{columna} admite hasta {campo.max_digits - campo.decimal_places} enteros "
+                    f"y {campo.decimal_places} decimales"
+                )
+        elif campo.max_length and len(valor) > campo.max_length:
+            problemas.append(f"{columna} supera {campo.max_length} caracteres")
+    return problemas
+
+
+def _validar(columnas: List[str], filas: Iterable[Dict[str, str]]) -> Tuple[List[Dict], List[Dict], Dict[int, str]]:
+    """
+    Valida todas las filas en una pasada, acumulando todos los errores de cada fila.
+    Retorna (filas limpias, errores, {fila: sucursal referenciada}).
+    """
+    faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in columnas]
+    if faltantes:
+        raise ErrorImportacion([{"fila": 1, "errores": [f"faltan columnas: {', '.join(faltantes)}"]}])
+
+    limpias, errores, sucursales = [], [], {}
+    vistos = {}
+    for numero, fila in enumerate(filas, start=2):
+        problemas = []
+        dato = {c: (fila.get(c) or "").strip() or None for c in columnas}
+        for campo in ("codigo", "producto", "categoria", "sucursal"):
+            if not dato.get(campo):
+                problemas.append(f"{campo} requerido")
+        try:
+            dato["precio"] = _decimal(dato.get("precio"))
+            if dato["precio"] is None:
+                problemas.append("precio requerido")
+        except ValueError:
+            problemas.append("precio inválido")
+        try:
+            dato["precio_base"] = _decimal(dato.get("precio_base"))
+        except ValueError:
+            problemas.append("precio_base inválido")
+        try:
+            dato["cantidad"] = int(dato["cantidad"]) if dato.get("cantidad") else None
+            if dato["cantidad"] is not None and dato["cantidad"] < 0:
+                problemas.append("cantidad no puede ser negativa")
+        except ValueError:
+            problemas.append("cantidad debe ser entero")
+        problemas.extend(_errores_de_limites(dato))
+
+        if dato.get("codigo") and dato.get("sucursal"):
+            clave = (dato["codigo"], dato["sucursal"])
+            if clave in vistos:
+                problemas.append(f"SKU y sucursal repetidos (fila {vistos[clave]})")
+            vistos.setdefault(clave, numero)
+        if dato.get("sucursal"):
+            sucursales[numero] = dato["sucursal"]
+        if problemas:
+            errores.append({"fila": numero, "errores": problemas})
+            continue
+        dato["fila"] = numero
+        limpias.append(dato)
+    return limpias, errores, sucursales
+
+
+def _resolver_sucursales(referencias: set) -> Dict[str, int]:
+    """Mapa referencia (id o nombre) -> id de sucursal, en una consulta"""
+    ids = {int(r) for r in referencias if r.isdigit()}
+    encontradas = Sucursal.objects.filter(Q(id__in=ids) | Q(nombre__in=referencias)).values_list("id", "nombre")
+    mapa = {}
+    for sucursal_id, nombre in encontradas:
+        mapa[str(sucursal_id)] = sucursal_id
+        mapa.setdefault(nombre, sucursal_id)
+    return mapa
+
+
+def importar_catalogo(columnas: List[str], filas: Iterable[Dict[str, str]], dry_run: bool = False) -> Dict:
+    """
+    Valida e importa las filas. Lanza ErrorImportacion si alguna fila es inválida.
+    Retorna un resumen con lo creado y actualizado.
+    """
+    limpias, errores, referencias = _validar(columnas, filas)
+    sucursales = _resolver_sucursales(set(referencias.values()))
+    por_fila = {e["fila"]: e for e in errores}
+    for numero, referencia in referencias.items():
+        if referencia not in sucursales:
+            error = por_fila.setdefault(numero, {"fila": numero, "errores": []})
+            error["errores"].append(f"sucursal {referencia} no existe")
+    if por_fila:
+        raise ErrorImportacion(sorted(por_fila.values(), key=lambda e: e["fila"]))
+
+    # Una variante puede venir en varias filas (una por sucursal): gana la última
+    variantes_csv = {dato["codigo"]: dato for dato in limpias}
+    codigos = list(variantes_csv)
+    lote = tamano_lote()
+
+    with transaction.atomic():
+        existentes = {}
+        for grupo in _lotes(codigos, _lote_consulta()):
+            existentes.update(ProductoVariante.objects.filter(codigo__in=grupo).values_list("codigo", "producto_id"))
+
+        # Productos de SKUs nuevos: se reusan por codigo_base (o nombre) o se crean
+        nuevos = [variantes_csv[c] for c in codigos if c not in existentes]
+        categorias = dict(
+            Categoria.objects.filter(nombre__in={d["categoria"] for d in nuevos}).values_list("nombre", "id")
+        )
+        categorias_nuevas = [Categoria(nombre=n) for n in {d["categoria"] for d in nuevos} - set(categorias)]
+        Categoria.objects.bulk_create(categorias_nuevas, batch_size=lote)
+        categorias.update((c.nombre, c.id) for c in categorias_nuevas)
+
+        def clave_producto(dato):
+            return ("codigo_base", dato["codigo_base"]) if dato.get("codigo_base") else ("nombre", dato["producto"])
+
+        claves = {clave_producto(d) for d in nuevos}
+        productos = {}
+        if claves:
+            filtro = Q(codigo_base__in=[v for k, v in claves if k == "codigo_base"]) | Q(
+                nombre__in=[v for k, v in claves if k == "nombre"], codigo_base__isnull=True
+            )
+            for producto_id, codigo_base, nombre in Producto.objects.filter(filtro).values_list(
+                "id", "codigo_base", "nombre"
+            ).order_by("id"):
+                clave = ("codigo_base", codigo_base) if codigo_base else ("nombre", nombre)
+                productos.setdefault(clave, producto_id)
+        productos_nuevos = {}
+        for dato in nuevos:
+            clave = clave_producto(dato)
+            if clave in productos or clave in productos_nuevos:
+                continue
+            productos_nuevos[clave] = Producto(
+                categoria_id=categorias[dato["categoria"]],
+                nombre=dato["producto"],
+                descripcion=dato.get("descripcion"),
+                codigo_base=dato.get("codigo_base"),
+                precio_base=dato.get("precio_base") or dato["precio"],
+            )
+        Producto.objects.bulk_create(productos_nuevos.values(), batch_size=lote)
+        productos.update((clave, p.id) for clave, p in productos_nuevos.items())
+
+        # Variantes: upsert por SKU. Solo se actualizan las columnas presentes en el CSV.
+        campos = ["precio"] + [c for c in COLUMNAS_VARIANTE if c in columnas]
+        variantes = [
+            ProductoVariante(
+                producto_id=existentes.get(codigo) or productos[clave_producto(variantes_csv[codigo])],
+                codigo=codigo,
+                precio=variantes_csv[codigo]["precio"],
+                **{c: variantes_csv[codigo].get(c) for c in COLUMNAS_VARIANTE},
+            )
+            for codigo in codigos
+        ]
+        ProductoVariante.objects.bulk_create(
+            variantes, batch_size=lote, update_conflicts=True, unique_fields=["codigo"], update_fields=campos
+        )
+
+        ids_variantes = {}
+        for grupo in _lotes(codigos, _lote_consulta()):
+            ids_variantes.update(ProductoVariante.objects.filter(codigo__in=grupo).values_list("codigo", "id"))
+        stocks = [
+            Stock(
+                producto_variante_id=ids_variantes[d["codigo"]],
+                sucursal_id=sucursales[d["sucursal"]],
+                cantidad=d["cantidad"],
+            )
+            for d in limpias
+            if d["cantidad"] is not None
+        ]
+        Stock.objects.bulk_create(
+            stocks, batch_size=lote, update_conflicts=True,
+            unique_fields=["producto_variante", "sucursal"], update_fields=["cantidad"],
+        )
+
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            pares = {(s.producto_variante_id, s.sucursal_id) for s in stocks}
+            ids_stock = []
+            for grupo in _lotes(sorted({v for v, _ in pares}), _lote_consulta()):
+                ids_stock.extend(
+                    stock_id
+                    for stock_id, variante_id, sucursal_id in Stock.objects.filter(
+                        producto_variante_id__in=grupo
+                    ).values_list("id", "producto_variante_id", "sucursal_id")
+                    if (variante_id, sucursal_id) in pares
+                )
+            transaction.on_commit(invalidar_catalogo)
+            for modelo in (Categoria, Producto, ProductoVariante, Stock):
+                transaction.on_commit(partial(incrementar_version, modelo._meta.db_table))
+            # Registro para /sync/ (después del commit, como el de las señales)
+            for tabla, ids in (
+                ("categorias", [c.id for c in categorias_nuevas]),
+                # También los existentes con variantes tocadas (rango de precios derivado)
+                ("productos", sorted({v.producto_id for v in variantes})),
+                ("producto_variantes", list(ids_variantes.values())),
+                ("stocks", ids_stock),
+            ):
+                if ids:
+                    transaction.on_commit(partial(registrar_cambios, tabla, ids))
+
+    resumen = {
+        "filas": len(limpias),
+        "categorias_creadas": len(categorias_nuevas),
+        "productos_creados": len(productos_nuevos),
+        "variantes_creadas": len(codigos) - len(existentes),
+        "variantes_actualizadas": len(existentes),
+        "stocks": len(stocks),
+        "dry_run": dry_run,
+    }
+    logger.info("Importación de catálogo: %s", resumen)
+    return resumen
@@ -0,0 +1,99 @@
+"""
+Detalle agregado de un producto para la ficha de la tienda/POS:
+producto + variantes (con stock por sucursal) + imágenes en una sola respuesta.
+Se arma con prefetch_related en un número fijo de consultas y se cachea
+pre-serializado por versión del producto.
+"""
+import logging
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from gestion.models import Producto, ProductoImagen, ProductoVariante, Stock, Sucursal
+from gestion.renderizadores import ORJSONRenderer
+from gestion.serializadores.producto import ProductoSerializer, anotar_rango_precios
+from gestion.serializadores.producto_imagen import ProductoImagenSerializer
+from gestion.serializadores.producto_variante import ProductoVarianteSerializer
+from gestion.services.cache import invalidar, obtener_o_calcular, obtener_version
+from gestion.services.catalogo import obtener_version_catalogo
+
+logger = logging.getLogger(__name__)
+
+PRODUCTO_DETALLE_KEY = "producto:{id}:detalle:{version}"
+
+
+def obtener_version_producto(producto_id: int) -> str:
+    """
+    Versión del detalle de un producto: versión del catálogo (producto,
+    variantes, imágenes, categorías e importaciones masivas) + contador propio
+    que se incrementa con cada cambio de stock del producto.
+    Los renombres de sucursal se reflejan al expirar el cache (PRODUCTO_DETALLE_CACHE_TIMEOUT).
+    """
+    return f"{obtener_version_catalogo()}.{obtener_version(f'producto:{producto_id}')}"
+
+
+def invalidar_producto(producto_id: int) -> None:
+    invalidar(f"producto:{producto_id}")
+
+
+def construir_detalle(producto_id: int) -> Optional[bytes]:
+    """
+    Serializa el detalle completo (None si el producto no existe):
+    { producto, variantes: [{..., stock: [{sucursal, sucursal_nombre, cantidad}], stock_total}],
+      imagenes, sucursales }
+    Consultas: producto, variantes, stock (con sucursal), imágenes y sucursales.
+    """
+    stocks = Stock.objects.select_related("sucursal").order_by("sucursal_id")
+    producto = (
+        anotar_rango_precios(Producto.objects.select_related("categoria"))
+        .prefetch_related(
+            Prefetch(
+                "productovariante_set",
+                queryset=ProductoVariante.objects.order_by("id").prefetch_related(
+                    Prefetch("stock_set", queryset=stocks)
+                ),
+            ),
+            Prefetch("productoimagen_set", queryset=ProductoImagen.objects.order_by("id")),
+        )
+        .filter(id=producto_id)
+        .first()
+    )
+    if producto is None:
+        return None
+
+    variantes = []
+    for variante in producto.productovariante_set.all():
+        # El producto ya está cargado: evita una consulta por variante en producto_nombre
+        variante.producto = producto
+        data = ProductoVarianteSerializer(variante).data
+        data["stock"] = [
+            {"sucursal": s.sucursal_id, "sucursal_nombre": s.sucursal.nombre, "cantidad": s.cantidad}
+            for s in variante.stock_set.all()
+        ]
+        data["stock_total"] = sum(s["cantidad"] for s in data["stock"])
+        variantes.append(data)
+
+    data = {
+        "producto": ProductoSerializer(producto).data,
+        "variantes": variantes,
+        "imagenes": ProductoImagenSerializer(producto.productoimagen_set.all(), many=True).data,
+        "sucursales": list(Sucursal.objects.order_by("id").values("id", "nombre")),
+    }
+    return ORJSONRenderer().render(data)
+
+
+def obtener_detalle(producto_id: int) -> Tuple[str, Optional[bytes]]:
+    """Retorna (versión, detalle en bytes); en un acierto de cache no toca el ORM"""
+    version = obtener_version_producto(producto_id)
+
+    def generar():
+        contenido = construir_detalle(producto_id)
+        logger.debug("Detalle de producto %s v%s generado", producto_id, version)
+        return contenido
+
+    contenido = obtener_o_calcular(
+        PRODUCTO_DETALLE_KEY.format(id=producto_id, version=version), generar,
+        timeout=getattr(settings, "PRODUCTO_DETALLE_CACHE_TIMEOUT", 60 * 60),
+    )
+    return version, contenido
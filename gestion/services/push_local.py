@@ -0,0 +1,95 @@
+"""
+Transporte de push local (sin red) para desarrollo y pruebas de carga.
+Simula a FCM: latencia por llamada y por token, tokens no registrados,
+errores transitorios y el límite de 500 tokens por MulticastMessage.
+
+    PUSH_TRANSPORTE = "gestion.services.push_local.TransporteLocal"
+"""
+import itertools
+import random
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from gestion.services.push_notifications import TAMANO_LOTE_FCM
+
+
+class TokenNoRegistrado(Exception):
+    """Equivalente a messaging.UnregisteredError: el token se debe descartar"""
+
+
+class ErrorTransitorio(Exception):
+    """Equivalente a un error de cuota/servidor: el token sigue siendo válido"""
+
+
+class TransporteLocal:
+    """
+    - latencia_ms: costo fijo de cada llamada (PUSH_LOCAL_LATENCIA_MS)
+    - latencia_token_ms: costo adicional por token del lote (PUSH_LOCAL_LATENCIA_TOKEN_MS)
+    - tasa_invalidos: fracción de tokens no registrados; depende solo del token,
+      así un token inválido lo es en todos los envíos (PUSH_LOCAL_TASA_INVALIDOS)
+    - tasa_errores: probabilidad de error transitorio por token (PUSH_LOCAL_TASA_ERRORES)
+    """
+
+    def __init__(
+        self,
+        latencia_ms: Optional[float] = None,
+        latencia_token_ms: Optional[float] = None,
+        tasa_invalidos: Optional[float] = None,
+        tasa_errores: Optional[float] = None,
+        semilla: Optional[int] = None,
+    ):
+        def valor(propio, nombre, defecto):
+            return float(propio if propio is not None else getattr(settings, nombre, defecto))
+
+        self.latencia_ms = valor(latencia_ms, "PUSH_LOCAL_LATENCIA_MS", 50)
+        self.latencia_token_ms = valor(latencia_token_ms, "PUSH_LOCAL_LATENCIA_TOKEN_MS", 0.2)
+        self.tasa_invalidos = valor(tasa_invalidos, "PUSH_LOCAL_TASA_INVALIDOS", 0.02)
+        self.tasa_errores = valor(tasa_errores, "PUSH_LOCAL_TASA_ERRORES", 0.001)
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.llamadas = 0
+        self.tokens = 0
+
+    def disponible(self) -> bool:
+        return True
+
+    def es_invalido(self, token: str) -> bool:
+        """Si el token se simula como no registrado (determinístico por token)"""
+        return zlib.crc32(token.encode()) % 10000 < self.tasa_invalidos * 10000
+
+    def _resultado(self, token: str) -> Optional[Exception]:
+        if self.es_invalido(token):
+            return TokenNoRegistrado(f"Requested entity was not found: {token}")
+        with self._lock:
+            falla = self._random.random() < self.tasa_errores
+        if falla:
+            return ErrorTransitorio("Service unavailable")
+        return None
+
+    def _esperar(self, tokens: int) -> None:
+        with self._lock:
+            self.llamadas += 1
+            self.tokens += tokens
+        time.sleep((self.latencia_ms + self.latencia_token_ms * tokens) / 1000)
+
+    def enviar(self, token: str, title: str, body: str, data: Dict[str, str]) -> str:
+        self._esperar(1)
+        error = self._resultado(token)
+        if error is not None:
+            raise error
+        return f"projects/local/messages/{next(self._ids)}"
+
+    def enviar_multicast(self, tokens: List[str], title: str, body: str, data: Dict[str, str]) -> List[Optional[Exception]]:
+        if len(tokens) > TAMANO_LOTE_FCM:
+            # Mismo rechazo que el SDK antes de llamar a FCM
+            raise ValueError(f"tokens must not contain more than {TAMANO_LOTE_FCM} tokens")
+        self._esperar(len(tokens))
+        return [self._resultado(token) for token in tokens]
+
+    def token_invalido(self, exc) -> bool:
+        return isinstance(exc, TokenNoRegistrado)
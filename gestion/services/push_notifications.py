@@ -1,29 +1,65 @@
 import json
 import logging
 import os
-from typing import Any, Dict, Iterable, Optional, Tuple, List
+import threading
+import time
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, List
 
-try:
-    import firebase_admin
-    from firebase_admin import credentials, messaging
-except ImportError:  # pragma: no cover
-    firebase_admin = None  # type: ignore
-    credentials = None  # type: ignore
-    messaging = None  # type: ignore
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils.module_loading import import_string
 
 from gestion.models import Usuario
+from gestion.services.versiones import incrementar_version
 
 logger = logging.getLogger(__name__)
 
+# El SDK de Firebase se importa en el primer envío (_cargar_sdk): la mayoría de
+# los requests nunca envía push y no deberían pagar su import al cargar las URLs.
+firebase_admin = None
+credentials = None
+messaging = None
 
-def _initialize_firebase_app() -> Optional["firebase_admin.App"]:
-    """
-    Inicializa Firebase Admin SDK usando credenciales configuradas en variables de entorno.
-    - FIREBASE_CREDENTIALS_JSON: JSON del service account.
-    - FIREBASE_CREDENTIALS_FILE: Ruta al archivo JSON del service account.
-    """
-    if firebase_admin is None:
-        logger.warning("firebase_admin no está instalado. Ejecute 'pip install firebase-admin'.")
+# Máximo de tokens por MulticastMessage que acepta FCM
+TAMANO_LOTE_FCM = 500
+
+_executor = None
+_workers = 0
+_lock = threading.RLock()
+_sdk_cargado = False
+_app = None
+_proximo_intento = 0.0  # time.monotonic() a partir del cual se reintenta inicializar la app
+_espera_reintento = 0.0
+_transporte = None
+
+
+class ResultadoLote(NamedTuple):
+    enviados: int
+    fallidos: int
+    invalidos: List[str]  # tokens que FCM reporta como no registrados/ inválidos
+    duracion_ms: int = 0
+
+
+def _cargar_sdk() -> bool:
+    """Importa firebase_admin una sola vez. False si no está instalado."""
+    global firebase_admin, credentials, messaging, _sdk_cargado
+    if not _sdk_cargado:
+        with _lock:
+            if not _sdk_cargado:
+                try:
+                    import firebase_admin as sdk
+                    from firebase_admin import credentials as sdk_credentials, messaging as sdk_messaging
+                    firebase_admin, credentials, messaging = sdk, sdk_credentials, sdk_messaging
+                except ImportError:  # pragma: no cover
+                    logger.warning("firebase_admin no está instalado. Ejecute 'pip install firebase-admin'.")
+                _sdk_cargado = True
+    return firebase_admin is not None
+
+
+def _crear_app() -> Optional["firebase_admin.App"]:
+    if not _cargar_sdk():
         return None
 
     if firebase_admin._apps:  # type: ignore[attr-defined]
@@ -60,21 +96,79 @@ def _initialize_firebase_app() -> Optional["firebase_admin.App"]:
     return None
 
 
-def _sanitize_tokens(tokens: Iterable[str]) -> List[str]:
+def _initialize_firebase_app() -> Optional["firebase_admin.App"]:
     """
-    Normaliza un iterable de tokens eliminando vacíos y duplicados.
+    Inicializa Firebase Admin SDK usando credenciales configuradas en variables de entorno.
+    - FIREBASE_CREDENTIALS_JSON: JSON del service account.
+    - FIREBASE_CREDENTIALS_FILE: Ruta al archivo JSON del service account.
+    La app se crea una vez por proceso. Si falla (credenciales ausentes o inválidas,
+    error de red) se reintenta tras PUSH_FIREBASE_REINTENTO segundos, duplicando la
+    espera en cada fallo hasta PUSH_FIREBASE_REINTENTO_MAX; mientras tanto retorna None.
+    """
+    global _app, _proximo_intento, _espera_reintento
+    if _app is None and time.monotonic() >= _proximo_intento:
+        with _lock:
+            if _app is None and time.monotonic() >= _proximo_intento:
+                _app = _crear_app()
+                if _app is None:
+                    minima = float(getattr(settings, "PUSH_FIREBASE_REINTENTO", 5))
+                    maxima = float(getattr(settings, "PUSH_FIREBASE_REINTENTO_MAX", 300))
+                    _espera_reintento = min(maxima, _espera_reintento * 2 if _espera_reintento else minima)
+                    _proximo_intento = time.monotonic() + _espera_reintento
+                    logger.warning("Firebase no disponible, próximo intento en %.0f s", _espera_reintento)
+                else:
+                    _espera_reintento = 0.0
+    return _app
+
+
+def precalentar() -> bool:
+    """
+    Importa el SDK e inicializa la app de Firebase por adelantado (al arrancar el
+    worker, ver PUSH_PRECALENTAR) para que el primer envío no pague ese costo.
+    """
+    inicio = time.perf_counter()
+    lista = _initialize_firebase_app() is not None
+    logger.info("Firebase precalentado en %.0f ms (app %s)", (time.perf_counter() - inicio) * 1000,
+                "lista" if lista else "no disponible")
+    return lista
+
+
+def precalentar_en_segundo_plano() -> None:
+    """
+    Lanza precalentar() en un thread si PUSH_PRECALENTAR está activo. Se llama desde
+    wsgi.py/asgi.py, es decir solo en los workers web (no en migrate, comandos ni tests).
+    """
+    if getattr(settings, "PUSH_PRECALENTAR", False):
+        threading.Thread(target=precalentar, name="push-precalentar", daemon=True).start()
+
+
+def _sanitize_tokens(tokens: Iterable[str], deduplicar: bool = True) -> Iterator[str]:
+    """
+    Normaliza un iterable de tokens eliminando vacíos y duplicados, sin
+    materializarlo. Con deduplicar=False (tokens ya únicos, p. ej. DISTINCT en
+    SQL) no se mantiene el set de vistos.
     """
-    if not tokens:
-        return []
     vistos = set()
-    resultado = []
-    for token in tokens:
+    for token in tokens or ():
         token_clean = (token or "").strip()
         if not token_clean or token_clean in vistos:
             continue
-        resultado.append(token_clean)
-        vistos.add(token_clean)
-    return resultado
+        if deduplicar:
+            vistos.add(token_clean)
+        yield token_clean
+
+
+def iterar_tokens(usuarios) -> Iterator[str]:
+    """
+    Tokens FCM de un queryset de usuarios leídos en streaming: solo la columna
+    fcm_token, sin vacíos y deduplicados con DISTINCT en la BD
+    (índices parciales usuario_fcm_token_idx / usuario_rol_fcm_token_idx).
+    """
+    return (
+        usuarios.exclude(fcm_token__isnull=True).exclude(fcm_token="")
+        .order_by().values_list("fcm_token", flat=True).distinct()
+        .iterator(chunk_size=TAMANO_LOTE_FCM * 4)
+    )
 
 
 def send_push_to_token(
@@ -87,71 +181,211 @@ def send_push_to_token(
     Envía una notificación push a un token específico.
     Retorna (éxito, detalle/respuesta).
     """
-    app = _initialize_firebase_app()
-    if not app or messaging is None:
+    transporte = obtener_transporte()
+    if not transporte.disponible():
         return False, "firebase_not_initialized"
 
     try:
-        message = messaging.Message(
-            token=token,
-            notification=messaging.Notification(title=title, body=body),
-            data={k: str(v) for k, v in (data or {}).items()},
-        )
-        response = messaging.send(message, app=app)
+        response = transporte.enviar(token, title, body, {k: str(v) for k, v in (data or {}).items()})
         logger.info("Notificación enviada a %s: %s", token, response)
         return True, response
     except Exception as exc:  # pragma: no cover
         logger.error("Error enviando push notification: %s", exc)
+        if transporte.token_invalido(exc):
+            limpiar_tokens_invalidos([token])
         return False, str(exc)
 
 
-def send_push_to_tokens(
+def _lotes(tokens: Iterable[str], tamano: int = TAMANO_LOTE_FCM) -> Iterator[List[str]]:
+    iterador = iter(tokens)
+    while True:
+        lote = list(itertools.islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def _pool() -> ThreadPoolExecutor:
+    """Pool compartido y acotado para los envíos por lote (PUSH_WORKERS threads)"""
+    global _executor, _workers
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _workers = int(getattr(settings, "PUSH_WORKERS", 8))
+                _executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="push")
+    return _executor
+
+
+def cantidad_workers() -> int:
+    """Threads del pool de envío (los del pool ya creado o, si aún no existe, PUSH_WORKERS)"""
+    return _workers if _executor is not None else int(getattr(settings, "PUSH_WORKERS", 8))
+
+
+class TransporteFCM:
+    """
+    Transporte real: Firebase Cloud Messaging vía firebase_admin.
+    Interfaz de un transporte (ver PUSH_TRANSPORTE y gestion/services/push_local.py):
+    - disponible() -> bool
+    - enviar(token, title, body, data) -> id del mensaje (lanza excepción si falla)
+    - enviar_multicast(tokens, title, body, data) -> [None | excepción] por token, en orden
+    - token_invalido(exc) -> bool
+    """
+
+    def disponible(self) -> bool:
+        return _initialize_firebase_app() is not None and messaging is not None
+
+    def enviar(self, token: str, title: str, body: str, data: Dict[str, str]) -> str:
+        message = messaging.Message(
+            token=token,
+            notification=messaging.Notification(title=title, body=body),
+            data=data,
+        )
+        return messaging.send(message, app=_initialize_firebase_app())
+
+    def enviar_multicast(self, tokens: List[str], title: str, body: str, data: Dict[str, str]) -> List[Optional[Exception]]:
+        multicast = messaging.MulticastMessage(
+            notification=messaging.Notification(title=title, body=body),
+            data=data,
+            tokens=tokens,
+        )
+        response = messaging.send_each_for_multicast(multicast, app=_initialize_firebase_app())
+        return [None if r.success else r.exception for r in response.responses]
+
+    def token_invalido(self, exc) -> bool:
+        """
+        True si el error indica que el token ya no sirve (app desinstalada, token de
+        otro proyecto o con formato inválido). Otros errores (cuota, servidor) no
+        descartan el token.
+        """
+        if messaging is None or exc is None:
+            return False
+        if isinstance(exc, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+            return True
+        codigo = getattr(exc, "code", "")
+        return codigo == "INVALID_ARGUMENT" and "registration token" in str(exc).lower()
+
+
+def obtener_transporte():
+    """Transporte configurado en PUSH_TRANSPORTE (ruta a la clase), instanciado una vez"""
+    global _transporte
+    if _transporte is None:
+        with _lock:
+            if _transporte is None:
+                ruta = getattr(settings, "PUSH_TRANSPORTE", "gestion.services.push_notifications.TransporteFCM")
+                _transporte = import_string(ruta)()
+    return _transporte
+
+
+def configurar_transporte(transporte) -> None:
+    """Reemplaza el transporte en uso (benchmarks y pruebas)"""
+    global _transporte
+    _transporte = transporte
+
+
+def _enviar_lote(transporte, tokens: List[str], title: str, body: str, payload_data: Dict[str, str]) -> ResultadoLote:
+    """Envía un lote de hasta 500 tokens (una respuesta por token, en el mismo orden)"""
+    inicio = time.perf_counter()
+    try:
+        errores = transporte.enviar_multicast(tokens, title, body, payload_data)
+    except Exception as exc:  # pragma: no cover
+        logger.error("Error enviando lote de %s notificaciones: %s", len(tokens), exc)
+        return ResultadoLote(0, len(tokens), [], int((time.perf_counter() - inicio) * 1000))
+    fallidos = sum(1 for exc in errores if exc is not None)
+    invalidos = [
+        token for token, exc in zip(tokens, errores)
+        if exc is not None and transporte.token_invalido(exc)
+    ]
+    if fallidos:
+        logger.debug("Lote de %s tokens con %s fallos (%s tokens inválidos)", len(tokens), fallidos, len(invalidos))
+    duracion_ms = int((time.perf_counter() - inicio) * 1000)
+    return ResultadoLote(len(tokens) - fallidos, fallidos, invalidos, duracion_ms)
+
+
+def limpiar_tokens_invalidos(tokens: List[str]) -> int:
+    """
+    Quita los tokens muertos de los usuarios con un único UPDATE para que no se
+    reintenten en cada envío. Retorna cuántos usuarios se actualizaron.
+    """
+    if not tokens:
+        return 0
+    actualizados = Usuario.objects.filter(fcm_token__in=tokens).update(fcm_token=None)
+    if actualizados:
+        # update() no dispara señales: registrar el cambio para los ETags de /usuarios/
+        incrementar_version(Usuario._meta.db_table)
+        logger.info("Tokens FCM inválidos eliminados: %s usuarios", actualizados)
+    return actualizados
+
+
+def enviar_por_lotes(
     tokens: Iterable[str],
     title: str,
     body: str,
     data: Optional[Dict[str, Any]] = None,
-) -> Tuple[int, int]:
+    deduplicar: bool = True,
+) -> Iterator[Tuple[int, ResultadoLote]]:
     """
-    Envía una notificación push a múltiples tokens.
-    Retorna (éxitos, fallidos).
+    Envía a todos los tokens en lotes de 500 (límite de FCM) en paralelo en el
+    pool de PUSH_WORKERS threads. Produce (número de lote, resultado) a medida
+    que terminan. Los tokens se consumen a medida que se arman los lotes (acepta
+    un iterator de la BD) y hay a lo sumo 2 * PUSH_WORKERS lotes en memoria.
+    No limpia los tokens inválidos (ver limpiar_tokens_invalidos).
     """
-    tokens_list = _sanitize_tokens(tokens)
-    if not tokens_list:
-        return 0, 0
+    lotes = enumerate(_lotes(_sanitize_tokens(tokens, deduplicar)), start=1)
+    primeros = list(itertools.islice(lotes, 2))
+    if not primeros:
+        return
 
-    app = _initialize_firebase_app()
-    if not app or messaging is None:
+    transporte = obtener_transporte()
+    if not transporte.disponible():
         logger.warning("Firebase Admin SDK no está inicializado. No se pueden enviar notificaciones masivas.")
-        return 0, len(tokens_list)
+        for numero, lote in itertools.chain(primeros, lotes):
+            yield numero, ResultadoLote(0, len(lote), [])
+        return
 
     payload_data = {k: str(v) for k, v in (data or {}).items()}
+    if len(primeros) == 1:
+        numero, lote = primeros[0]
+        yield numero, _enviar_lote(transporte, lote, title, body, payload_data)
+        return
 
-    try:
-        # Preferir MulticastMessage para eficiencia
-        multicast = messaging.MulticastMessage(
-            notification=messaging.Notification(title=title, body=body),
-            data=payload_data,
-            tokens=tokens_list,
-        )
-        response = messaging.send_multicast(multicast, app=app)
-        failed = sum(1 for r in response.responses if not r.success)
-        if failed:
-            logger.warning("Algunas notificaciones fallaron: %s fallos", failed)
-        return response.success_count, failed
-    except AttributeError:
-        # Implementación alternativa si la versión de firebase_admin no soporta send_multicast
-        successes = 0
-        failures = 0
-        for token in tokens_list:
-            ok, _ = send_push_to_token(token, title, body, data)
-            if ok:
-                successes += 1
-            else:
-                failures += 1
-        return successes, failures
-    except Exception as exc:  # pragma: no cover
-        logger.error("Error enviando notificaciones masivas: %s", exc)
-        return 0, len(tokens_list)
+    en_vuelo = {}
+    maximo = 2 * getattr(settings, "PUSH_WORKERS", 8)
+    pendientes = itertools.chain(primeros, lotes)
+    while True:
+        for numero, lote in itertools.islice(pendientes, maximo - len(en_vuelo)):
+            en_vuelo[_pool().submit(_enviar_lote, transporte, lote, title, body, payload_data)] = numero
+        if not en_vuelo:
+            return
+        terminados, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+        for futuro in terminados:
+            yield en_vuelo.pop(futuro), futuro.result()
+
+
+def send_push_to_tokens(
+    tokens: Iterable[str],
+    title: str,
+    body: str,
+    data: Optional[Dict[str, Any]] = None,
+    deduplicar: bool = True,
+) -> Tuple[int, int]:
+    """
+    Envía una notificación push a múltiples tokens (en lotes concurrentes, ver
+    enviar_por_lotes). Los tokens que FCM reporta como inválidos se borran de
+    sus usuarios al terminar.
+    Retorna (éxitos, fallidos).
+    """
+    resultados = [resultado for _, resultado in enviar_por_lotes(tokens, title, body, data, deduplicar)]
+    if not resultados:
+        return 0, 0
+
+    successes = sum(r.enviados for r in resultados)
+    failures = sum(r.fallidos for r in resultados)
+    limpiados = limpiar_tokens_invalidos([t for r in resultados for t in r.invalidos])
+    logger.info(
+        "Envío masivo: %s lotes, %s éxitos, %s fallos, %s tokens inválidos eliminados",
+        len(resultados), successes, failures, limpiados,
+    )
+    return successes, failures
 
 
 def send_push_to_usuario(
@@ -177,10 +411,13 @@ def send_push_to_usuarios(
     data: Optional[Dict[str, Any]] = None,
 ) -> Tuple[int, int]:
     """
-    Envía una notificación push a un conjunto de usuarios.
+    Envía una notificación push a un conjunto de usuarios. Con un QuerySet los
+    tokens se leen en streaming (iterar_tokens) en vez de cargar los usuarios.
     Retorna (éxitos, fallos).
     """
-    tokens = [getattr(u, "fcm_token", None) for u in usuarios]
+    if isinstance(usuarios, QuerySet):
+        return send_push_to_tokens(iterar_tokens(usuarios), title, body, data, deduplicar=False)
+    tokens = (getattr(u, "fcm_token", None) for u in usuarios)
     return send_push_to_tokens(tokens, title, body, data)
 
 
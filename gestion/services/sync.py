@@ -0,0 +1,148 @@
+"""
+Sincronización incremental del catálogo y el stock para la app móvil.
+Cada alta/modificación/baja de las tablas sincronizables se registra en
+CambioSync (ver signals.py); su id es el cursor. Un cliente pide
+`sync?since=<cursor>` y recibe solo las filas cambiadas, los ids eliminados
+y el cursor siguiente.
+
+Los cambios se registran al confirmar la transacción, así que el orden de los
+ids puede diferir del de visibilidad por unos milisegundos: el cursor devuelto
+solo avanza sobre cambios con más de SYNC_MARGEN_SEGUNDOS de antigüedad y los
+más recientes se reenvían en la siguiente llamada (el cliente los aplica como upsert).
+"""
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from gestion.models import CambioSync, Categoria, Producto, ProductoImagen, ProductoVariante, Stock
+from gestion.serializadores.categoria import CategoriaSerializer
+from gestion.serializadores.producto import ProductoSerializer, anotar_rango_precios
+from gestion.serializadores.producto_imagen import ProductoImagenSerializer
+from gestion.serializadores.producto_variante import ProductoVarianteSerializer
+from gestion.serializadores.stock import StockSerializer
+
+# Tabla sincronizable -> (modelo, queryset base, serializer). Mismas claves que /export/.
+TABLAS_SYNC = {
+    "categorias": (Categoria, lambda: Categoria.objects.all(), CategoriaSerializer),
+    "productos": (
+        Producto, lambda: anotar_rango_precios(Producto.objects.select_related("categoria")), ProductoSerializer,
+    ),
+    "producto_variantes": (
+        ProductoVariante, lambda: ProductoVariante.objects.select_related("producto"), ProductoVarianteSerializer,
+    ),
+    "producto_imagenes": (ProductoImagen, lambda: ProductoImagen.objects.all(), ProductoImagenSerializer),
+    "stocks": (
+        Stock, lambda: Stock.objects.select_related("producto_variante__producto", "sucursal"), StockSerializer,
+    ),
+}
+TABLA_POR_MODELO = {modelo: tabla for tabla, (modelo, _, _) in TABLAS_SYNC.items()}
+
+
+def _margen() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "SYNC_MARGEN_SEGUNDOS", 10)))
+
+
+def _lote_ids() -> int:
+    # SQLite limita la cantidad de parámetros por consulta
+    if connection.vendor == "sqlite":
+        return connection.features.max_query_params or 999
+    return 10000
+
+
+def registrar_cambio(tabla: str, objeto_id: int, eliminado: bool = False) -> None:
+    CambioSync.objects.create(tabla=tabla, objeto_id=objeto_id, eliminado=eliminado)
+
+
+def registrar_cambios(tabla: str, ids: Iterable[int], eliminado: bool = False) -> None:
+    """Registro masivo (importaciones y otras operaciones que no disparan señales)"""
+    CambioSync.objects.bulk_create(
+        (CambioSync(tabla=tabla, objeto_id=objeto_id, eliminado=eliminado) for objeto_id in ids),
+        batch_size=2000,
+    )
+
+
+def _cursor_estable(corte) -> int:
+    """Último id registrado antes de `corte` (todos los anteriores ya son visibles)"""
+    ultimo = CambioSync.objects.filter(creado_en__lte=corte).order_by("-id").values_list("id", flat=True).first()
+    return ultimo or 0
+
+
+def _serializar(tabla: str, ids: Optional[Iterable[int]] = None) -> List[Dict]:
+    _, queryset, serializer = TABLAS_SYNC[tabla]
+    if ids is None:
+        return serializer(queryset().order_by("id"), many=True).data
+    ids = sorted(ids)
+    filas = []
+    for i in range(0, len(ids), _lote_ids()):
+        grupo = ids[i:i + _lote_ids()]
+        filas.extend(serializer(queryset().filter(id__in=grupo).order_by("id"), many=True).data)
+    return filas
+
+
+def sincronizar(since: Optional[int], tablas: Iterable[str], limite: int) -> Dict:
+    """
+    Cambios posteriores a `since`:
+    { cursor, hay_mas, reinicio, cambios: {tabla: [filas]}, eliminados: {tabla: [ids]} }
+    Sin `since` (o con un cursor desconocido) se devuelven todas las filas y reinicio=True:
+    el cliente debe reemplazar su cache local.
+    """
+    tablas = [t for t in TABLAS_SYNC if t in set(tablas)]
+    corte = timezone.now() - _margen()
+    ultimo_id = CambioSync.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+    if since is None or since > ultimo_id:
+        # El cursor se toma antes de leer las filas: lo que cambie mientras tanto se reenvía
+        cursor = _cursor_estable(corte)
+        return {
+            "cursor": cursor,
+            "hay_mas": False,
+            "reinicio": True,
+            "cambios": {tabla: _serializar(tabla) for tabla in tablas},
+            "eliminados": {tabla: [] for tabla in tablas},
+        }
+
+    registros = list(
+        CambioSync.objects.filter(id__gt=since, tabla__in=tablas)
+        .order_by("id")
+        .values_list("id", "tabla", "objeto_id", "eliminado", "creado_en")[:limite]
+    )
+    hay_mas = len(registros) == limite
+    # Por objeto solo importa su último estado (modificado o eliminado)
+    estado = {(tabla, objeto_id): eliminado for _, tabla, objeto_id, eliminado, _ in registros}
+    # También con hay_mas: si ningún cambio de la página es estable el cursor no avanza
+    estables = [registro[0] for registro in registros if registro[4] <= corte]
+    cursor = estables[-1] if estables else since
+
+    cambiados = {tabla: set() for tabla in tablas}
+    eliminados = {tabla: [] for tabla in tablas}
+    for (tabla, objeto_id), eliminado in estado.items():
+        if eliminado:
+            eliminados[tabla].append(objeto_id)
+        else:
+            cambiados[tabla].add(objeto_id)
+
+    # Un cambio de variante también registra su producto (rango de precios), ver signals.py
+    return {
+        "cursor": cursor,
+        "hay_mas": hay_mas,
+        "reinicio": False,
+        "cambios": {tabla: _serializar(tabla, ids) if ids else [] for tabla, ids in cambiados.items()},
+        "eliminados": {tabla: sorted(ids) for tabla, ids in eliminados.items()},
+    }
+
+
+def compactar() -> int:
+    """
+    Elimina registros superados por uno posterior del mismo objeto (no cambia lo que
+    recibe ningún cliente: siempre verá el último). Retorna cuántos se eliminaron.
+    """
+    tabla = CambioSync._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {tabla} WHERE id NOT IN "
+            f"(SELECT MAX(id) FROM {tabla} GROUP BY tabla, objeto_id)"
+        )
+        return cursor.rowcount
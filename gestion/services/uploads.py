@@ -0,0 +1,177 @@
+"""
+Subidas reanudables de imágenes (iniciar -> agregar chunks -> finalizar).
+El estado vive en disco (IMAGEN_UPLOAD_DIR): <id>.part con los bytes recibidos
+y <id>.json con los metadatos, así cualquier worker del host puede continuar
+una subida y el offset actual es simplemente el tamaño del .part.
+"""
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+from uuid import uuid4
+
+from django.conf import settings
+
+from gestion.services.imagenes import (
+    ImagenDemasiadoGrande, ImagenInvalida, escribir_chunks, registrar_archivo, tamano_maximo,
+)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadNoEncontrado(Exception):
+    pass
+
+
+class OffsetIncorrecto(Exception):
+    def __init__(self, offset_actual: int):
+        super().__init__(f"offset esperado {offset_actual}")
+        self.offset_actual = offset_actual
+
+
+def _carpeta() -> str:
+    carpeta = str(getattr(settings, "IMAGEN_UPLOAD_DIR", os.path.join(settings.BASE_DIR, "uploads_parciales")))
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+def _rutas(upload_id: str):
+    if not _UPLOAD_ID.match(upload_id or ""):
+        raise UploadNoEncontrado(upload_id)
+    base = os.path.join(_carpeta(), upload_id)
+    return base + ".part", base + ".json"
+
+
+def _leer_meta(upload_id: str, usuario_id: Optional[int] = None) -> Dict:
+    """Metadatos de la subida; UploadNoEncontrado si no existe o es de otro usuario"""
+    part, meta = _rutas(upload_id)
+    try:
+        with open(meta, "r", encoding="utf-8") as fh:
+            datos = json.load(fh)
+    except FileNotFoundError:
+        raise UploadNoEncontrado(upload_id)
+    if usuario_id is not None and datos.get("usuario_id") not in (None, usuario_id):
+        raise UploadNoEncontrado(upload_id)
+    return datos
+
+
+@contextmanager
+def _bloqueado(upload_id: str, modo: int):
+    """Abre el .part con flock exclusivo (sin crearlo si ya no existe)"""
+    part, _ = _rutas(upload_id)
+    try:
+        fd = os.open(part, modo)
+    except FileNotFoundError:
+        raise UploadNoEncontrado(upload_id)
+    with os.fdopen(fd, "ab" if modo & os.O_APPEND else "rb") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        yield fh
+
+
+def descartar(upload_id: str) -> None:
+    for ruta in _rutas(upload_id):
+        if os.path.exists(ruta):
+            os.unlink(ruta)
+
+
+def limpiar_expirados() -> None:
+    """Elimina subidas abandonadas (más viejas que IMAGEN_UPLOAD_TTL segundos)"""
+    limite = time.time() - int(getattr(settings, "IMAGEN_UPLOAD_TTL", 24 * 60 * 60))
+    for nombre in os.listdir(_carpeta()):
+        ruta = os.path.join(_carpeta(), nombre)
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.unlink(ruta)
+        except OSError:
+            pass
+
+
+def iniciar(tamano: int, nombre: str = "", usuario_id: Optional[int] = None) -> Dict:
+    """Crea una subida vacía. `tamano` es el total en bytes que enviará el cliente."""
+    if tamano <= 0:
+        raise ImagenInvalida("tamano debe ser mayor a 0")
+    if tamano > tamano_maximo():
+        raise ImagenDemasiadoGrande(f"la imagen supera el máximo de {tamano_maximo()} bytes")
+    limpiar_expirados()
+    upload_id = uuid4().hex
+    part, meta = _rutas(upload_id)
+    open(part, "wb").close()
+    with open(meta, "w", encoding="utf-8") as fh:
+        json.dump({"tamano": tamano, "nombre": nombre, "creado": time.time(), "usuario_id": usuario_id}, fh)
+    return estado(upload_id)
+
+
+def estado(upload_id: str, usuario_id: Optional[int] = None) -> Dict:
+    meta = _leer_meta(upload_id, usuario_id)
+    part, _ = _rutas(upload_id)
+    try:
+        offset = os.path.getsize(part)
+    except FileNotFoundError:
+        raise UploadNoEncontrado(upload_id)
+    return {
+        "upload_id": upload_id,
+        "offset": offset,
+        "tamano": meta["tamano"],
+        "chunk_max": int(getattr(settings, "IMAGEN_CHUNK_MAX_BYTES", 1024 * 1024)),
+    }
+
+
+def agregar_chunk(upload_id: str, offset: int, chunks: Iterable[bytes], usuario_id: Optional[int] = None) -> Dict:
+    """
+    Agrega bytes al final de la subida si `offset` coincide con lo ya recibido
+    (si no, OffsetIncorrecto con el offset real para que el cliente reanude).
+    El primer chunk se valida por firma antes de persistir nada; si no es una
+    imagen la subida se descarta. Un chunk que supera un límite de tamaño
+    (ImagenDemasiadoGrande) no se guarda, pero la subida sigue: se puede reintentar
+    con chunks más chicos.
+    """
+    meta = _leer_meta(upload_id, usuario_id)
+    part, meta_path = _rutas(upload_id)
+    with _bloqueado(upload_id, os.O_WRONLY | os.O_APPEND) as fh:
+        if not os.path.exists(meta_path):
+            # Se finalizó mientras se esperaba el candado: el .part ya es la imagen registrada
+            raise UploadNoEncontrado(upload_id)
+        actual = os.path.getsize(part)
+        if offset != actual:
+            raise OffsetIncorrecto(actual)
+        try:
+            escritos = escribir_chunks(fh, chunks, ya_escritos=actual)
+        except ImagenDemasiadoGrande:
+            fh.truncate(actual)
+            raise
+        except ImagenInvalida:
+            fh.truncate(actual)
+            if actual == 0:
+                descartar(upload_id)
+            raise
+        if actual + escritos > meta["tamano"]:
+            fh.truncate(actual)
+            raise ImagenDemasiadoGrande("se recibieron más bytes que el tamano declarado")
+    return estado(upload_id)
+
+
+def finalizar(upload_id: str, usuario_id: Optional[int] = None) -> Dict:
+    """
+    Verifica que llegaron todos los bytes y registra la imagen (hash, dedup, miniaturas).
+    Con el mismo candado que agregar_chunk: un chunk en curso termina antes y
+    dos finalizaciones simultáneas no registran el archivo dos veces.
+    """
+    part, meta_path = _rutas(upload_id)
+    with _bloqueado(upload_id, os.O_RDONLY):
+        meta = _leer_meta(upload_id, usuario_id)
+        recibido = os.path.getsize(part)
+        if recibido != meta["tamano"]:
+            raise OffsetIncorrecto(recibido)
+        os.unlink(meta_path)
+        return registrar_archivo(part, nombre_original=meta.get("nombre") or "")
@@ -0,0 +1,43 @@
+from typing import Dict, Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from gestion.models import VersionTabla
+
+
+def incrementar_version(tabla: str) -> None:
+    """
+    Incrementa el contador de cambios de una tabla (UPDATE atómico en la BD,
+    compartido por todos los workers).
+    """
+    if VersionTabla.objects.filter(tabla=tabla).update(version=F("version") + 1):
+        return
+    try:
+        with transaction.atomic():
+            VersionTabla.objects.create(tabla=tabla, version=1)
+    except IntegrityError:
+        # Otro proceso creó la fila en paralelo
+        VersionTabla.objects.filter(tabla=tabla).update(version=F("version") + 1)
+
+
+def obtener_versiones(tablas: Iterable[str]) -> Dict[str, int]:
+    """
+    Versiones actuales de las tablas indicadas en una sola consulta.
+    Las tablas sin cambios registrados tienen versión 0.
+    """
+    tablas = list(tablas)
+    versiones = dict(
+        VersionTabla.objects.filter(tabla__in=tablas).values_list("tabla", "version")
+    )
+    return {tabla: versiones.get(tabla, 0) for tabla in tablas}
+
+
+async def aobtener_versiones(tablas: Iterable[str]) -> Dict[str, int]:
+    """obtener_versiones con el ORM async"""
+    tablas = list(tablas)
+    versiones = {
+        tabla: version
+        async for tabla, version in VersionTabla.objects.filter(tabla__in=tablas).values_list("tabla", "version")
+    }
+    return {tabla: versiones.get(tabla, 0) for tabla in tablas}
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from gestion.models import (
+    Categoria, Producto, ProductoVariante, ProductoImagen, Stock, ApiToken, VersionTabla, CambioSync,
+)
+from gestion.services.catalogo import invalidar_catalogo
+from gestion.services.producto_detalle import invalidar_producto
+from gestion.services.sync import TABLA_POR_MODELO, registrar_cambios
+from gestion.services.versiones import incrementar_version
+
+MODELOS_CATALOGO = (Categoria, Producto, ProductoVariante, ProductoImagen)
+# Modelos que no se exponen en listados (no necesitan versión para ETag)
+MODELOS_SIN_VERSION = (ApiToken, VersionTabla, CambioSync)
+
+
+class CambiosPendientes:
+    """
+    Efectos de los cambios de una transacción, acumulados y aplicados una sola
+    vez al confirmarla: un UPDATE de versión por tabla, un INSERT masivo en
+    CambioSync (último estado de cada fila) y una invalidación por cache.
+    """
+
+    def __init__(self):
+        self.tablas = set()
+        self.sync = {}
+        self.productos = set()
+        self.catalogo = False
+        self.aplicado = False  # ya ejecutado: los cambios siguientes van a otro acumulador
+
+    def __call__(self):
+        self.aplicado = True
+        por_tabla = {}
+        for (tabla, objeto_id), eliminado in self.sync.items():
+            por_tabla.setdefault((tabla, eliminado), []).append(objeto_id)
+        for (tabla, eliminado), ids in por_tabla.items():
+            registrar_cambios(tabla, ids, eliminado)
+        for tabla in sorted(self.tablas):
+            incrementar_version(tabla)
+        if self.catalogo:
+            invalidar_catalogo()
+        for producto_id in self.productos:
+            invalidar_producto(producto_id)
+
+
+def cambios_pendientes() -> CambiosPendientes:
+    """Acumulador de la transacción en curso (se registra en on_commit la primera vez)"""
+    conexion = transaction.get_connection()
+    if conexion.in_atomic_block:
+        # Si un savepoint revertido lo descartó, deja de estar en la lista y se crea otro
+        for _, funcion, _ in conexion.run_on_commit:
+            if isinstance(funcion, CambiosPendientes) and not funcion.aplicado:
+                return funcion
+    pendientes = CambiosPendientes()
+    if conexion.in_atomic_block:
+        transaction.on_commit(pendientes)
+    return pendientes
+
+
+def _aplicar_si_autocommit(pendientes: CambiosPendientes) -> None:
+    # Fuera de una transacción el cambio ya está confirmado: se aplica enseguida
+    if not transaction.get_connection().in_atomic_block:
+        pendientes()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidar_catalogo_en_cambio(sender, **kwargs):
+    """Cualquier cambio en el catálogo invalida el snapshot (al confirmar la transacción)"""
+    if sender in MODELOS_CATALOGO:
+        pendientes = cambios_pendientes()
+        pendientes.catalogo = True
+        _aplicar_si_autocommit(pendientes)
+
+
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+def invalidar_detalle_producto(sender, instance, **kwargs):
+    """
+    Un cambio de stock invalida solo el detalle de su producto (los cambios de
+    producto/variante/imagen ya invalidan el catálogo completo).
+    """
+    try:
+        # Normalmente la variante ya está cargada en la instancia (get_or_create, serializers)
+        producto_id = instance.producto_variante.producto_id
+    except ProductoVariante.DoesNotExist:
+        # Borrado en cascada de la variante: el catálogo ya se invalida por su lado
+        return
+    pendientes = cambios_pendientes()
+    pendientes.productos.add(producto_id)
+    _aplicar_si_autocommit(pendientes)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def incrementar_version_en_cambio(sender, **kwargs):
+    """Registra el cambio en la versión de la tabla (usada por los ETags), una vez por transacción"""
+    if sender._meta.app_label != "gestion" or sender in MODELOS_SIN_VERSION:
+        return
+    if sender.__module__ == "__fake__":
+        # Modelo histórico (RunPython de una migración): version_tabla puede no existir aún
+        return
+    pendientes = cambios_pendientes()
+    pendientes.tablas.add(sender._meta.db_table)
+    _aplicar_si_autocommit(pendientes)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def registrar_cambio_sync(sender, instance, signal, **kwargs):
+    """Alta/modificación/baja de una tabla sincronizable (cursor de /sync/)"""
+    tabla = TABLA_POR_MODELO.get(sender)
+    if tabla is None:
+        return
+    pendientes = cambios_pendientes()
+    # Por fila solo importa el último estado dentro de la transacción
+    pendientes.sync.pop((tabla, instance.pk), None)
+    pendientes.sync[(tabla, instance.pk)] = signal is post_delete
+    if sender is ProductoVariante:
+        # precio_min/precio_max/precio del producto dependen de sus variantes;
+        # si el producto se borra en la misma transacción su baja prevalece
+        pendientes.sync.setdefault(("productos", instance.producto_id), False)
+    _aplicar_si_autocommit(pendientes)
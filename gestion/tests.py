@@ -1,3 +1,1499 @@
-from django.test import TestCase
+import importlib.util
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from unittest import mock, skipIf, skipUnless
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from gestion.models import (
+    ApiToken, CambioSync, CampanaNotificacion, Categoria, Cliente, Producto, ProductoVariante, ResultadoLoteCampana,
+    Rol, Stock, Sucursal, Usuario, Venta, VentaDetalle, VersionTabla,
+)
+from gestion.renderizadores import ORJSONRenderer
+from gestion.serializadores.producto import ProductoSerializer, anotar_rango_precios
+from gestion.serializadores.venta import VentaSerializer
+from gestion.services import busqueda, campanas, imagenes, push_notifications
+from gestion.services import cache as cache_servicio
+from gestion.services.campanas import crear_campana, ejecutar_campana
+from gestion.services.clientes import ClienteYaVinculado, obtener_o_crear_cliente, vincular_cliente
+from gestion.services.push_local import TransporteLocal
+from gestion.vistas.auth import MeAsyncView
+from gestion.vistas.notificaciones import NotificacionGlobalAsyncView
+from gestion.vistas.reportes import ReporteResumenAsync
+from gestion.vistas.upload import servir_media
+
+
+try:
+    import psycopg_pool
+except ImportError:  # pragma: no cover
+    psycopg_pool = None
+
+# Variantes async (VISTAS_ASYNC) en las mismas rutas que las sync, para AsyncClient
+urlpatterns = [
+    path("auth/me/", MeAsyncView.as_view()),
+    path("reportes/resumen/", ReporteResumenAsync.as_view()),
+    path("notificaciones/enviar/", NotificacionGlobalAsyncView.as_view()),
+]
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests"}}
+
+
+def crear_usuario(email, rol="cliente", permisos=None, **extra):
+    """Usuario con su token de API. Retorna (usuario, cabecera Authorization)."""
+    rol, _ = Rol.objects.get_or_create(nombre=rol, defaults={"permisos": permisos or []})
+    usuario = Usuario.objects.create(nombre=email.split("@")[0], email=email, password_hash="x", rol=rol, **extra)
+    token = ApiToken.objects.create(usuario=usuario, key=f"tok-{email}")
+    return usuario, f"Token {token.key}"
+
+
+class ClienteEmailMigracionTests(TransactionTestCase):
+    """0004/0005: emails normalizados, duplicados fusionados y usuarios enlazados a su cliente"""
+
+    anterior = [("gestion", "0003_usuario_fcm_token")]
+    posterior = [("gestion", "0005_cliente_email_normalizado_uniq")]
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(destino)
+        return executor.loader.project_state(destino).apps
+
+    def tearDown(self):
+        # Volver al último estado para el resto de los tests
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfill_fusiona_duplicados_y_enlaza_usuarios(self):
+        apps = self.migrar(self.anterior)
+        Cliente = apps.get_model("gestion", "Cliente")
+        Venta = apps.get_model("gestion", "Venta")
+        Sucursal = apps.get_model("gestion", "Sucursal")
+        Rol = apps.get_model("gestion", "Rol")
+        Usuario = apps.get_model("gestion", "Usuario")
+        sucursal = Sucursal.objects.create(nombre="Centro")
+        principal = Cliente.objects.create(nombre="Ana", email=" Ana@Example.com ")
+        duplicado = Cliente.objects.create(nombre="Ana", email="ana@example.com", telefono="555")
+        Venta.objects.create(
+            cliente=duplicado, sucursal=sucursal, total=Decimal("10"), tipo_pago="contado", fecha=timezone.now(),
+        )
+        rol = Rol.objects.create(nombre="cliente")
+        ana = Usuario.objects.create(nombre="Ana", email="ANA@example.com", password_hash="x", rol=rol)
+        # Mismo email salvo mayúsculas: el Cliente solo puede enlazarse a uno
+        Usuario.objects.create(nombre="Ana 2", email="ana@Example.com", password_hash="x", rol=rol)
+
+        apps = self.migrar(self.posterior)
+        Cliente = apps.get_model("gestion", "Cliente")
+        Venta = apps.get_model("gestion", "Venta")
+        Usuario = apps.get_model("gestion", "Usuario")
+        cliente = Cliente.objects.get()
+        self.assertEqual(cliente.id, principal.id)
+        self.assertEqual(cliente.email, "ana@example.com")
+        self.assertEqual(cliente.telefono, "555")
+        self.assertEqual(Venta.objects.get().cliente_id, principal.id)
+        self.assertEqual(Usuario.objects.get(id=ana.id).cliente_id, principal.id)
+        self.assertIsNone(Usuario.objects.exclude(id=ana.id).get().cliente_id)
+
+
+class ClienteEmailTests(TestCase):
+    def test_email_unico_sin_distinguir_mayusculas(self):
+        cliente, creado = obtener_o_crear_cliente(" Ana@Example.com", "Ana")
+        self.assertTrue(creado)
+        self.assertEqual(cliente.email, "ana@example.com")
+        self.assertEqual(obtener_o_crear_cliente("ANA@example.com"), (cliente, False))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Cliente.objects.create(nombre="Otra", email="ANA@EXAMPLE.COM")
+
+    def test_registro_con_email_en_otras_mayusculas(self):
+        response = APIClient().post("/auth/register/", {"email": "Bob@x.com", "password": "x"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["email"], "bob@x.com")
+        response = APIClient().post("/auth/register/", {"email": " bob@X.com", "password": "y"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "email ya registrado")
+        self.assertEqual(Usuario.objects.count(), 1)
+        login = APIClient().post("/auth/login/", {"email": "BOB@x.com", "password": "x"}, format="json")
+        self.assertEqual(login.status_code, 200)
+
+    def test_vincular_cliente_ya_enlazado(self):
+        primero, _ = crear_usuario("bob@x.com")
+        vincular_cliente(primero)
+        # Cuenta previa a la normalización, con el mismo email en otras mayúsculas
+        segundo, _ = crear_usuario("Bob@x.com")
+        with self.assertRaises(ClienteYaVinculado):
+            vincular_cliente(segundo)
+        segundo.refresh_from_db()
+        self.assertIsNone(segundo.cliente_id)
+
+    def test_cliente_solo_ve_sus_ventas(self):
+        sucursal = Sucursal.objects.create(nombre="Centro")
+        propio = Cliente.objects.create(nombre="Ana", email="ana@example.com")
+        otro = Cliente.objects.create(nombre="Beto", email="beto@example.com")
+        for cliente in (propio, otro):
+            Venta.objects.create(
+                cliente=cliente, sucursal=sucursal, total=Decimal("10"), tipo_pago="contado", fecha=timezone.now(),
+            )
+        _, auth = crear_usuario("ana@example.com", cliente=propio)
+        response = APIClient().get("/ventas/", HTTP_AUTHORIZATION=auth)
+        self.assertEqual([v["cliente"] for v in response.json()["results"]], [propio.id])
+
+
+class PaginacionCursorTests(TestCase):
+    """Los listados del router se paginan por cursor con orden estable"""
+
+    @classmethod
+    def setUpTestData(cls):
+        sucursal = Sucursal.objects.create(nombre="Centro")
+        cliente = Cliente.objects.create(nombre="Ana", email="ana@example.com")
+        ahora = timezone.now()
+        # Fechas repetidas: el desempate por id mantiene el orden entre páginas
+        cls.ventas = [
+            Venta.objects.create(
+                cliente=cliente, sucursal=sucursal, total=Decimal("10"), tipo_pago="contado",
+                fecha=ahora - timedelta(days=i // 2),
+            )
+            for i in range(7)
+        ]
+
+    def recorrer(self, url):
+        client = APIClient()
+        ids = []
+        while url:
+            data = client.get(url).json()
+            ids.extend(v["id"] for v in data["results"])
+            url = data["next"]
+        return ids
+
+    def test_ventas_por_fecha_e_id_descendentes(self):
+        esperados = [v.id for v in sorted(self.ventas, key=lambda v: (v.fecha, v.id), reverse=True)]
+        self.assertEqual(self.recorrer("/ventas/?page_size=3"), esperados)
+
+    def test_pagina_por_defecto_y_cursor(self):
+        data = APIClient().get("/ventas/").json()
+        self.assertEqual(set(data), {"next", "previous", "results"})
+        self.assertEqual(len(data["results"]), 7)
+        self.assertIsNone(data["next"])
+
+    @override_settings(API_MAX_PAGE_SIZE=3)
+    def test_page_size_acotado(self):
+        data = APIClient().get("/ventas/?page_size=100").json()
+        self.assertEqual(len(data["results"]), 3)
+        self.assertIn("cursor=", data["next"])
+
+    def test_otros_listados_por_id(self):
+        Cliente.objects.bulk_create(Cliente(nombre=f"C{i}", email=f"c{i}@example.com") for i in range(4))
+        ids = self.recorrer("/clientes/?page_size=2")
+        self.assertEqual(ids, sorted(Cliente.objects.values_list("id", flat=True)))
+
+
+class ETagTests(TestCase):
+    """GET condicional: 304 mientras la tabla no cambie, ETag nuevo tras una escritura"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria = Categoria.objects.create(nombre="Vestidos")
+
+    def test_if_none_match_y_cambio_de_etag(self):
+        client = APIClient()
+        response = client.get("/categorias/")
+        etag = response["ETag"]
+        # Solo se lee la versión de la tabla, sin serializar
+        with self.assertNumQueries(1):
+            response = client.get("/categorias/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria.nombre = "Blusas"
+            self.categoria.save()
+        response = client.get("/categorias/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["results"][0]["nombre"], "Blusas")
+
+    def test_una_version_y_un_registro_por_transaccion(self):
+        version = VersionTabla.objects.get(tabla="categoria").version
+        cambios = CambioSync.objects.count()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                for i in range(20):
+                    self.categoria.nombre = f"Vestidos {i}"
+                    self.categoria.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(VersionTabla.objects.get(tabla="categoria").version, version + 1)
+        self.assertEqual(CambioSync.objects.count(), cambios + 1)
+
+    def test_savepoint_revertido_no_pierde_cambios_posteriores(self):
+        version = VersionTabla.objects.get(tabla="categoria").version
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        Categoria.objects.create(nombre="Temporal")
+                        raise IntegrityError
+                except IntegrityError:
+                    pass
+                Categoria.objects.create(nombre="Faldas")
+        self.assertEqual(VersionTabla.objects.get(tabla="categoria").version, version + 1)
+
+
+class CamposDinamicosTests(TestCase):
+    """?fields= y ?expand= recortan la respuesta y las columnas leídas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Vestidos")
+        producto = Producto.objects.create(categoria=categoria, nombre="Vestido", precio_base=Decimal("10"))
+        variante = ProductoVariante.objects.create(producto=producto, codigo="VES-1", talla="M", precio=Decimal("10"))
+        venta = Venta.objects.create(
+            cliente=Cliente.objects.create(nombre="Ana", email="ana@example.com"),
+            sucursal=Sucursal.objects.create(nombre="Centro"),
+            total=Decimal("10"), tipo_pago="contado", fecha=timezone.now(),
+        )
+        VentaDetalle.objects.create(
+            venta=venta, producto_variante=variante, cantidad=1, precio=Decimal("10"), subtotal=Decimal("10"),
+        )
+
+    def consulta_de(self, url, tabla):
+        """Respuesta y SQL de la consulta principal sobre `tabla`"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = APIClient().get(url)
+        sql = [q["sql"] for q in consultas if f'FROM "{tabla}"' in q["sql"]]
+        self.assertEqual(len(sql), 1)
+        return response, sql[0]
+
+    def test_fields_lee_solo_esas_columnas(self):
+        response, sql = self.consulta_de("/ventas/?fields=id,total", "venta")
+        self.assertEqual(list(response.json()["results"][0]), ["id", "total"])
+        self.assertIn('"venta"."total"', sql)
+        self.assertNotIn('"venta"."tipo_pago"', sql)
+        self.assertNotIn("JOIN", sql)
+
+    def test_expand_vacio_no_hace_join(self):
+        response, sql = self.consulta_de("/venta_detalles/?expand=", "venta_detalle")
+        fila = response.json()["results"][0]
+        self.assertIsInstance(fila["producto_variante"], int)
+        self.assertNotIn("JOIN", sql)
+
+        response, sql = self.consulta_de("/venta_detalles/?fields=id,producto_variante", "venta_detalle")
+        fila = response.json()["results"][0]
+        self.assertEqual(list(fila), ["id", "producto_variante"])
+        self.assertEqual(fila["producto_variante"]["nombre"], "Vestido")
+        self.assertIn("JOIN", sql)
+        self.assertNotIn('"venta_detalle"."subtotal"', sql)
+
+    def test_campos_desconocidos_se_ignoran(self):
+        response = APIClient().get("/ventas/?fields=id,no_existe")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()["results"][0]), ["id"])
+
+
+class ORJSONRendererTests(TestCase):
+    """El renderer con orjson produce los mismos bytes que el JSONRenderer de DRF"""
+
+    def test_misma_salida_que_drf(self):
+        venta = Venta.objects.create(
+            cliente=Cliente.objects.create(nombre="Ana", email="ana@example.com"),
+            sucursal=Sucursal.objects.create(nombre="Centro"),
+            total=Decimal("1234.50"), tipo_pago="contado", fecha=timezone.now(),
+        )
+        venta.refresh_from_db()
+        datos = [
+            VentaSerializer(venta).data,
+            # Valores crudos (agregaciones de reportes)
+            {"total": Decimal("10.5"), "fecha": venta.fecha, "dia": venta.fecha.date(), "texto": "ñandú \u2028"},
+        ]
+        for data in datos:
+            self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b'"total":"1234.50"', ORJSONRenderer().render(datos[0]))
+
+    def test_export_con_decimal_como_texto(self):
+        categoria = Categoria.objects.create(nombre="Vestidos")
+        Producto.objects.create(categoria=categoria, nombre="Vestido", precio_base=Decimal("10"))
+        _, auth = crear_usuario("admin@example.com", rol="admin")
+        response = APIClient().get("/export/productos/", HTTP_AUTHORIZATION=auth)
+        linea = b"".join(response.streaming_content).splitlines()[0]
+        self.assertIn(b'"precio_base":"10.00"', linea)
+
+
+class BusquedaProductosTests(TestCase):
+    """/productos/buscar/: ranking, acentos, SKU/código de barras y entradas raras"""
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Ropa")
+        cls.descripcion = Producto.objects.create(
+            categoria=categoria, nombre="Blusa", descripcion="Combina con un vestido", precio_base=Decimal("10"),
+        )
+        cls.nombre = Producto.objects.create(categoria=categoria, nombre="Vestido de fiesta", precio_base=Decimal("10"))
+        cls.acento = Producto.objects.create(categoria=categoria, nombre="Camisón algodón", precio_base=Decimal("10"))
+        ProductoVariante.objects.create(
+            producto=cls.descripcion, codigo="BLU-777", codigo_barras="7790001112223", precio=Decimal("10"),
+        )
+
+    def buscar(self, q):
+        response = APIClient().get("/productos/buscar/", {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return [p["id"] for p in response.json()["results"]]
+
+    def test_coincidencia_en_nombre_primero(self):
+        self.assertEqual(self.buscar("vestido"), [self.nombre.id, self.descripcion.id])
+
+    def test_sin_acentos_ni_mayusculas(self):
+        self.assertEqual(self.buscar("CAMISON ALGODON"), [self.acento.id])
+
+    def test_sku_y_codigo_de_barras(self):
+        self.assertEqual(self.buscar("blu-777"), [self.descripcion.id])
+        self.assertEqual(self.buscar("7790001112223"), [self.descripcion.id])
+
+    def test_entradas_sin_terminos(self):
+        for q in ('"', "", "  ", "*", "'; --"):
+            self.assertEqual(self.buscar(q), [])
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 solo en SQLite")
+    def test_operadores_fts5_no_se_interpretan(self):
+        for q in ('vestido"', "(vestido", "vestido*", "^vestido", "-vestido"):
+            self.assertIn(self.nombre.id, self.buscar(q))
+
+    def test_respaldo_icontains(self):
+        self.assertEqual(busqueda._buscar_icontains("vestido", ["vestido"], 20), [self.nombre.id, self.descripcion.id])
+        self.assertEqual(busqueda._buscar_icontains("777", ["777"], 20), [self.descripcion.id])
+
+
+class FiltrosTests(TestCase):
+    """Filtros por query param: lookups exactos, hasta inclusivo y 400 ante valores inválidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nombre="Ana", email="ana@example.com")
+        cls.centro = Sucursal.objects.create(nombre="Centro")
+        cls.norte = Sucursal.objects.create(nombre="Norte")
+        cls.hoy = timezone.localtime().replace(hour=12)
+        cls.venta_centro = Venta.objects.create(
+            cliente=cliente, sucursal=cls.centro, total=Decimal("10"), tipo_pago="contado", fecha=cls.hoy,
+            estado="completado",
+        )
+        cls.venta_norte = Venta.objects.create(
+            cliente=cliente, sucursal=cls.norte, total=Decimal("10"), tipo_pago="qr",
+            fecha=cls.hoy - timedelta(days=3), estado="pendiente",
+        )
+
+    def ids(self, url):
+        response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200)
+        return [v["id"] for v in response.json()["results"]]
+
+    def test_filtros_validos(self):
+        self.assertEqual(self.ids(f"/ventas/?sucursal={self.norte.id}"), [self.venta_norte.id])
+        self.assertEqual(self.ids("/ventas/?estado=pendiente"), [self.venta_norte.id])
+        hoy = self.hoy.date().isoformat()
+        # `hasta` incluye todo el día
+        self.assertEqual(self.ids(f"/ventas/?desde={hoy}&hasta={hoy}"), [self.venta_centro.id])
+
+    def test_valor_invalido_responde_400(self):
+        for url, parametro in (
+            ("/ventas/?sucursal=centro", "sucursal"),
+            ("/ventas/?desde=2026-13-01", "desde"),
+            ("/ventas/?hasta=ayer", "hasta"),
+            ("/stocks/?producto=1.5", "producto"),
+            ("/movimientos_stock/?desde=19/10/2026", "desde"),
+        ):
+            response = APIClient().get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn(parametro, response.json())
+
+    def test_parametro_vacio_no_filtra(self):
+        self.assertEqual(len(self.ids("/ventas/?sucursal=")), 2)
+
+
+class ExportTablaTests(TestCase):
+    """/export/<tabla>/: streaming por id, incremental, solo tablas listadas y con permiso"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categorias = [Categoria.objects.create(nombre=f"Categoría {i}") for i in range(5)]
+        _, cls.auth = crear_usuario("admin@example.com", rol="admin")
+
+    def exportar(self, url):
+        response = APIClient().get(url, HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_incremental(self):
+        filas = [json.loads(linea) for linea in self.exportar("/export/categorias/").splitlines()]
+        self.assertEqual([f["id"] for f in filas], [c.id for c in self.categorias])
+        desde = self.categorias[2].id
+        filas = [json.loads(linea) for linea in self.exportar(f"/export/categorias/?since_id={desde}&limit=1").splitlines()]
+        self.assertEqual([f["id"] for f in filas], [self.categorias[3].id])
+
+    def test_parametros_invalidos(self):
+        for query in ("limit=-1", "since_id=-5", "limit=abc"):
+            response = APIClient().get(f"/export/categorias/?{query}", HTTP_AUTHORIZATION=self.auth)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertEqual(response.json()["detail"], "since_id y limit deben ser enteros no negativos")
+
+    def test_csv(self):
+        lineas = self.exportar("/export/categorias/?formato=csv").splitlines()
+        self.assertEqual(lineas[0], "id,nombre,descripcion")
+        self.assertEqual(lineas[1], f"{self.categorias[0].id},Categoría 0,")
+        self.assertEqual(len(lineas), 6)
+
+    def test_columnas_sensibles_excluidas(self):
+        fila = json.loads(self.exportar("/export/usuarios/").splitlines()[0])
+        self.assertNotIn("password_hash", fila)
+        self.assertNotIn("fcm_token", fila)
+
+    def test_tablas_no_listadas(self):
+        for tabla in ("api_token", "cambio_sync", "version_tabla", "django_session"):
+            response = APIClient().get(f"/export/{tabla}/", HTTP_AUTHORIZATION=self.auth)
+            self.assertEqual(response.status_code, 404, tabla)
+
+    def test_sin_token_o_sin_permiso(self):
+        self.assertEqual(APIClient().get("/export/categorias/").status_code, 401)
+        _, auth = crear_usuario("vendedor@example.com", rol="vendedor")
+        response = APIClient().get("/export/categorias/", HTTP_AUTHORIZATION=auth)
+        self.assertEqual(response.status_code, 403)
+        _, auth = crear_usuario("bi@example.com", rol="bi", permisos=["export:leer"])
+        self.assertEqual(APIClient().get("/export/categorias/", HTTP_AUTHORIZATION=auth).status_code, 200)
+
+
+def imagen_png(ancho=1200, alto=800, color=(200, 30, 60)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (ancho, alto), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class MediaTemporalMixin:
+    """MEDIA_ROOT e IMAGEN_UPLOAD_DIR en un directorio temporal por test (miniaturas solo a pedido)"""
+
+    def setUp(self):
+        super().setUp()
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        self.media_root = os.path.join(carpeta, "media")
+        ajustes = override_settings(MEDIA_ROOT=self.media_root, IMAGEN_UPLOAD_DIR=os.path.join(carpeta, "parciales"))
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        miniaturas = mock.patch("gestion.services.imagenes.programar_miniaturas")
+        self.programar_miniaturas = miniaturas.start()
+        self.addCleanup(miniaturas.stop)
+
+    def archivos_en_products(self):
+        return sorted(
+            os.path.relpath(os.path.join(raiz, nombre), self.media_root)
+            for raiz, _, nombres in os.walk(os.path.join(self.media_root, "products")) for nombre in nombres
+        )
+
+
+class UploadImagenTests(MediaTemporalMixin, TestCase):
+    """Subida simple: almacenamiento por hash, miniaturas, rechazo temprano y cache inmutable"""
+
+    def subir(self, contenido, nombre="foto.png"):
+        return APIClient().post(
+            "/upload/image/", {"image": SimpleUploadedFile(nombre, contenido)}, format="multipart",
+        )
+
+    def test_mismo_contenido_se_guarda_una_vez(self):
+        contenido = imagen_png()
+        primera = self.subir(contenido)
+        self.assertEqual(primera.status_code, 201)
+        segunda = self.subir(contenido, "otra.png")
+        self.assertEqual(segunda.json()["hash"], primera.json()["hash"])
+        self.assertFalse(primera.json()["duplicada"])
+        self.assertTrue(segunda.json()["duplicada"])
+        h = primera.json()["hash"]
+        self.assertEqual(primera.json()["url"], f"/media/products/{h[:2]}/{h}.png")
+        self.assertEqual(self.archivos_en_products(), [f"products/{h[:2]}/{h}.png"])
+
+    def test_miniaturas(self):
+        h = self.subir(imagen_png()).json()["hash"]
+        original = os.path.join(self.media_root, "products", h[:2], f"{h}.png")
+        self.programar_miniaturas.assert_called_once_with(original)
+        self.assertEqual(imagenes.generar_miniaturas(original), 2 * len(imagenes.anchos_miniaturas()))
+        for ancho in imagenes.anchos_miniaturas():
+            for ext in ("webp", "jpg"):
+                with Image.open(os.path.join(self.media_root, "products", h[:2], f"{h}_w{ancho}.{ext}")) as img:
+                    self.assertEqual(img.size, (ancho, round(ancho * 2 / 3)))
+
+    def test_no_imagen_se_rechaza_sin_escribir(self):
+        for contenido in (b"%PDF-1.4 " + b"x" * 100000, b"GIF8", b""):
+            response = self.subir(contenido, "foto.jpg")
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.archivos_en_products(), [])
+
+    @override_settings(IMAGEN_MAX_BYTES=1000)
+    def test_tamano_maximo_mientras_llega(self):
+        # Declarado por debajo del corte por Content-Length: el límite se aplica mientras llega
+        response = self.subir(imagen_png(ancho=40, alto=40) + b"\0" * 20000)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("máximo", response.json()["detail"])
+        self.assertEqual(self.archivos_en_products(), [])
+
+    def test_cache_inmutable_para_urls_por_hash(self):
+        h = self.subir(imagen_png()).json()["hash"]
+        imagenes.generar_miniaturas(os.path.join(self.media_root, "products", h[:2], f"{h}.png"))
+        open(os.path.join(self.media_root, "products", "logo.png"), "wb").close()
+        request = RequestFactory().get("/")
+        for ruta, cache_control in (
+            (f"products/{h[:2]}/{h}.png", imagenes.CACHE_CONTROL_INMUTABLE),
+            (f"products/{h[:2]}/{h}_w160.webp", imagenes.CACHE_CONTROL_INMUTABLE),
+            ("products/logo.png", None),
+        ):
+            response = servir_media(request, ruta, document_root=self.media_root)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get("Cache-Control"), cache_control, ruta)
+
+
+class UploadReanudableTests(MediaTemporalMixin, TestCase):
+    """Subida por chunks: reanudación tras 409, dueño de la subida y finalización de un archivo corrupto"""
+
+    def setUp(self):
+        super().setUp()
+        _, auth = crear_usuario("vendedor@example.com", rol="vendedor")
+        self.client = APIClient(HTTP_AUTHORIZATION=auth)
+
+    def iniciar(self, tamano):
+        response = self.client.post("/upload/image/iniciar/", {"tamano": tamano, "nombre": "foto.png"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return f"/upload/image/{response.json()['upload_id']}/"
+
+    def enviar(self, url, offset, datos, client=None):
+        return (client or self.client).patch(
+            url, datos, content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_reanudar_tras_409(self):
+        contenido = imagen_png()
+        url = self.iniciar(len(contenido))
+        self.assertEqual(self.enviar(url, 0, contenido[:1000]).json()["offset"], 1000)
+        # El cliente perdió la respuesta y reintenta desde 0
+        response = self.enviar(url, 0, contenido[:1000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 1000)
+        offset = self.client.get(url).json()["offset"]
+        self.assertEqual(offset, 1000)
+        self.assertEqual(self.enviar(url, offset, contenido[offset:]).json()["offset"], len(contenido))
+        response = self.client.post(f"{url}finalizar/")
+        self.assertEqual(response.status_code, 201)
+        h = response.json()["hash"]
+        with open(os.path.join(self.media_root, "products", h[:2], f"{h}.png"), "rb") as fh:
+            self.assertEqual(fh.read(), contenido)
+        # Ya finalizada: no se puede seguir escribiendo
+        self.assertEqual(self.enviar(url, len(contenido), b"x").status_code, 404)
+
+    def test_finalizar_archivo_corrupto(self):
+        # Firma PNG válida y el resto basura: pasa los chunks pero no decodifica
+        contenido = imagen_png()[:16] + os.urandom(4000)
+        url = self.iniciar(len(contenido))
+        self.assertEqual(self.enviar(url, 0, contenido).status_code, 200)
+        response = self.client.post(f"{url}finalizar/")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.archivos_en_products(), [])
+
+    def test_finalizar_incompleta(self):
+        url = self.iniciar(5000)
+        self.enviar(url, 0, imagen_png()[:1000])
+        response = self.client.post(f"{url}finalizar/")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 1000)
+
+    @override_settings(IMAGEN_CHUNK_MAX_BYTES=1000, IMAGEN_MAX_BYTES=3000)
+    def test_limites_de_tamano_responden_413_y_no_descartan(self):
+        contenido = imagen_png(ancho=40, alto=40) + b"\0" * 2400  # relleno tras IEND: sigue siendo un PNG válido
+        response = self.client.post("/upload/image/iniciar/", {"tamano": 5000}, format="json")
+        self.assertEqual(response.status_code, 413)
+
+        url = self.iniciar(len(contenido))
+        # Primer chunk más grande que chunk_max (sin Content-Length que lo delate antes)
+        with mock.patch("gestion.vistas.upload._demasiado_grande", return_value=False):
+            response = self.enviar(url, 0, contenido[:1500])
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.client.get(url).json()["offset"], 0)
+        # La subida sigue viva: se completa con chunks más chicos
+        for offset in range(0, len(contenido), 1000):
+            self.assertEqual(self.enviar(url, offset, contenido[offset:offset + 1000]).status_code, 200)
+        # Más bytes que el tamano declarado
+        response = self.enviar(url, len(contenido), b"\0" * 10)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.client.post(f"{url}finalizar/").status_code, 201)
+
+    def test_no_imagen_descarta_la_subida(self):
+        url = self.iniciar(5000)
+        self.assertEqual(self.enviar(url, 0, b"%PDF-1.4 " + b"x" * 100).status_code, 415)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_requiere_token_del_mismo_usuario(self):
+        url = self.iniciar(5000)
+        anonimo = APIClient()
+        self.assertEqual(anonimo.post("/upload/image/iniciar/", {"tamano": 10}, format="json").status_code, 401)
+        self.assertEqual(anonimo.get(url).status_code, 401)
+        self.assertEqual(self.enviar(url, 0, b"x", client=anonimo).status_code, 401)
+        self.assertEqual(anonimo.post(f"{url}finalizar/").status_code, 401)
+        _, auth = crear_usuario("otro@example.com", rol="vendedor")
+        otro = APIClient(HTTP_AUTHORIZATION=auth)
+        self.assertEqual(otro.get(url).status_code, 404)
+        self.assertEqual(self.enviar(url, 0, imagen_png()[:100], client=otro).status_code, 404)
+
+
+class ImportCatalogoTests(TestCase):
+    """/import/catalogo/: upsert por SKU, validación completa antes de escribir, dry_run y permisos"""
+
+    COLUMNAS = "codigo,producto,categoria,precio,sucursal,cantidad,talla\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.centro = Sucursal.objects.create(nombre="Centro")
+        cls.norte = Sucursal.objects.create(nombre="Norte")
+        _, cls.auth = crear_usuario("admin@example.com", rol="admin")
+
+    def importar(self, filas, auth=None, dry_run=False):
+        archivo = SimpleUploadedFile("catalogo.csv", (self.COLUMNAS + filas).encode("utf-8"), "text/csv")
+        url = "/import/catalogo/?dry_run=1" if dry_run else "/import/catalogo/"
+        return APIClient().post(url, {"archivo": archivo}, format="multipart", HTTP_AUTHORIZATION=auth or self.auth)
+
+    def test_segunda_importacion_actualiza(self):
+        filas = (
+            "VES-M,Vestido,Vestidos,100,Centro,5,M\n"
+            f"VES-M,Vestido,Vestidos,100,{self.norte.id},2,M\n"
+            "VES-L,Vestido,Vestidos,110,Centro,1,L\n"
+        )
+        resumen = self.importar(filas).json()
+        self.assertEqual((resumen["productos_creados"], resumen["variantes_creadas"], resumen["stocks"]), (1, 2, 3))
+
+        resumen = self.importar("VES-M,Vestido,Vestidos,120,Centro,9,M\n").json()
+        self.assertEqual((resumen["variantes_creadas"], resumen["variantes_actualizadas"]), (0, 1))
+        variante = ProductoVariante.objects.get(codigo="VES-M")
+        self.assertEqual(variante.precio, Decimal("120"))
+        self.assertEqual(Producto.objects.count(), 1)
+        stock = dict(Stock.objects.filter(producto_variante=variante).values_list("sucursal_id", "cantidad"))
+        self.assertEqual(stock, {self.centro.id: 9, self.norte.id: 2})
+
+    def test_sku_y_sucursal_repetidos(self):
+        response = self.importar(
+            "VES-M,Vestido,Vestidos,100,Centro,5,M\n"
+            "VES-M,Vestido,Vestidos,100,Centro,3,M\n"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errores"], [{"fila": 3, "errores": ["SKU y sucursal repetidos (fila 2)"]}])
+        self.assertFalse(ProductoVariante.objects.exists())
+
+    def test_todos_los_errores_de_cada_fila(self):
+        response = self.importar(
+            "VES-M,Vestido,Vestidos,abc,Sur,-1,M\n"
+            "VES-L,Vestido,Vestidos,100,Oeste,1,L\n"
+            "VES-S,Vestido,Vestidos,100,Centro,1,S\n"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errores"], [
+            {"fila": 2, "errores": ["precio inválido", "cantidad no puede ser negativa", "sucursal Sur no existe"]},
+            {"fila": 3, "errores": ["sucursal Oeste no existe"]},
+        ])
+        self.assertFalse(ProductoVariante.objects.exists())
+
+    def test_limites_de_los_modelos(self):
+        response = self.importar(
+            f"{'C' * 51},{'P' * 201},{'K' * 101},1234567890123,Centro,1,{'T' * 21}\n"
+            "VES-M,Vestido,Vestidos,10.505,Centro,1,M\n"
+            f"VES-L,{'P' * 200},{'K' * 100},9999999999.99,Centro,1,{'T' * 20}\n"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errores"], [
+            {"fila": 2, "errores": [
+                "codigo supera 50 caracteres", "producto supera 200 caracteres", "categoria supera 100 caracteres",
+                "talla supera 20 caracteres", "precio admite hasta 10 enteros y 2 decimales",
+            ]},
+            {"fila": 3, "errores": ["precio admite hasta 10 enteros y 2 decimales"]},
+        ])
+        self.assertFalse(ProductoVariante.objects.exists())
+
+    def test_csv_malformado(self):
+        # Un campo más largo que csv.field_size_limit() hace fallar al lector
+        response = self.importar(f"VES-M,\"{'x' * 200000}\",Vestidos,10,Centro,1,M\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["detail"].startswith("CSV inválido"))
+
+    def test_dry_run_no_guarda(self):
+        response = self.importar("VES-M,Vestido,Vestidos,100,Centro,5,M\n", dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["dry_run"])
+        self.assertEqual(response.json()["variantes_creadas"], 1)
+        self.assertFalse(ProductoVariante.objects.exists())
+        self.assertFalse(Categoria.objects.exists())
+
+    def test_sin_token_o_sin_permiso(self):
+        self.assertEqual(self.importar("", auth="Token invalido").status_code, 401)
+        archivo = SimpleUploadedFile("catalogo.csv", self.COLUMNAS.encode(), "text/csv")
+        self.assertEqual(APIClient().post("/import/catalogo/", {"archivo": archivo}).status_code, 401)
+        _, auth = crear_usuario("vendedor@example.com", rol="vendedor")
+        self.assertEqual(self.importar("", auth=auth).status_code, 403)
+        _, auth = crear_usuario("carga@example.com", rol="carga", permisos=["import:escribir"])
+        self.assertEqual(self.importar("VES-M,Vestido,Vestidos,100,Centro,5,M\n", auth=auth).status_code, 200)
+
+
+@override_settings(SYNC_MARGEN_SEGUNDOS=0)
+class SyncTests(TestCase):
+    """/sync/: cursor, paginado con hay_mas, margen de estabilidad y bajas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.sucursal = Sucursal.objects.create(nombre="Centro")
+            categoria = Categoria.objects.create(nombre="Vestidos")
+            cls.producto = Producto.objects.create(categoria=categoria, nombre="Vestido", precio_base=Decimal("10"))
+            cls.variantes = [
+                ProductoVariante.objects.create(producto=cls.producto, codigo=f"VES-{i}", precio=Decimal(20 + i))
+                for i in range(2)
+            ]
+            for variante in cls.variantes:
+                Stock.objects.create(producto_variante=variante, sucursal=cls.sucursal, cantidad=3)
+
+    def sync(self, **params):
+        response = APIClient().get("/sync/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, filas):
+        return [fila["id"] for fila in filas]
+
+    def test_inicial_y_cursor(self):
+        data = self.sync()
+        self.assertTrue(data["reinicio"])
+        self.assertEqual(self.ids(data["cambios"]["producto_variantes"]), [v.id for v in self.variantes])
+        self.assertEqual(data["cursor"], CambioSync.objects.order_by("-id").first().id)
+
+        vacio = self.sync(since=data["cursor"])
+        self.assertFalse(vacio["reinicio"])
+        self.assertEqual(vacio["cursor"], data["cursor"])
+        self.assertFalse(any(vacio["cambios"].values()) or any(vacio["eliminados"].values()))
+
+    def test_cambio_de_variante_envia_su_producto(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            variante = self.variantes[1]
+            variante.precio = Decimal("99")
+            variante.save()
+        data = self.sync(since=cursor)
+        self.assertEqual(self.ids(data["cambios"]["producto_variantes"]), [variante.id])
+        productos = data["cambios"]["productos"]
+        self.assertEqual(self.ids(productos), [self.producto.id])
+        self.assertEqual(Decimal(str(productos[0]["precio_max"])), Decimal("99"))
+        self.assertGreater(data["cursor"], cursor)
+        self.assertFalse(any(self.sync(since=data["cursor"])["cambios"].values()))
+
+    def test_paginado_hay_mas(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                Stock.objects.create(
+                    producto_variante=self.variantes[0], sucursal=Sucursal.objects.create(nombre="Otra"), cantidad=1,
+                )
+        with override_settings(SYNC_MARGEN_SEGUNDOS=60):
+            # Página llena sin cambios estables: el cursor no avanza
+            data = self.sync(since=cursor, tablas="stocks", limit=2)
+            self.assertTrue(data["hay_mas"])
+            self.assertEqual(len(data["cambios"]["stocks"]), 2)
+            self.assertEqual(data["cursor"], cursor)
+            # Solo el primero de la página es estable: el cursor avanza hasta él y no más
+            primero = CambioSync.objects.filter(id__gt=cursor, tabla="stocks").order_by("id").first()
+            CambioSync.objects.filter(id=primero.id).update(creado_en=timezone.now() - timedelta(minutes=5))
+            data = self.sync(since=cursor, tablas="stocks", limit=2)
+            self.assertTrue(data["hay_mas"])
+            self.assertEqual(data["cursor"], primero.id)
+
+        recibidos, llamadas = [], 0
+        while True:
+            data = self.sync(since=cursor, tablas="stocks", limit=2)
+            llamadas += 1
+            recibidos += self.ids(data["cambios"]["stocks"])
+            self.assertGreater(data["cursor"], cursor)
+            cursor = data["cursor"]
+            if not data["hay_mas"]:
+                break
+        self.assertEqual(llamadas, 2)
+        self.assertEqual(sorted(recibidos), sorted(Stock.objects.filter(cantidad=1).values_list("id", flat=True)))
+
+    def test_margen_de_estabilidad(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.nombre = "Vestido largo"
+            self.producto.save()
+        with override_settings(SYNC_MARGEN_SEGUNDOS=60):
+            data = self.sync(since=cursor)
+            # Se envía, pero el cursor no lo cubre todavía: vuelve en la próxima llamada
+            self.assertEqual(self.ids(data["cambios"]["productos"]), [self.producto.id])
+            self.assertEqual(data["cursor"], cursor)
+            self.assertEqual(self.ids(self.sync(since=cursor)["cambios"]["productos"]), [self.producto.id])
+        self.assertGreater(self.sync(since=cursor)["cursor"], cursor)
+
+    def test_bajas(self):
+        cursor = self.sync()["cursor"]
+        variante_id = self.variantes[0].id
+        stock_id = Stock.objects.get(producto_variante_id=variante_id).id
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductoVariante.objects.get(id=variante_id).delete()
+        data = self.sync(since=cursor)
+        self.assertEqual(data["eliminados"]["producto_variantes"], [variante_id])
+        self.assertEqual(data["eliminados"]["stocks"], [stock_id])
+        # El producto sigue y cambió su rango de precios
+        self.assertEqual(self.ids(data["cambios"]["productos"]), [self.producto.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.get(id=self.producto.id).delete()
+        data = self.sync(since=data["cursor"])
+        self.assertEqual(data["eliminados"]["productos"], [self.producto.id])
+        self.assertEqual(data["eliminados"]["producto_variantes"], [self.variantes[1].id])
+        self.assertEqual(data["cambios"]["productos"], [])
+
+
+@override_settings(CACHES=CACHE_LOCAL, CACHE_TIMEOUT_MAXIMO=120)
+class CacheServicioTests(TestCase):
+    """Claves versionadas y single-flight de gestion/services/cache.py"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_acierto_y_fallo(self):
+        calcular = mock.Mock(return_value={"a": 1})
+        self.assertEqual(cache_servicio.obtener_o_calcular("k", calcular), {"a": 1})
+        self.assertEqual(cache_servicio.obtener_o_calcular("k", calcular), {"a": 1})
+        self.assertEqual(calcular.call_count, 1)
+
+        # Un None no se guarda: se vuelve a calcular
+        nada = mock.Mock(return_value=None)
+        cache_servicio.obtener_o_calcular("vacio", nada)
+        cache_servicio.obtener_o_calcular("vacio", nada)
+        self.assertEqual(nada.call_count, 2)
+
+    def test_entradas_con_ttl(self):
+        with mock.patch.object(cache, "set", wraps=cache.set) as guardar:
+            cache_servicio.obtener_o_calcular("k", lambda: 1, timeout=None)
+        self.assertEqual(guardar.call_args.kwargs["timeout"], 120)
+
+    def test_invalidacion(self):
+        primera = cache_servicio.clave("espacio", "x")
+        self.assertEqual(cache_servicio.clave("espacio", "x"), primera)
+        cache_servicio.invalidar("espacio")
+        segunda = cache_servicio.clave("espacio", "x")
+        self.assertNotEqual(segunda, primera)
+
+        # Con el contador perdido (cache reiniciado) no se reusa una versión anterior
+        cache.delete("espacio:version")
+        self.assertNotIn(cache_servicio.clave("espacio", "x"), (primera, segunda))
+        cache.delete("espacio:version")
+        cache_servicio.invalidar("espacio")
+        self.assertNotIn(cache_servicio.clave("espacio", "x"), (primera, segunda))
+
+    def test_single_flight_concurrente(self):
+        llamadas = []
+        empezado, liberar = threading.Event(), threading.Event()
+
+        def calcular():
+            llamadas.append(1)
+            empezado.set()
+            liberar.wait(5)
+            return "valor"
+
+        resultados = []
+        hilos = [
+            threading.Thread(target=lambda: resultados.append(cache_servicio.obtener_o_calcular("lento", calcular)))
+            for _ in range(8)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        self.assertTrue(empezado.wait(5))
+        # Mientras "lento" se calcula, otra clave no espera
+        self.assertEqual(cache_servicio.obtener_o_calcular("rapido", lambda: "otro"), "otro")
+        liberar.set()
+        for hilo in hilos:
+            hilo.join(5)
+        self.assertEqual(resultados, ["valor"] * 8)
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(cache_servicio._EN_VUELO, {})
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CatalogoSnapshotTests(TestCase):
+    """/catalogo/: snapshot pre-serializado en cache, nueva versión al cambiar el catálogo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.sucursal = Sucursal.objects.create(nombre="Centro")
+            categoria = Categoria.objects.create(nombre="Vestidos")
+            cls.producto = Producto.objects.create(categoria=categoria, nombre="Vestido", precio_base=Decimal("10"))
+            cls.variante = ProductoVariante.objects.create(producto=cls.producto, codigo="VES-1", precio=Decimal("25"))
+
+    def setUp(self):
+        cache.clear()
+
+    def catalogo(self):
+        response = APIClient().get("/catalogo/")
+        self.assertEqual(response.status_code, 200)
+        return response["X-Catalogo-Version"], json.loads(response.content)
+
+    def test_acierto_de_cache_sin_consultas(self):
+        with self.assertNumQueries(4):
+            version, data = self.catalogo()
+        self.assertEqual([p["id"] for p in data["productos"]], [self.producto.id])
+        self.assertEqual(data["productos"][0]["precio_max"], 25.0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.catalogo(), (version, data))
+
+    def test_cambio_de_producto_o_variante_invalida(self):
+        version, _ = self.catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.nombre = "Vestido largo"
+            self.producto.save()
+        nueva, data = self.catalogo()
+        self.assertNotEqual(nueva, version)
+        self.assertEqual(data["productos"][0]["nombre"], "Vestido largo")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variante.precio = Decimal("40")
+            self.variante.save()
+        ultima, data = self.catalogo()
+        self.assertNotEqual(ultima, nueva)
+        self.assertEqual(data["producto_variantes"][0]["precio"], "40.00")
+        self.assertEqual(data["productos"][0]["precio_max"], 40.0)
+
+    def test_cambio_de_stock_no_invalida(self):
+        # El snapshot no incluye stock: un movimiento invalida solo la ficha del producto
+        version, data = self.catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            Stock.objects.create(producto_variante=self.variante, sucursal=self.sucursal, cantidad=5)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.catalogo(), (version, data))
+
+
+class RangoPreciosTests(TestCase):
+    """Rango de precios de un producto: anotado en SQL o, sin anotar, con un aggregate"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            categoria = Categoria.objects.create(nombre="Vestidos")
+            cls.producto = Producto.objects.create(categoria=categoria, nombre="Vestido", precio_base=Decimal("15"))
+            for codigo, precio in (("VES-1", "30"), ("VES-2", "0"), ("VES-3", "12.50"), ("VES-4", "45")):
+                ProductoVariante.objects.create(producto=cls.producto, codigo=codigo, precio=Decimal(precio))
+            cls.sin_precio = Producto.objects.create(categoria=categoria, nombre="Falda", precio_base=Decimal("20"))
+            ProductoVariante.objects.create(producto=cls.sin_precio, codigo="FAL-1", precio=Decimal("0"))
+
+    def test_anotacion_ignora_precio_cero(self):
+        productos = {p.id: p for p in anotar_rango_precios(Producto.objects.select_related("categoria"))}
+        producto = productos[self.producto.id]
+        self.assertEqual((producto.variantes_precio_min, producto.variantes_precio_max), (Decimal("12.50"), Decimal("45")))
+        sin_precio = productos[self.sin_precio.id]
+        self.assertEqual((sin_precio.variantes_precio_min, sin_precio.variantes_precio_max), (None, None))
+
+        with self.assertNumQueries(0):
+            data = ProductoSerializer(producto).data
+            self.assertEqual((data["precio"], data["precio_min"], data["precio_max"]), (12.5, 12.5, 45.0))
+            # Sin variantes con precio se usa precio_base
+            data = ProductoSerializer(sin_precio).data
+            self.assertEqual((data["precio"], data["precio_min"], data["precio_max"]), (20.0, 20.0, 20.0))
+
+    def test_sin_anotar_usa_un_aggregate(self):
+        producto = Producto.objects.select_related("categoria").get(id=self.producto.id)
+        with self.assertNumQueries(1):
+            data = ProductoSerializer(producto).data
+        self.assertEqual((data["precio"], data["precio_min"], data["precio_max"]), (12.5, 12.5, 45.0))
+
+
+class ProductoDetalleTests(TestCase):
+    """Ficha de producto: consultas fijas al armarla, cero con cache y versión nueva tras un cambio"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Aplicar ya los efectos de estos cambios: si no, su acumulador queda pendiente toda la clase
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.categoria = Categoria.objects.create(nombre="Vestidos")
+            cls.sucursales = [Sucursal.objects.create(nombre=n) for n in ("Centro", "Norte")]
+
+    def setUp(self):
+        cache.clear()
+
+    def crear_producto(self, variantes):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = Producto.objects.create(categoria=self.categoria, nombre="Vestido", precio_base=Decimal("10"))
+            for i in range(variantes):
+                variante = ProductoVariante.objects.create(
+                    producto=producto, codigo=f"VES-{producto.id}-{i}", talla=str(i), precio=Decimal(10 + i),
+                )
+                for sucursal in self.sucursales:
+                    Stock.objects.create(producto_variante=variante, sucursal=sucursal, cantidad=i)
+        return producto
+
+    def test_consultas_constantes_y_cache(self):
+        for variantes in (1, 8):
+            producto = self.crear_producto(variantes)
+            url = f"/productos/{producto.id}/detalle/"
+            # Versión (2 lecturas de cache, sin BD) + producto, variantes, stock, imágenes y sucursales
+            with self.assertNumQueries(5):
+                data = APIClient().get(url).json()
+            self.assertEqual(len(data["variantes"]), variantes)
+            self.assertEqual(len(data["variantes"][-1]["stock"]), 2)
+            self.assertEqual(data["variantes"][-1]["stock_total"], 2 * (variantes - 1))
+            with self.assertNumQueries(0):
+                self.assertEqual(APIClient().get(url).json(), data)
+
+    def test_cambio_de_stock_invalida_solo_su_producto(self):
+        producto = self.crear_producto(2)
+        otro = self.crear_producto(1)
+        url = f"/productos/{producto.id}/detalle/"
+        version = APIClient().get(url)["X-Producto-Version"]
+        version_otro = APIClient().get(f"/productos/{otro.id}/detalle/")["X-Producto-Version"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for stock in Stock.objects.filter(producto_variante__producto=producto).select_related("producto_variante"):
+                stock.cantidad = 7
+                stock.save()
+        response = APIClient().get(url)
+        self.assertNotEqual(response["X-Producto-Version"], version)
+        self.assertEqual({s["cantidad"] for v in response.json()["variantes"] for s in v["stock"]}, {7})
+        self.assertEqual(APIClient().get(f"/productos/{otro.id}/detalle/")["X-Producto-Version"], version_otro)
+
+    def test_cambio_de_producto_invalida(self):
+        producto = self.crear_producto(1)
+        url = f"/productos/{producto.id}/detalle/"
+        APIClient().get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.nombre = "Vestido largo"
+            producto.save()
+        self.assertEqual(APIClient().get(url).json()["producto"]["nombre"], "Vestido largo")
+
+    def test_inexistente(self):
+        self.assertEqual(APIClient().get("/productos/999999/detalle/").status_code, 404)
+
+
+class VentaDetalleConsultasTests(TestCase):
+    """La venta con sus líneas se sirve con un número de consultas que no depende de las líneas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Vestidos")
+        cls.sucursal = Sucursal.objects.create(nombre="Centro")
+        cls.cliente = Cliente.objects.create(nombre="Ana", email="ana@example.com")
+        cls.variantes = []
+        for i in range(10):
+            producto = Producto.objects.create(categoria=categoria, nombre=f"Vestido {i}", precio_base=Decimal("10"))
+            cls.variantes.append(
+                ProductoVariante.objects.create(producto=producto, codigo=f"VES-{i}", talla="M", precio=Decimal("10"))
+            )
+
+    def crear_venta(self, lineas):
+        venta = Venta.objects.create(
+            cliente=self.cliente, sucursal=self.sucursal, total=Decimal("10") * lineas,
+            tipo_pago="contado", fecha=timezone.now(),
+        )
+        for variante in self.variantes[:lineas]:
+            VentaDetalle.objects.create(
+                venta=venta, producto_variante=variante, cantidad=1, precio=variante.precio, subtotal=variante.precio,
+            )
+        return venta
+
+    def test_detalle_de_venta_con_consultas_constantes(self):
+        client = APIClient()
+        for lineas in (1, 10):
+            venta = self.crear_venta(lineas)
+            # venta (con cliente y sucursal) + líneas (con variante y producto)
+            with self.assertNumQueries(2):
+                response = client.get(f"/ventas/{venta.id}/detalle/")
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(data["cliente_nombre"], "Ana")
+            self.assertEqual(len(data["detalles"]), lineas)
+            self.assertEqual(data["detalles"][0]["producto_variante"]["nombre"], "Vestido 0")
+
+    def test_listado_de_detalles_sin_n_mas_1(self):
+        self.crear_venta(10)
+        client = APIClient()
+        # ETag (versiones) + página de detalles con variante y producto
+        with self.assertNumQueries(2):
+            response = client.get("/venta_detalles/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 10)
+
+
+class CampanaDestinatariosTests(TestCase):
+    """Los destinatarios se leen en streaming, deduplicados en SQL, y los tokens inválidos se podan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        vendedor = Rol.objects.create(nombre="vendedor")
+        cliente = Rol.objects.create(nombre="cliente")
+        usuarios = []
+        for i in range(1200):
+            # Tokens repetidos (mismo dispositivo en dos cuentas) y usuarios sin token
+            token = "" if i % 10 == 0 else f"tok-{i % 1000}"
+            usuarios.append(Usuario(
+                nombre=f"U{i}", email=f"u{i}@example.com", password_hash="x",
+                rol=vendedor if i < 100 else cliente, fcm_token=token,
+            ))
+        Usuario.objects.bulk_create(usuarios)
+
+    def setUp(self):
+        self.transporte = TransporteLocal(latencia_ms=0, latencia_token_ms=0, tasa_invalidos=0.05, tasa_errores=0)
+        anterior = push_notifications.obtener_transporte()
+        push_notifications.configurar_transporte(self.transporte)
+        self.addCleanup(push_notifications.configurar_transporte, anterior)
+
+    def test_campana_envia_una_vez_por_token(self):
+        tokens = set(Usuario.objects.exclude(fcm_token="").values_list("fcm_token", flat=True))
+        invalidos = {t for t in tokens if self.transporte.es_invalido(t)}
+        campana = ejecutar_campana(crear_campana("Hola", "Mensaje", {}, [], None).id)
+        self.assertEqual(campana.estado, "finalizada")
+        self.assertEqual(self.transporte.tokens, len(tokens))
+        self.assertEqual(campana.total_destinatarios, len(tokens))
+        self.assertEqual(campana.total_lotes, 2)
+        self.assertEqual(campana.tokens_invalidos, len(invalidos))
+        self.assertFalse(Usuario.objects.filter(fcm_token__in=invalidos).exists())
+
+    def test_campana_por_rol(self):
+        campana = ejecutar_campana(crear_campana("Hola", "Mensaje", {}, ["vendedor"], None).id)
+        self.assertEqual(campana.total_destinatarios, 90)
+        self.assertEqual(self.transporte.tokens, 90)
+
+    def test_cantidad_workers(self):
+        with mock.patch.multiple(push_notifications, _executor=None, _workers=0), override_settings(PUSH_WORKERS=3):
+            self.assertEqual(push_notifications.cantidad_workers(), 3)
+            pool = push_notifications._pool()
+            self.addCleanup(pool.shutdown)
+            with override_settings(PUSH_WORKERS=5):
+                # El pool ya existe: se informa su tamaño real
+                self.assertEqual(push_notifications.cantidad_workers(), 3)
+
+
+class PoolConexionesSettingsTests(TestCase):
+    """Configuración del pool de psycopg en settings.py según las variables de entorno"""
+
+    def cargar_settings(self, sin=(), **entorno):
+        ruta = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sistema_boutique", "settings.py")
+        spec = importlib.util.spec_from_file_location("settings_pool_prueba", ruta)
+        modulo = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(os.environ, entorno):
+            for variable in sin:
+                os.environ.pop(variable, None)
+            spec.loader.exec_module(modulo)
+        return modulo
+
+    def test_sin_pool(self):
+        modulo = self.cargar_settings(DB_POOL="False")
+        base = modulo.DATABASES["default"]
+        self.assertFalse(modulo.DB_POOL)
+        self.assertNotIn("pool", base["OPTIONS"])
+        self.assertEqual(base["CONN_MAX_AGE"], 60)
+        self.assertTrue(base["CONN_HEALTH_CHECKS"])
+
+    @skipIf(psycopg_pool is not None, "psycopg-pool instalado")
+    def test_sin_psycopg_pool_pedido_explicitamente(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "psycopg-pool"):
+            self.cargar_settings(DB_POOL="True")
+
+    @skipIf(psycopg_pool is not None, "psycopg-pool instalado")
+    def test_sin_psycopg_pool_por_defecto_usa_conexiones_persistentes(self):
+        modulo = self.cargar_settings(sin=("DB_POOL",))
+        self.assertFalse(modulo.DB_POOL)
+        self.assertNotIn("pool", modulo.DATABASES["default"]["OPTIONS"])
+        self.assertEqual(modulo.DATABASES["default"]["CONN_MAX_AGE"], 60)
+
+    @skipUnless(psycopg_pool is not None, "requiere psycopg-pool")
+    def test_pool_desde_entorno(self):
+        modulo = self.cargar_settings(
+            DB_POOL="True", DB_POOL_MIN_SIZE="1", DB_POOL_MAX_SIZE="4", DB_POOL_TIMEOUT="2.5",
+            DB_POOL_MAX_IDLE="60", DB_POOL_MAX_LIFETIME="600",
+        )
+        base = modulo.DATABASES["default"]
+        self.assertTrue(modulo.DB_POOL)
+        self.assertEqual(base["CONN_MAX_AGE"], 0)  # Django rechaza pool con conexiones persistentes
+        self.assertEqual(base["OPTIONS"]["sslmode"], "require")
+        self.assertEqual(base["OPTIONS"]["pool"], {
+            "min_size": 1, "max_size": 4, "timeout": 2.5, "max_idle": 60.0, "max_lifetime": 600.0,
+        })
+
+
+class CampanaRecuperacionTests(TestCase):
+    """Campañas que quedaron a medias por un reinicio del worker"""
+
+    def campana(self, estado, minutos, lotes=0):
+        campana = crear_campana("Hola", "Mensaje", {}, [], None, total=0)
+        hace = timezone.now() - timedelta(minutes=minutos)
+        CampanaNotificacion.objects.filter(id=campana.id).update(estado=estado, creada_en=hace, actualizada_en=hace)
+        for numero in range(lotes):
+            ResultadoLoteCampana.objects.create(campana=campana, numero=numero, tokens=500, enviados=490, fallidos=10)
+        return campana
+
+    def test_enviando_sin_progreso_queda_interrumpida(self):
+        abandonada = self.campana("enviando", 30, lotes=2)
+        activa = self.campana("enviando", 1)
+        salida = io.StringIO()
+        with self.assertLogs(campanas.logger, "WARNING"):
+            call_command("recuperar_campanas", "--minutos", "15", stdout=salida)
+        self.assertIn("1 campañas interrumpidas, 0 reencoladas", salida.getvalue())
+
+        abandonada.refresh_from_db()
+        self.assertEqual(abandonada.estado, "interrumpida")
+        self.assertIsNotNone(abandonada.finalizada_en)
+        self.assertEqual((abandonada.total_lotes, abandonada.enviados, abandonada.fallidos), (2, 980, 20))
+        activa.refresh_from_db()
+        self.assertEqual(activa.estado, "enviando")
+
+    def test_pendiente_vieja_se_reencola_una_vez(self):
+        vieja = self.campana("pendiente", 30)
+        self.campana("pendiente", 1)
+        with mock.patch.object(campanas, "encolar_campana") as encolar, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(campanas.recuperar_campanas(timedelta(minutes=15)), (0, 1))
+        encolar.assert_called_once_with(vieja.id)
+
+        # Encolada dos veces (p. ej. por dos workers): solo la primera ejecución envía
+        transporte = TransporteLocal(latencia_ms=0, latencia_token_ms=0, tasa_invalidos=0, tasa_errores=0)
+        anterior = push_notifications.obtener_transporte()
+        push_notifications.configurar_transporte(transporte)
+        self.addCleanup(push_notifications.configurar_transporte, anterior)
+        Usuario.objects.create(
+            nombre="U", email="u@example.com", password_hash="x", rol=Rol.objects.create(nombre="cliente"), fcm_token="tok-1",
+        )
+        self.assertEqual(ejecutar_campana(vieja.id).estado, "finalizada")
+        with self.assertLogs(campanas.logger, "WARNING"):
+            ejecutar_campana(vieja.id)
+        self.assertEqual(transporte.tokens, 1)
+
+    @override_settings(CAMPANAS_TIMEOUT_MINUTOS=15)
+    def test_consultar_campana_abandonada_la_interrumpe(self):
+        abandonada = self.campana("enviando", 30, lotes=1)
+        activa = self.campana("enviando", 1)
+        _, auth = crear_usuario("admin@example.com", rol="admin")
+        with self.assertLogs(campanas.logger, "WARNING"):
+            response = APIClient().get(f"/notificaciones/campanas/{abandonada.id}/", HTTP_AUTHORIZATION=auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["estado"], response.json()["enviados"]), ("interrumpida", 490))
+        response = APIClient().get(f"/notificaciones/campanas/{activa.id}/", HTTP_AUTHORIZATION=auth)
+        self.assertEqual(response.json()["estado"], "enviando")
+
+    def test_pool_de_campanas_se_crea_una_vez(self):
+        self.addCleanup(setattr, campanas, "_executor", campanas._executor)
+        campanas._executor = None
+        barrera = threading.Barrier(8)
+        creados = []
+
+        def pool(*args, **kwargs):
+            creados.append(1)
+            return mock.Mock()
+
+        def encolar():
+            barrera.wait()
+            campanas.encolar_campana(1)
+
+        with mock.patch.object(campanas, "ThreadPoolExecutor", side_effect=pool):
+            hilos = [threading.Thread(target=encolar) for _ in range(8)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        self.assertEqual(len(creados), 1)
+
+
+@override_settings(PUSH_PRECALENTAR=True)
+class PrecalentarTests(SimpleTestCase):
+    """Firebase se precalienta solo en los workers web, no en cada proceso que carga Django"""
+
+    def test_solo_desde_el_punto_de_entrada(self):
+        with mock.patch.object(push_notifications.threading, "Thread") as thread:
+            apps.get_app_config("gestion").ready()
+            thread.assert_not_called()
+            push_notifications.precalentar_en_segundo_plano()
+        thread.assert_called_once_with(target=push_notifications.precalentar, name="push-precalentar", daemon=True)
+        thread.return_value.start.assert_called_once_with()
+
+        with override_settings(PUSH_PRECALENTAR=False), \
+                mock.patch.object(push_notifications.threading, "Thread") as thread:
+            push_notifications.precalentar_en_segundo_plano()
+        thread.assert_not_called()
+
+
+class ErrorFCM(Exception):
+    def __init__(self, code, mensaje):
+        super().__init__(mensaje)
+        self.code = code
+
+
+class TokensInvalidosTests(TestCase):
+    """Qué errores de FCM descartan un token y cómo se borran de los usuarios"""
+
+    def setUp(self):
+        # Mismas clases de error que firebase_admin.messaging (no se instala en los tests)
+        class UnregisteredError(ErrorFCM):
+            pass
+
+        class SenderIdMismatchError(ErrorFCM):
+            pass
+
+        patcher = mock.patch.object(push_notifications, "messaging", mock.Mock(
+            UnregisteredError=UnregisteredError, SenderIdMismatchError=SenderIdMismatchError,
+        ))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.errores = push_notifications.messaging
+
+    def test_token_invalido(self):
+        transporte = push_notifications.TransporteFCM()
+        descartan = [
+            self.errores.UnregisteredError("NOT_FOUND", "Requested entity was not found."),
+            self.errores.SenderIdMismatchError("PERMISSION_DENIED", "SenderId mismatch"),
+            ErrorFCM("INVALID_ARGUMENT", "The registration token is not a valid FCM registration token"),
+        ]
+        conservan = [
+            None,
+            ErrorFCM("INVALID_ARGUMENT", "Invalid JSON payload received"),
+            ErrorFCM("RESOURCE_EXHAUSTED", "Quota exceeded for registration token"),
+            ErrorFCM("UNAVAILABLE", "The server is temporarily unavailable"),
+            ErrorFCM("INTERNAL", "Internal error"),
+        ]
+        for exc in descartan:
+            self.assertTrue(transporte.token_invalido(exc), exc)
+        for exc in conservan:
+            self.assertFalse(transporte.token_invalido(exc), exc)
+
+    def test_limpiar_tokens_invalidos(self):
+        muerto, _ = crear_usuario("muerto@example.com", fcm_token="tok-muerto")
+        vivo, _ = crear_usuario("vivo@example.com", fcm_token="tok-vivo")
+        self.assertEqual(push_notifications.limpiar_tokens_invalidos([]), 0)
+        version = VersionTabla.objects.filter(tabla="usuario").values_list("version", flat=True).first() or 0
+
+        self.assertEqual(push_notifications.limpiar_tokens_invalidos(["tok-muerto", "tok-desconocido"]), 1)
+        muerto.refresh_from_db()
+        vivo.refresh_from_db()
+        self.assertIsNone(muerto.fcm_token)
+        self.assertEqual(vivo.fcm_token, "tok-vivo")
+        # update() no dispara señales: la versión de usuario (ETags) se incrementa a mano
+        self.assertEqual(VersionTabla.objects.get(tabla="usuario").version, version + 1)
+
+        self.assertEqual(push_notifications.limpiar_tokens_invalidos(["tok-muerto"]), 0)
+        self.assertEqual(VersionTabla.objects.get(tabla="usuario").version, version + 1)
+
+
+@override_settings(PUSH_FIREBASE_REINTENTO=5, PUSH_FIREBASE_REINTENTO_MAX=12)
+class FirebaseReintentoTests(TestCase):
+    """Un fallo al inicializar Firebase no queda cacheado: se reintenta con espera exponencial"""
+
+    def setUp(self):
+        patcher = mock.patch.multiple(push_notifications, _app=None, _proximo_intento=0.0, _espera_reintento=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ahora = 1000.0
+        reloj = mock.patch.object(push_notifications.time, "monotonic", side_effect=lambda: self.ahora)
+        reloj.start()
+        self.addCleanup(reloj.stop)
+
+    def test_reintenta_con_espera(self):
+        app = object()
+        with mock.patch.object(push_notifications, "_crear_app", side_effect=[None, None, None, app]) as crear, \
+                self.assertLogs(push_notifications.logger, "WARNING"):
+            self.assertIsNone(push_notifications._initialize_firebase_app())
+            self.ahora += 4
+            self.assertIsNone(push_notifications._initialize_firebase_app())
+            self.assertEqual(crear.call_count, 1)  # dentro de la espera no se reintenta
+
+            for espera in (5, 10, 12):  # se duplica hasta el máximo
+                self.ahora += espera
+                resultado = push_notifications._initialize_firebase_app()
+            self.assertIs(resultado, app)
+            self.assertEqual(crear.call_count, 4)
+
+            self.ahora += 1000
+            self.assertIs(push_notifications._initialize_firebase_app(), app)
+            self.assertEqual(crear.call_count, 4)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+@mock.patch("gestion.vistas.notificaciones.encolar_campana")
+@mock.patch("gestion.vistas.notificaciones.programar_campana")
+class VistasAsyncTests(TestCase):
+    """Las variantes async (ASGI) responden lo mismo que las sync, errores incluidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            _, cls.admin = crear_usuario("admin@example.com", rol="admin", fcm_token="tok-admin")
+            _, cls.cliente = crear_usuario("cliente@example.com", fcm_token="tok-cliente")
+            sucursal = Sucursal.objects.create(nombre="Centro")
+            cliente = Cliente.objects.create(nombre="Ana", email="ana@example.com")
+            for total, canal in ((Decimal("10.50"), "tienda"), (Decimal("4"), "online")):
+                Venta.objects.create(
+                    cliente=cliente, sucursal=sucursal, total=total, tipo_pago="contado", canal_venta=canal,
+                    estado="completado", estado_pago="pagado", fecha=timezone.now(),
+                )
+            categoria = Categoria.objects.create(nombre="Vestidos")
+            producto = Producto.objects.create(categoria=categoria, nombre="Vestido", precio_base=Decimal("10"))
+            variante = ProductoVariante.objects.create(producto=producto, codigo="VES-1", precio=Decimal("10"))
+            Stock.objects.create(producto_variante=variante, sucursal=sucursal, cantidad=2)
+
+    def ambas(self, metodo, url, auth=None, **kwargs):
+        """(respuesta sync, respuesta async) del mismo request"""
+        headers = {"Authorization": auth} if auth else {}
+        cache.clear()
+        sincrona = getattr(self.client, metodo)(url, headers=headers, **kwargs)
+        cache.clear()  # que la async calcule en vez de leer lo que guardó la sync
+        with override_settings(ROOT_URLCONF=__name__):
+            asincrona = async_to_sync(getattr(self.async_client, metodo))(url, headers=headers, **kwargs)
+            # resolver_match es perezoso: resolver dentro del override
+            self.assertIn(asincrona.resolver_match.func.view_class, [p.callback.view_class for p in urlpatterns])
+        self.assertEqual(asincrona.status_code, sincrona.status_code, url)
+        return sincrona, asincrona
+
+    def test_auth_me(self, *_):
+        for auth, esperado in ((self.admin, 200), (None, 401), ("Token desconocido", 401)):
+            sincrona, asincrona = self.ambas("get", "/auth/me/", auth)
+            self.assertEqual(sincrona.status_code, esperado)
+            if esperado == 200:
+                self.assertEqual(asincrona.json(), sincrona.json())
+
+    def test_reporte_resumen(self, *_):
+        sincrona, asincrona = self.ambas("get", "/reportes/resumen/")
+        self.assertEqual(sincrona.status_code, 200)
+        self.assertEqual(asincrona.json(), sincrona.json())
+        self.assertEqual(asincrona.json()["ventas"]["count"], 2)
+
+    def test_notificaciones_enviar(self, programar, encolar):
+        envio = {"titulo": "Hola", "mensaje": "Promo"}
+        for auth, esperado in ((None, 401), (self.cliente, 403)):
+            sincrona, asincrona = self.ambas("post", "/notificaciones/enviar/", auth, data=envio,
+                                             content_type="application/json")
+            self.assertEqual(sincrona.status_code, esperado)
+            self.assertEqual(asincrona.json(), sincrona.json())
+
+        sincrona, asincrona = self.ambas("post", "/notificaciones/enviar/", self.admin, data=envio,
+                                         content_type="application/json")
+        self.assertEqual(sincrona.status_code, 202)
+        datos_sync, datos_async = sincrona.json(), asincrona.json()
+        self.assertNotEqual(datos_async.pop("campana"), datos_sync.pop("campana"))
+        self.assertEqual(datos_async, datos_sync)
+        self.assertEqual(datos_sync["total"], 2)
+        self.assertEqual(programar.call_count + encolar.call_count, 2)
+
+        sincrona, asincrona = self.ambas("post", "/notificaciones/enviar/", self.admin, data={"titulo": "x"},
+                                         content_type="application/json")
+        self.assertEqual(sincrona.status_code, 400)
+        self.assertEqual(asincrona.json(), sincrona.json())
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
@@ -17,10 +18,14 @@ from gestion.vistas.rol import RolViewSet
 from gestion.vistas.usuario import UsuarioViewSet
 from gestion.vistas.reportes import (
     ReporteResumen,
+    ReporteResumenAsync,
     VentasPorDia,
+    VentasPorDiaAsync,
     TopProductos,
     MixPago,
+    MixPagoAsync,
     StockBajo,
+    StockBajoAsync,
     ExportResumenPDF,
     ExportResumenExcel,
     PronosticoVentas,
@@ -30,11 +35,23 @@ from gestion.vistas.auth import (
     RegisterView,
     LogoutView,
     MeView,
+    MeAsyncView,
     BootstrapView,
     SetFcmTokenView,
 )
-from gestion.vistas.upload import UploadImageView
-from gestion.vistas.notificaciones import NotificacionGlobalView
+from gestion.vistas.upload import UploadImageView, UploadIniciarView, UploadChunkView, UploadFinalizarView
+from gestion.vistas.notificaciones import NotificacionGlobalView, NotificacionGlobalAsyncView, CampanaNotificacionView
+from gestion.vistas.catalogo import CatalogoView
+from gestion.vistas.busqueda import BusquedaProductosView
+from gestion.vistas.export import ExportTablaView
+from gestion.vistas.importacion import ImportCatalogoView
+from gestion.vistas.sync import SyncView
+
+
+def _vista(sincrona, asincrona):
+    """Con VISTAS_ASYNC (despliegue ASGI) se sirve la variante async de la vista"""
+    return asincrona.as_view() if getattr(settings, 'VISTAS_ASYNC', False) else sincrona.as_view()
+
 
 router = DefaultRouter()
 router.register(r'categorias', CategoriaViewSet)
@@ -53,14 +70,18 @@ router.register(r'usuarios', UsuarioViewSet)
 
 urlpatterns = [
     # Endpoints de reportes (agregaciones)
-    path('reportes/resumen/', ReporteResumen.as_view(), name='reporte-resumen'),
-    path('reportes/ventas-por-dia/', VentasPorDia.as_view(), name='reporte-ventas-por-dia'),
+    path('reportes/resumen/', _vista(ReporteResumen, ReporteResumenAsync), name='reporte-resumen'),
+    path('reportes/ventas-por-dia/', _vista(VentasPorDia, VentasPorDiaAsync), name='reporte-ventas-por-dia'),
     path('reportes/top-productos/', TopProductos.as_view(), name='reporte-top-productos'),
-    path('reportes/mix-pago/', MixPago.as_view(), name='reporte-mix-pago'),
-    path('reportes/stock-bajo/', StockBajo.as_view(), name='reporte-stock-bajo'),
+    path('reportes/mix-pago/', _vista(MixPago, MixPagoAsync), name='reporte-mix-pago'),
+    path('reportes/stock-bajo/', _vista(StockBajo, StockBajoAsync), name='reporte-stock-bajo'),
     path('reportes/export/pdf/', ExportResumenPDF.as_view(), name='reporte-export-pdf'),
     path('reportes/export/excel/', ExportResumenExcel.as_view(), name='reporte-export-excel'),
     path('reportes/pronostico/', PronosticoVentas.as_view(), name='reporte-pronostico'),
+    # Catálogo pre-serializado (tienda y POS)
+    path('catalogo/', CatalogoView.as_view(), name='catalogo'),
+    # Búsqueda de productos
+    path('productos/buscar/', BusquedaProductosView.as_view(), name='productos-buscar'),
     # POS
     path('ventas/pos_checkout/', POSCheckout.as_view(), name='pos-checkout'),
     path('ventas/online_checkout/', OnlineCheckout.as_view(), name='online-checkout'),
@@ -69,13 +90,21 @@ urlpatterns = [
     path('auth/login/', LoginView.as_view(), name='auth-login'),
     path('auth/register/', RegisterView.as_view(), name='auth-register'),
     path('auth/logout/', LogoutView.as_view(), name='auth-logout'),
-    path('auth/me/', MeView.as_view(), name='auth-me'),
+    path('auth/me/', _vista(MeView, MeAsyncView), name='auth-me'),
     path('auth/set-fcm-token/', SetFcmTokenView.as_view(), name='auth-set-fcm-token'),
     path('auth/bootstrap/', BootstrapView.as_view(), name='auth-bootstrap'),
+    # Exportación masiva en streaming (NDJSON/CSV)
+    path('export/<str:tabla>/', ExportTablaView.as_view(), name='export-tabla'),
+    path('import/catalogo/', ImportCatalogoView.as_view(), name='import-catalogo'),
+    path('sync/', SyncView.as_view(), name='sync'),
     # Notificaciones push
-    path('notificaciones/enviar/', NotificacionGlobalView.as_view(), name='notificaciones-enviar'),
-    # Uploads (solo dev)
+    path('notificaciones/enviar/', _vista(NotificacionGlobalView, NotificacionGlobalAsyncView), name='notificaciones-enviar'),
+    path('notificaciones/campanas/<int:campana_id>/', CampanaNotificacionView.as_view(), name='notificaciones-campana'),
+    # Uploads de imágenes (simple y reanudable por chunks)
     path('upload/image/', UploadImageView.as_view(), name='upload-image'),
+    path('upload/image/iniciar/', UploadIniciarView.as_view(), name='upload-image-iniciar'),
+    path('upload/image/<str:upload_id>/', UploadChunkView.as_view(), name='upload-image-chunk'),
+    path('upload/image/<str:upload_id>/finalizar/', UploadFinalizarView.as_view(), name='upload-image-finalizar'),
     # Router (al final para evitar que tome rutas como ventas/<pk>=pos_checkout)
     path('', include(router.urls)),
 ]
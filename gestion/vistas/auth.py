@@ -1,10 +1,67 @@
 from django.utils.crypto import get_random_string
 from django.db import transaction
 from django.contrib.auth.hashers import make_password, check_password
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from gestion.models import Usuario, Rol, ApiToken, Cliente
+from gestion.models import Usuario, Rol, ApiToken
+from gestion.renderizadores import respuesta_json
+from gestion.services.clientes import ClienteYaVinculado, normalizar_email, vincular_cliente
+
+
+def token_de_request(request):
+    """Clave de la cabecera `Authorization: Token <clave>` (None si no viene)"""
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Token "):
+        return None
+    return auth.split(" ", 1)[1].strip()
+
+
+def usuario_de_token(request):
+    """Usuario (con rol) dueño del token del request. None si no hay o no existe."""
+    token = token_de_request(request)
+    if not token:
+        return None
+    tok = ApiToken.objects.select_related("usuario__rol").filter(key=token).first()
+    return tok.usuario if tok else None
+
+
+def usuario_tiene_permiso(usuario: Usuario, permiso: str) -> bool:
+    """Admin, comodín "*" o el permiso indicado en el rol del usuario"""
+    if not usuario or not usuario.rol:
+        return False
+    if (usuario.rol.nombre or "").strip().lower() == "admin":
+        return True
+    permisos = usuario.rol.permisos or []
+    if isinstance(permisos, str):
+        permisos = [permisos]
+    if isinstance(permisos, list):
+        permisos_normalizados = {str(p).strip().lower() for p in permisos}
+        return "*" in permisos_normalizados or permiso in permisos_normalizados
+    return False
+
+
+def autorizar(request, permiso=None, detalle="sin permisos"):
+    """
+    Usuario del token del request con (opcionalmente) `permiso`.
+    Retorna (usuario, None) o (None, respuesta 401/403 con `detalle`).
+    """
+    usuario = usuario_de_token(request)
+    if usuario is None:
+        return None, Response({"detail": "no autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
+    if permiso is not None and not usuario_tiene_permiso(usuario, permiso):
+        return None, Response({"detail": detalle}, status=status.HTTP_403_FORBIDDEN)
+    return usuario, None
+
+
+async def ausuario_de_token(request):
+    """Usuario (con rol) dueño del token del request, con el ORM async. None si no hay o no existe."""
+    token = token_de_request(request)
+    if not token:
+        return None
+    tok = await ApiToken.objects.select_related("usuario__rol").filter(key=token).afirst()
+    return tok.usuario if tok else None
 
 
 def build_user_payload(usuario: Usuario):
@@ -24,23 +81,28 @@ class RegisterView(APIView):
     def post(self, request):
         data = request.data or {}
         nombre = data.get("nombre") or data.get("name") or ""
-        email = data.get("email")
+        email = normalizar_email(data.get("email"))
         password = data.get("password")
         rol_nombre = (data.get("rol") or data.get("role") or "cliente").lower()
         if not email or not password:
             return Response({"detail": "email y password son requeridos"}, status=status.HTTP_400_BAD_REQUEST)
-        rol, _ = Rol.objects.get_or_create(nombre=rol_nombre, defaults={"permisos": []})
-        if Usuario.objects.filter(email=email).exists():
+        # Sin distinguir mayúsculas, igual que la unicidad de Cliente.email
+        if Usuario.objects.filter(email__iexact=email).exists():
             return Response({"detail": "email ya registrado"}, status=status.HTTP_400_BAD_REQUEST)
+        rol, _ = Rol.objects.get_or_create(nombre=rol_nombre, defaults={"permisos": []})
         user = Usuario.objects.create(
             nombre=nombre or email.split("@")[0],
             email=email,
             password_hash=make_password(password),
             rol=rol,
         )
-        # Si es cliente, generar un Cliente (para relacionar ventas)
+        # Si es cliente, generar y enlazar un Cliente (para relacionar ventas)
         if rol_nombre == "cliente":
-            Cliente.objects.get_or_create(email=email, defaults={"nombre": nombre or email})
+            try:
+                vincular_cliente(user, nombre or email)
+            except ClienteYaVinculado:
+                transaction.set_rollback(True)
+                return Response({"detail": "email ya registrado"}, status=status.HTTP_400_BAD_REQUEST)
         return Response(build_user_payload(user), status=status.HTTP_201_CREATED)
 
 
@@ -51,9 +113,10 @@ class LoginView(APIView):
         password = data.get("password")
         if not email or not password:
             return Response({"detail": "email y password son requeridos"}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            user = Usuario.objects.select_related("rol").get(email=email)
-        except Usuario.DoesNotExist:
+        # Los emails se guardan normalizados; cuentas previas pueden diferir en mayúsculas
+        candidatos = list(Usuario.objects.select_related("rol").filter(email__iexact=normalizar_email(email)))
+        user = next((u for u in candidatos if u.email == email), candidatos[0] if candidatos else None)
+        if user is None:
             return Response({"detail": "credenciales inválidas"}, status=status.HTTP_400_BAD_REQUEST)
         # Entorno de prueba: aceptar hash válido O coincidencia directa en texto plano
         if not (check_password(password, user.password_hash) or user.password_hash == password):
@@ -67,15 +130,20 @@ class LoginView(APIView):
 
 class MeView(APIView):
     def get(self, request):
-        auth = request.headers.get("Authorization", "")
-        if not auth.startswith("Token "):
-            return Response({"detail": "no autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
-        token = auth.split(" ", 1)[1].strip()
-        try:
-            tok = ApiToken.objects.select_related("usuario__rol").get(key=token)
-        except ApiToken.DoesNotExist:
-            return Response({"detail": "no autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
-        return Response(build_user_payload(tok.usuario), status=status.HTTP_200_OK)
+        usuario, error = autorizar(request)
+        if error is not None:
+            return error
+        return Response(build_user_payload(usuario), status=status.HTTP_200_OK)
+
+
+class MeAsyncView(View):
+    """MeView con el ORM async (ASGI, ver VISTAS_ASYNC)"""
+
+    async def get(self, request):
+        usuario = await ausuario_de_token(request)
+        if usuario is None:
+            return respuesta_json({"detail": "no autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
+        return respuesta_json(build_user_payload(usuario))
 
 
 class LogoutView(APIView):
@@ -112,7 +180,7 @@ class BootstrapView(APIView):
                 rol=Rol.objects.get(nombre=rol),
             )
             if rol == "cliente":
-                Cliente.objects.get_or_create(email=email, defaults={"nombre": name})
+                vincular_cliente(u, name)
             return True
         if ensure_user("admin@demo.com", "Admin Demo", "admin", "admin123"):
             created.append("admin@demo.com")
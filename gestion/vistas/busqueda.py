@@ -0,0 +1,28 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from gestion.models import Producto
+from gestion.serializadores.producto import ProductoSerializer, anotar_rango_precios
+from gestion.services.busqueda import buscar_productos
+
+
+class BusquedaProductosView(APIView):
+    """
+    Búsqueda de productos por nombre, descripción, SKU o código de barras
+    (sin distinguir acentos ni mayúsculas), ordenada por relevancia.
+    Params: ?q=<texto>&limit=20 (máx. 100)
+    """
+    def get(self, request):
+        q = request.query_params.get("q", "")
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        ids = buscar_productos(q, limit)
+        productos = anotar_rango_precios(
+            Producto.objects.select_related("categoria").filter(id__in=ids)
+        )
+        por_id = {p.id: p for p in productos}
+        ordenados = [por_id[i] for i in ids if i in por_id]
+        data = ProductoSerializer(ordenados, many=True, context={"request": request}).data
+        return Response({"q": q, "results": data})
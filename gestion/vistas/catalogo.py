@@ -0,0 +1,17 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+
+from gestion.services.catalogo import obtener_catalogo
+
+
+class CatalogoView(APIView):
+    """
+    Catálogo completo para tienda y POS en una sola respuesta:
+    { categorias, productos, producto_variantes, producto_imagenes }
+    Se sirve pre-serializado desde cache; se regenera solo cuando cambia el catálogo.
+    """
+    def get(self, request):
+        version, contenido = obtener_catalogo()
+        response = HttpResponse(contenido, content_type="application/json")
+        response["X-Catalogo-Version"] = str(version)
+        return response
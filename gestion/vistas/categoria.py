@@ -1,7 +1,8 @@
 from rest_framework import viewsets
 from gestion.models import Categoria
 from gestion.serializadores.categoria import CategoriaSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
@@ -1,7 +1,8 @@
 from rest_framework import viewsets
 from gestion.models import Cliente
 from gestion.serializadores.cliente import ClienteSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = Cliente.objects.all().order_by('nombre')
     serializer_class = ClienteSerializer
@@ -0,0 +1,92 @@
+import csv
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from gestion.models import (
+    Categoria, Producto, ProductoVariante, ProductoImagen, Sucursal, Stock,
+    MovimientoStock, Cliente, Venta, VentaDetalle, Pago, Rol, Usuario,
+)
+from gestion.renderizadores import dumps
+from gestion.vistas.auth import autorizar
+
+# Tablas exportables -> (modelo, columnas excluidas)
+TABLAS_EXPORT = {
+    "categorias": (Categoria, ()),
+    "productos": (Producto, ()),
+    "producto_variantes": (ProductoVariante, ()),
+    "producto_imagenes": (ProductoImagen, ()),
+    "sucursales": (Sucursal, ()),
+    "stocks": (Stock, ()),
+    "movimientos_stock": (MovimientoStock, ()),
+    "clientes": (Cliente, ()),
+    "ventas": (Venta, ()),
+    "venta_detalles": (VentaDetalle, ()),
+    "pagos": (Pago, ()),
+    "roles": (Rol, ()),
+    "usuarios": (Usuario, ("password_hash", "fcm_token")),
+}
+
+
+class _Eco:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla"""
+    def write(self, value):
+        return value
+
+
+def _filas_ndjson(filas):
+    for fila in filas:
+        # Decimal como string, igual que la API (no como float)
+        yield dumps(fila, decimal_como_texto=True) + b"\n"
+
+
+def _filas_csv(columnas, filas):
+    writer = csv.writer(_Eco())
+    yield writer.writerow(columnas)
+    for fila in filas:
+        yield writer.writerow([fila[c] for c in columnas])
+
+
+class ExportTablaView(APIView):
+    """
+    Exportación masiva en streaming para sincronización (BI).
+    GET /export/<tabla>/?formato=ndjson|csv&since_id=<id>&limit=<n>
+    - Filas en orden de id, leídas con cursor del lado del servidor (memoria acotada).
+    - since_id: solo filas con id > since_id (pull incremental; usar el último id recibido).
+    Requiere token de un usuario admin o con permiso "export:leer".
+    """
+    def get(self, request, tabla):
+        _, error = autorizar(request, "export:leer", "sin permisos para exportar")
+        if error is not None:
+            return error
+
+        if tabla not in TABLAS_EXPORT:
+            return Response({"detail": f"tabla desconocida: {tabla}"}, status=status.HTTP_404_NOT_FOUND)
+        modelo, excluidas = TABLAS_EXPORT[tabla]
+
+        formato = (request.query_params.get("formato") or "ndjson").lower()
+        if formato not in ("ndjson", "csv"):
+            return Response({"detail": "formato debe ser ndjson o csv"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            since_id = int(request.query_params.get("since_id") or 0)
+            limit = int(request.query_params["limit"]) if request.query_params.get("limit") else None
+            if since_id < 0 or (limit is not None and limit < 0):
+                raise ValueError
+        except ValueError:
+            return Response({"detail": "since_id y limit deben ser enteros no negativos"}, status=status.HTTP_400_BAD_REQUEST)
+
+        columnas = [f.attname for f in modelo._meta.concrete_fields if f.name not in excluidas]
+        qs = modelo.objects.filter(id__gt=since_id).order_by("id").values(*columnas)
+        if limit is not None:
+            qs = qs[:limit]
+        filas = qs.iterator(chunk_size=getattr(settings, "EXPORT_CHUNK_SIZE", 2000))
+
+        if formato == "csv":
+            response = StreamingHttpResponse(_filas_csv(columnas, filas), content_type="text/csv; charset=utf-8")
+            response["Content-Disposition"] = f'attachment; filename="{tabla}.csv"'
+        else:
+            response = StreamingHttpResponse(_filas_ndjson(filas), content_type="application/x-ndjson")
+        return response
@@ -0,0 +1,41 @@
+import csv
+import io
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from gestion.services.importacion import ErrorImportacion, importar_catalogo, leer_csv
+from gestion.vistas.auth import autorizar
+
+
+class ImportCatalogoView(APIView):
+    """
+    Importación masiva de productos, variantes y stock desde CSV.
+    POST /import/catalogo/  (multipart, campo "archivo"; ?dry_run=1 valida sin guardar)
+    Columnas: codigo,producto,categoria,precio,sucursal,cantidad
+              [,talla,color,modelo,codigo_barras,codigo_base,descripcion,precio_base]
+    Respuesta 200: resumen { filas, productos_creados, variantes_creadas, ... }
+    Respuesta 400: { detail, errores: [{ fila, errores: [...] }] } (no se importa nada)
+    Requiere token de un usuario admin o con permiso "import:escribir".
+    """
+    def post(self, request):
+        _, error = autorizar(request, "import:escribir", "sin permisos para importar")
+        if error is not None:
+            return error
+
+        archivo = request.FILES.get("archivo")
+        if not archivo:
+            return Response({"detail": "archivo CSV requerido"}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = (request.query_params.get("dry_run") or "").lower() in ("1", "true", "si")
+
+        try:
+            columnas, filas = leer_csv(io.TextIOWrapper(archivo.file, encoding="utf-8-sig", newline=""))
+            resumen = importar_catalogo(columnas, filas, dry_run=dry_run)
+        except UnicodeDecodeError:
+            return Response({"detail": "el archivo debe estar en UTF-8"}, status=status.HTTP_400_BAD_REQUEST)
+        except csv.Error as exc:
+            return Response({"detail": f"CSV inválido: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+        except ErrorImportacion as exc:
+            return Response({"detail": str(exc), "errores": exc.errores}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resumen)
@@ -0,0 +1,123 @@
+import hashlib
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from gestion.serializadores.base import campos_solicitados, expansiones_solicitadas
+from gestion.services.versiones import obtener_versiones
+
+
+class ETagMixin:
+    """
+    GET condicional para ViewSets (list y retrieve).
+    El ETag se deriva de la versión de las tablas que lee el serializer
+    (`etag_modelos`, default: el modelo del queryset), de la URL y del token,
+    así que se calcula con una consulta mínima y sin serializar nada.
+    Si coincide con If-None-Match se responde 304 sin cuerpo.
+    """
+    etag_modelos = None
+
+    def get_etag(self, request):
+        modelos = self.etag_modelos or (self.queryset.model,)
+        versiones = obtener_versiones(m._meta.db_table for m in modelos)
+        partes = [
+            request.get_full_path(),
+            request.headers.get("Authorization", ""),
+            request.headers.get("Accept", ""),
+        ]
+        partes += [f"{tabla}:{version}" for tabla, version in sorted(versiones.items())]
+        return '"%s"' % hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+
+    def _respuesta_condicional(self, request, vista, *args, **kwargs):
+        etag = self.get_etag(request)
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response = vista(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_condicional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_condicional(request, super().retrieve, *args, **kwargs)
+
+
+class CamposMixin:
+    """
+    Aplica ?fields= / ?expand= al queryset: solo se leen las columnas que el
+    serializer va a emitir (only) y se hace select_related únicamente de las
+    relaciones necesarias. Requiere un serializer con CamposDinamicosMixin.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        campos = campos_solicitados(self.request)
+        expand = expansiones_solicitadas(self.request)
+        serializer_class = self.get_serializer_class()
+        columnas_para = getattr(serializer_class, "columnas_para", None)
+        if (campos is None and expand is None) or columnas_para is None:
+            return queryset
+        if campos is None:
+            # Solo ?expand=: todos los campos, pero sin leer las relaciones no expandidas
+            campos = set(serializer_class().fields)
+        columnas = columnas_para(campos, expand)
+        if columnas is None:
+            return queryset
+        # Las columnas de orden (cursor) y la PK siempre se leen
+        orden = getattr(self, "cursor_ordering", None) or ("id",)
+        columnas = set(columnas) | {c.lstrip("-") for c in orden} | {"id"}
+        relaciones = {c.rsplit("__", 1)[0] for c in columnas if "__" in c}
+        queryset = queryset.select_related(None)
+        if relaciones:
+            queryset = queryset.select_related(*relaciones)
+        return queryset.only(*columnas)
+
+
+def filtro_entero(valor):
+    return int(valor)
+
+
+def filtro_texto(valor):
+    return valor.strip()
+
+
+def filtro_desde(valor):
+    """YYYY-MM-DD -> inicio de ese día (comparación directa sobre la columna indexada)"""
+    return timezone.make_aware(datetime.combine(date.fromisoformat(valor), time.min))
+
+
+def filtro_hasta(valor):
+    """YYYY-MM-DD inclusivo -> inicio del día siguiente (usar con __lt)"""
+    return timezone.make_aware(datetime.combine(date.fromisoformat(valor) + timedelta(days=1), time.min))
+
+
+class FiltrosMixin:
+    """
+    Filtros declarativos por query param en el listado:
+        filtros = {'sucursal': ('sucursal_id', filtro_entero), ...}
+    Cada filtro se traduce a un lookup directo sobre columnas indexadas.
+    Un valor inválido responde 400 (nunca se ignora para no devolver toda la tabla).
+    """
+    filtros = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != "list":
+            return queryset
+        condiciones = {}
+        for parametro, (lookup, conversor) in self.filtros.items():
+            valor = self.request.query_params.get(parametro)
+            if valor in (None, ""):
+                continue
+            try:
+                condiciones[lookup] = conversor(valor)
+            except (TypeError, ValueError):
+                raise ValidationError({parametro: f"valor inválido: {valor}"})
+        return queryset.filter(**condiciones) if condiciones else queryset
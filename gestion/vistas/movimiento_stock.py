@@ -1,7 +1,17 @@
 from rest_framework import viewsets
 from gestion.models import MovimientoStock
 from gestion.serializadores.movimiento_stock import MovimientoStockSerializer
+from gestion.vistas.mixins import (
+    CamposMixin, ETagMixin, FiltrosMixin, filtro_entero, filtro_texto, filtro_desde, filtro_hasta,
+)
 
-class MovimientoStockViewSet(viewsets.ModelViewSet):
+class MovimientoStockViewSet(FiltrosMixin, CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = MovimientoStock.objects.all()
     serializer_class = MovimientoStockSerializer
+    filtros = {
+        'sucursal': ('sucursal_id', filtro_entero),
+        'producto_variante': ('producto_variante_id', filtro_entero),
+        'tipo': ('tipo_movimiento', filtro_texto),
+        'desde': ('fecha__gte', filtro_desde),
+        'hasta': ('fecha__lt', filtro_hasta),
+    }
@@ -1,132 +1,201 @@
 import logging
 from typing import List
 
+from asgiref.sync import sync_to_async
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from gestion.models import ApiToken, Usuario
-from gestion.services.push_notifications import send_push_to_usuarios
+from gestion.models import CampanaNotificacion
+from gestion.serializadores.campana import CampanaNotificacionSerializer, ResultadoLoteCampanaSerializer
+from gestion.renderizadores import leer_json, respuesta_json
+from gestion.services.campanas import (
+    acontar_destinatarios, acrear_campana, contar_destinatarios, crear_campana, ejecutar_campana,
+    encolar_campana, programar_campana, recuperar_si_abandonada,
+)
+from gestion.vistas.auth import ausuario_de_token, autorizar, usuario_tiene_permiso
 
 logger = logging.getLogger(__name__)
 
-
-def _usuario_puede_enviar(usuario: Usuario) -> bool:
-    if not usuario or not usuario.rol:
-        return False
-    rol_nombre = (usuario.rol.nombre or "").strip().lower()
-    if rol_nombre == "admin":
-        return True
-
-    permisos = usuario.rol.permisos or []
-    if isinstance(permisos, list):
-        permisos_normalizados = {str(p).strip().lower() for p in permisos}
-        return "*" in permisos_normalizados or "notificaciones:enviar" in permisos_normalizados
-    if isinstance(permisos, str):
-        permisos_lower = permisos.strip().lower()
-        return permisos_lower == "*" or permisos_lower == "notificaciones:enviar"
-    return False
+PERMISO_ENVIAR = "notificaciones:enviar"
+SIN_PERMISO_ENVIAR = "sin permisos para enviar notificaciones"
+
+
+async def _ausuario_autorizado(request):
+    """autorizar() con el ORM async: (usuario, None) o (None, respuesta de error)"""
+    usuario = await ausuario_de_token(request)
+    if usuario is None:
+        return None, respuesta_json({"detail": "no autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
+    if not usuario_tiene_permiso(usuario, PERMISO_ENVIAR):
+        return None, respuesta_json({"detail": SIN_PERMISO_ENVIAR}, status=status.HTTP_403_FORBIDDEN)
+    return usuario, None
+
+
+def _leer_envio(data):
+    """Valida el body del envío. Retorna el envío normalizado o None si faltan titulo/mensaje."""
+    titulo = data.get("titulo") or data.get("title")
+    mensaje = data.get("mensaje") or data.get("message")
+    if not titulo or not mensaje:
+        return None
+
+    roles_raw = data.get("roles") or []
+    if isinstance(roles_raw, str):
+        roles_raw = [roles_raw]
+    roles_filtrados: List[str] = [
+        str(r).strip().lower()
+        for r in roles_raw
+        if str(r).strip()
+    ]
+
+    extra_data = data.get("data") or {}
+    if not isinstance(extra_data, dict):
+        extra_data = {}
+    return {
+        "titulo": titulo,
+        "mensaje": mensaje,
+        "roles": roles_filtrados,
+        "data": extra_data,
+        "esperar": str(data.get("esperar", "")).lower() in ("1", "true", "si"),
+    }
+
+
+def _sin_destinatarios(roles):
+    logger.info("Notificación global omitida: sin destinatarios para roles=%s", roles or ["todos"])
+    return {
+        "ok": False,
+        "detail": "No hay usuarios con tokens FCM disponibles para los filtros proporcionados.",
+        "sent": 0,
+        "failed": 0,
+        "total": 0,
+        "roles": roles,
+    }
+
+
+def _log_campana(campana, usuario, roles):
+    logger.info(
+        "Campaña %s creada por %s (%s). Destinatarios=%s, Roles=%s",
+        campana.id,
+        usuario.email,
+        usuario.rol.nombre if usuario.rol else "sin rol",
+        campana.total_destinatarios,
+        roles or ["todos"],
+    )
+
+
+def _campana_encolada(campana, roles):
+    return {
+        "ok": True,
+        "campana": campana.id,
+        "estado": campana.estado,
+        "total": campana.total_destinatarios,
+        "roles": roles,
+    }
+
+
+def _campana_finalizada(campana, roles):
+    if campana.fallidos > 0:
+        logger.warning(
+            "Algunas notificaciones fallaron. Revisar configuración de Firebase y tokens FCM."
+        )
+    return {
+        "ok": campana.estado == "finalizada",
+        "campana": campana.id,
+        "estado": campana.estado,
+        "sent": campana.enviados,
+        "failed": campana.fallidos,
+        "total": campana.total_destinatarios,
+        "roles": roles,
+    }
 
 
 class NotificacionGlobalView(APIView):
     """
     Permite a un administrador enviar notificaciones push personalizadas
     a todos los usuarios con token FCM, o filtrados por rol.
+    Cada envío queda registrado como campaña. Por defecto se envía en segundo
+    plano y se responde 202 con el id de la campaña (consultar su estado en
+    /notificaciones/campanas/<id>/); con "esperar": true se responde al terminar.
     """
 
     def post(self, request):
-        auth = request.headers.get("Authorization", "")
-        if not auth.startswith("Token "):
-            return Response({"detail": "no autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        token = auth.split(" ", 1)[1].strip()
-        try:
-            tok = ApiToken.objects.select_related("usuario__rol").get(key=token)
-        except ApiToken.DoesNotExist:
-            return Response({"detail": "no autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        usuario = tok.usuario
-        if not _usuario_puede_enviar(usuario):
-            return Response({"detail": "sin permisos para enviar notificaciones"}, status=status.HTTP_403_FORBIDDEN)
-
-        data = request.data or {}
-        titulo = data.get("titulo") or data.get("title")
-        mensaje = data.get("mensaje") or data.get("message")
-        if not titulo or not mensaje:
+        usuario, error = autorizar(request, PERMISO_ENVIAR, SIN_PERMISO_ENVIAR)
+        if error is not None:
+            return error
+
+        envio = _leer_envio(request.data or {})
+        if envio is None:
             return Response({"detail": "titulo y mensaje son requeridos"}, status=status.HTTP_400_BAD_REQUEST)
+        roles = envio["roles"]
+
+        total = contar_destinatarios(roles)
+        if not total:
+            return Response(_sin_destinatarios(roles), status=status.HTTP_200_OK)
+
+        campana = crear_campana(envio["titulo"], envio["mensaje"], envio["data"], roles, usuario, total)
+        _log_campana(campana, usuario, roles)
+        if not envio["esperar"]:
+            programar_campana(campana.id)
+            return Response(_campana_encolada(campana, roles), status=status.HTTP_202_ACCEPTED)
+
+        campana = ejecutar_campana(campana.id)
+        return Response(_campana_finalizada(campana, roles), status=status.HTTP_200_OK)
 
-        roles_raw = data.get("roles") or []
-        if isinstance(roles_raw, str):
-            roles_raw = [roles_raw]
-        roles_filtrados: List[str] = [
-            str(r).strip().lower()
-            for r in roles_raw
-            if str(r).strip()
-        ]
-
-        extra_data = data.get("data") or {}
-        if not isinstance(extra_data, dict):
-            extra_data = {}
-
-        usuarios = Usuario.objects.exclude(fcm_token__isnull=True).exclude(fcm_token="")
-        if roles_filtrados:
-            usuarios = usuarios.filter(rol__nombre__in=roles_filtrados)
-
-        total_destinatarios = usuarios.count()
-        if total_destinatarios == 0:
-            logger.info(
-                "Notificación global omitida: sin destinatarios para roles=%s",
-                roles_filtrados or ["todos"],
-            )
-            return Response(
-                {
-                    "ok": False,
-                    "detail": "No hay usuarios con tokens FCM disponibles para los filtros proporcionados.",
-                    "sent": 0,
-                    "failed": 0,
-                    "total": 0,
-                    "roles": roles_filtrados,
-                },
-                status=status.HTTP_200_OK,
-            )
-
-        # Log de tokens antes de enviar
-        tokens_list = [u.fcm_token for u in usuarios if u.fcm_token]
-        logger.info(
-            "Enviando notificación. Usuario: %s, Total destinatarios: %s, Tokens encontrados: %s, Roles: %s",
-            usuario.email,
-            total_destinatarios,
-            len(tokens_list),
-            roles_filtrados or ["todos"],
-        )
-        
-        enviados, fallidos = send_push_to_usuarios(usuarios, titulo, mensaje, extra_data)
-        logger.info(
-            "Notificación enviada por %s (%s). Éxitos=%s, Fallos=%s, Total=%s, Roles=%s",
-            usuario.email,
-            usuario.rol.nombre if usuario.rol else "sin rol",
-            enviados,
-            fallidos,
-            total_destinatarios,
-            roles_filtrados or ["todos"],
-        )
-        
-        # Log detallado si hay fallos
-        if fallidos > 0:
-            logger.warning(
-                "Algunas notificaciones fallaron. Revisar configuración de Firebase y tokens FCM."
-            )
-
-        return Response(
-            {
-                "ok": True,
-                "sent": enviados,
-                "failed": fallidos,
-                "total": total_destinatarios,
-                "roles": roles_filtrados,
-            },
-            status=status.HTTP_200_OK,
-        )
 
+@method_decorator(csrf_exempt, name="dispatch")
+class NotificacionGlobalAsyncView(View):
+    """
+    NotificacionGlobalView con el ORM async (ASGI, ver VISTAS_ASYNC). Con
+    "esperar": true el envío corre en un thread y el worker sigue atendiendo
+    otros requests mientras FCM responde.
+    """
+
+    async def post(self, request):
+        usuario, error = await _ausuario_autorizado(request)
+        if error is not None:
+            return error
+
+        data = leer_json(request)
+        if data is None:
+            return respuesta_json({"detail": "JSON inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        envio = _leer_envio(data)
+        if envio is None:
+            return respuesta_json({"detail": "titulo y mensaje son requeridos"}, status=status.HTTP_400_BAD_REQUEST)
+        roles = envio["roles"]
+
+        total = await acontar_destinatarios(roles)
+        if not total:
+            return respuesta_json(_sin_destinatarios(roles))
 
+        campana = await acrear_campana(envio["titulo"], envio["mensaje"], envio["data"], roles, usuario, total)
+        _log_campana(campana, usuario, roles)
+        if not envio["esperar"]:
+            # Sin transacción abierta: la campaña ya está confirmada
+            encolar_campana(campana.id)
+            return respuesta_json(_campana_encolada(campana, roles), status=status.HTTP_202_ACCEPTED)
+
+        campana = await sync_to_async(ejecutar_campana)(campana.id)
+        return respuesta_json(_campana_finalizada(campana, roles))
+
+
+class CampanaNotificacionView(APIView):
+    """
+    Estado y estadísticas de una campaña (para consultar envíos en segundo plano).
+    GET /notificaciones/campanas/<id>/?lotes=1 (incluye el resultado de cada lote)
+    """
 
+    def get(self, request, campana_id):
+        _, error = autorizar(request, PERMISO_ENVIAR, SIN_PERMISO_ENVIAR)
+        if error is not None:
+            return error
+        campana = CampanaNotificacion.objects.select_related("enviado_por").filter(id=campana_id).first()
+        if campana is None:
+            return Response({"detail": "campaña no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+        # Sin esperar a recuperar_campanas: una campaña cuyo worker murió no queda "enviando" para siempre
+        recuperar_si_abandonada(campana)
+        respuesta = CampanaNotificacionSerializer(campana).data
+        if request.query_params.get("lotes"):
+            respuesta["lotes"] = ResultadoLoteCampanaSerializer(campana.lotes.order_by("numero"), many=True).data
+        return Response(respuesta)
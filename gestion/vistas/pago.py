@@ -1,7 +1,8 @@
 from rest_framework import viewsets
 from gestion.models import Pago
 from gestion.serializadores.pago import PagoSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class PagoViewSet(viewsets.ModelViewSet):
+class PagoViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = Pago.objects.all()
     serializer_class = PagoSerializer
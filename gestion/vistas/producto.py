@@ -1,12 +1,41 @@
-from rest_framework import viewsets
-from django.db.models import Min, Max
-from gestion.models import Producto, ProductoVariante
-from gestion.serializadores.producto import ProductoSerializer
+from django.http import HttpResponse
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from gestion.models import Producto, Categoria, ProductoVariante
+from gestion.serializadores.base import campos_solicitados
+from gestion.serializadores.producto import ProductoSerializer, anotar_rango_precios
+from gestion.services.producto_detalle import obtener_detalle
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class ProductoViewSet(viewsets.ModelViewSet):
-    queryset = Producto.objects.all()
+CAMPOS_PRECIO = {'precio', 'precio_min', 'precio_max'}
+
+class ProductoViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
+    queryset = Producto.objects.select_related('categoria').all()
     serializer_class = ProductoSerializer
+    etag_modelos = (Producto, Categoria, ProductoVariante)
     
     def get_queryset(self):
-        """Optimizar consultas prefetching variantes"""
-        return Producto.objects.prefetch_related('productovariante_set').all()
+        """Rango de precios calculado en SQL; no se cargan las filas de variantes"""
+        qs = super().get_queryset()
+        campos = campos_solicitados(self.request)
+        if campos is None or campos & CAMPOS_PRECIO:
+            qs = anotar_rango_precios(qs)
+        return qs
+
+    @action(detail=True, methods=['get'], url_path='detalle')
+    def detalle(self, request, pk=None):
+        """
+        Ficha completa en una llamada: producto, variantes con stock por sucursal,
+        imágenes y sucursales. Se sirve pre-serializada desde cache por versión del producto.
+        """
+        try:
+            producto_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({'detail': 'No encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        version, contenido = obtener_detalle(producto_id)
+        if contenido is None:
+            return Response({'detail': 'No encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(contenido, content_type='application/json')
+        response['X-Producto-Version'] = version
+        return response
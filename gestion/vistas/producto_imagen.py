@@ -1,7 +1,8 @@
 from rest_framework import viewsets
 from gestion.models import ProductoImagen
 from gestion.serializadores.producto_imagen import ProductoImagenSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class ProductoImagenViewSet(viewsets.ModelViewSet):
+class ProductoImagenViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = ProductoImagen.objects.all()
     serializer_class = ProductoImagenSerializer
@@ -1,7 +1,9 @@
 from rest_framework import viewsets
-from gestion.models import ProductoVariante
+from gestion.models import ProductoVariante, Producto
 from gestion.serializadores.producto_variante import ProductoVarianteSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class ProductoVarianteViewSet(viewsets.ModelViewSet):
+class ProductoVarianteViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = ProductoVariante.objects.select_related('producto').all()
     serializer_class = ProductoVarianteSerializer
+    etag_modelos = (ProductoVariante, Producto)
@@ -1,12 +1,16 @@
 from datetime import timedelta, date, datetime, time
+from functools import wraps
+import hashlib
 import re
 from django.db.models import Sum, Count, Avg
 from django.db.models.functions import TruncDate
+from django.conf import settings
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.http import HttpResponse
+from django.views import View
 from io import BytesIO
 try:
     from reportlab.lib.pagesizes import A4
@@ -20,47 +24,61 @@ except Exception:
     Workbook = None
 
 from gestion.models import Venta, VentaDetalle, Stock, ProductoVariante, Producto
+from gestion.renderizadores import respuesta_json
+from gestion.services.cache import aclave, aobtener_o_calcular, clave, obtener_o_calcular
+from gestion.services.versiones import aobtener_versiones, obtener_versiones
 
 
-class ReporteResumen(APIView):
+def _partes_clave(nombre, request, versiones):
+    parametros = hashlib.sha1(request.GET.urlencode().encode()).hexdigest()
+    return (
+        nombre, timezone.localdate().isoformat(), parametros,
+        ".".join(str(versiones[t]) for t in versiones),
+    )
+
+
+def _cache_timeout():
+    return getattr(settings, "REPORTES_CACHE_TIMEOUT", 300)
+
+
+def reporte_cacheado(*tablas):
     """
-    Resumen general para el dashboard de reportes.
-    Devuelve totales de venta, ticket promedio, mix por canal y conteos clave.
+    Cachea la respuesta de un GET de reporte por query params, día y versión de
+    las tablas que consulta: cualquier cambio en ellas genera otra clave.
+    Solo se guardan respuestas 200; un solo worker recalcula a la vez (single-flight).
     """
-    def get(self, request):
-        hoy = timezone.now().date()
-        hace_30 = hoy - timedelta(days=30)
+    def decorador(get):
+        @wraps(get)
+        def envoltura(self, request, *args, **kwargs):
+            versiones = obtener_versiones(tablas)
+            key = clave("reportes", *_partes_clave(type(self).__name__, request, versiones))
+            respuesta = {}
 
-        # Solo contar ventas confirmadas y pagadas
-        ventas_qs = Venta.objects.filter(estado='completado', estado_pago='pagado')
-        ventas_30_qs = ventas_qs.filter(fecha__date__gte=hace_30)
-
-        base_agg = ventas_qs.aggregate(total=Sum('total'), count=Count('id'))
-        ventas_agg = {
-            "total": base_agg.get("total") or 0,
-            "count": base_agg.get("count") or 0,
-            "promedio": 0,
-        }
-        if ventas_agg["count"] > 0:
-            ventas_agg["promedio"] = float(ventas_agg["total"]) / float(ventas_agg["count"])
-        ventas_30_agg = ventas_30_qs.aggregate(total=Sum('total'), count=Count('id'))
+            def calcular():
+                respuesta["original"] = get(self, request, *args, **kwargs)
+                return respuesta["original"].data if respuesta["original"].status_code == 200 else None
 
-        # Mix por canal
-        canales = list(
-            ventas_qs.values('canal_venta')
-            .annotate(total=Sum('total'), count=Count('id'))
-            .order_by('-total')
-        )
+            data = obtener_o_calcular(key, calcular, timeout=_cache_timeout())
+            if data is None:
+                return respuesta["original"]
+            return Response(data)
+        return envoltura
+    return decorador
 
-        # Mix por tipo de pago
-        tipos_pago = list(
-            ventas_qs.values('tipo_pago')
-            .annotate(total=Sum('total'), count=Count('id'))
-            .order_by('-total')
-        )
 
+def _consultas_resumen():
+    """Consultas (sin evaluar) del resumen; las evalúa la vista sync o la async"""
+    hace_30 = timezone.now().date() - timedelta(days=30)
+    # Solo contar ventas confirmadas y pagadas
+    ventas_qs = Venta.objects.filter(estado='completado', estado_pago='pagado')
+    return {
+        "ventas": ventas_qs,
+        "ventas_30": ventas_qs.filter(fecha__date__gte=hace_30),
+        # Mix por canal y por tipo de pago
+        "canales": ventas_qs.values('canal_venta').annotate(total=Sum('total'), count=Count('id')).order_by('-total'),
+        "tipos_pago": ventas_qs.values('tipo_pago').annotate(total=Sum('total'), count=Count('id')).order_by('-total'),
         # Stock bajo (<= 5)
-        stock_bajo = (
+        "stock_bajo": (
             Stock.objects.select_related('producto_variante__producto')
             .filter(cantidad__lte=5)
             .values(
@@ -69,83 +87,111 @@ class ReporteResumen(APIView):
             )
             .annotate(total_unidades=Sum('cantidad'))
             .order_by('total_unidades')[:10]
-        )
+        ),
+    }
 
-        data = {
-            "ventas": {
-                "total": ventas_agg.get('total') or 0,
-                "count": ventas_agg.get('count') or 0,
-                "promedio": ventas_agg.get('promedio') or 0,
-                "ultimos_30": {
-                    "total": ventas_30_agg.get('total') or 0,
-                    "count": ventas_30_agg.get('count') or 0,
-                },
-            },
-            "canales": canales,
-            "tipos_pago": tipos_pago,
-            "stock_bajo": list(stock_bajo),
-            "conteos": {
-                "productos": Producto.objects.count(),
-                "variantes": ProductoVariante.objects.count(),
+
+def _armar_resumen(base_agg, ventas_30_agg, canales, tipos_pago, stock_bajo, productos, variantes):
+    total = base_agg.get("total") or 0
+    count = base_agg.get("count") or 0
+    return {
+        "ventas": {
+            "total": total,
+            "count": count,
+            "promedio": float(total) / float(count) if count > 0 else 0,
+            "ultimos_30": {
+                "total": ventas_30_agg.get('total') or 0,
+                "count": ventas_30_agg.get('count') or 0,
             },
-        }
+        },
+        "canales": canales,
+        "tipos_pago": tipos_pago,
+        "stock_bajo": stock_bajo,
+        "conteos": {
+            "productos": productos,
+            "variantes": variantes,
+        },
+    }
+
+
+class ReporteResumen(APIView):
+    """
+    Resumen general para el dashboard de reportes.
+    Devuelve totales de venta, ticket promedio, mix por canal y conteos clave.
+    """
+    @reporte_cacheado('venta', 'stock', 'producto', 'producto_variante')
+    def get(self, request):
+        consultas = _consultas_resumen()
+        data = _armar_resumen(
+            consultas["ventas"].aggregate(total=Sum('total'), count=Count('id')),
+            consultas["ventas_30"].aggregate(total=Sum('total'), count=Count('id')),
+            list(consultas["canales"]),
+            list(consultas["tipos_pago"]),
+            list(consultas["stock_bajo"]),
+            Producto.objects.count(),
+            ProductoVariante.objects.count(),
+        )
         return Response(data)
 
 
+def _serie_ventas_por_dia(params):
+    hoy = timezone.now().date()
+    desde = None
+    hasta = None
+
+    # Priorizar start/end sobre dias
+    start_str = params.get('start')
+    end_str = params.get('end')
+
+    if start_str:
+        try:
+            desde = datetime.strptime(start_str, '%Y-%m-%d').date()
+        except:
+            pass
+    if end_str:
+        try:
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
+            # Incluir el día completo de "end" (hasta el inicio del día siguiente)
+            hasta = end_date + timedelta(days=1)
+        except:
+            pass
+
+    # Si solo hay start, usar hasta hoy
+    if desde and not hasta:
+        hasta = hoy + timedelta(days=1)
+    # Si solo hay end, usar desde el inicio de los tiempos (o desde hace mucho)
+    if hasta and not desde:
+        desde = hoy - timedelta(days=365)  # Último año por defecto
+
+    # Si no hay start/end, usar dias
+    if not desde and not hasta:
+        dias = int(params.get('dias', 30))
+        desde = hoy - timedelta(days=dias)
+        hasta = hoy + timedelta(days=1)  # Incluir hoy
+
+    # Construir el queryset - solo ventas confirmadas y pagadas
+    qs = Venta.objects.filter(estado='completado', estado_pago='pagado')
+    if desde:
+        qs = qs.filter(fecha__date__gte=desde)
+    if hasta:
+        qs = qs.filter(fecha__date__lt=hasta)
+
+    return (
+        qs.annotate(dia=TruncDate('fecha'))
+        .values('dia')
+        .annotate(total=Sum('total'), count=Count('id'))
+        .order_by('dia')
+    )
+
+
 class VentasPorDia(APIView):
     """
     Serie temporal de ventas por día en el rango indicado (default: últimos 30 días).
     Params opcionales: ?dias=30 o ?start=YYYY-MM-DD&end=YYYY-MM-DD
     """
+    @reporte_cacheado('venta')
     def get(self, request):
-        hoy = timezone.now().date()
-        desde = None
-        hasta = None
-        
-        # Priorizar start/end sobre dias
-        start_str = request.query_params.get('start')
-        end_str = request.query_params.get('end')
-        
-        if start_str:
-            try:
-                desde = datetime.strptime(start_str, '%Y-%m-%d').date()
-            except:
-                pass
-        if end_str:
-            try:
-                end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
-                # Incluir el día completo de "end" (hasta el inicio del día siguiente)
-                hasta = end_date + timedelta(days=1)
-            except:
-                pass
-        
-        # Si solo hay start, usar hasta hoy
-        if desde and not hasta:
-            hasta = hoy + timedelta(days=1)
-        # Si solo hay end, usar desde el inicio de los tiempos (o desde hace mucho)
-        if hasta and not desde:
-            desde = hoy - timedelta(days=365)  # Último año por defecto
-        
-        # Si no hay start/end, usar dias
-        if not desde and not hasta:
-            dias = int(request.query_params.get('dias', 30))
-            desde = hoy - timedelta(days=dias)
-            hasta = hoy + timedelta(days=1)  # Incluir hoy
-        
-        # Construir el queryset - solo ventas confirmadas y pagadas
-        qs = Venta.objects.filter(estado='completado', estado_pago='pagado')
-        if desde:
-            qs = qs.filter(fecha__date__gte=desde)
-        if hasta:
-            qs = qs.filter(fecha__date__lt=hasta)
-        
-        serie = (
-            qs.annotate(dia=TruncDate('fecha'))
-            .values('dia')
-            .annotate(total=Sum('total'), count=Count('id'))
-            .order_by('dia')
-        )
-        return Response(list(serie))
+        return Response(list(_serie_ventas_por_dia(request.query_params)))
 
 
 class TopProductos(APIView):
@@ -153,6 +199,7 @@ class TopProductos(APIView):
     Top N productos por unidades o monto.
     Params: ?limit=5&metric=unidades|monto&order=desc|asc&start=YYYY-MM-DD&end=YYYY-MM-DD&season=otono|invierno|primavera|verano&year=YYYY&month=1-12&canal=tienda|online&categoria=<id>&exclude=nombre1,nombre2
     """
+    @reporte_cacheado('venta', 'venta_detalle', 'producto_variante', 'producto', 'categoria')
     def get(self, request):
         limit = int(request.query_params.get('limit', 5))
         metric = request.query_params.get('metric', 'unidades')
@@ -299,19 +346,38 @@ class TopProductos(APIView):
         return Response(list(qs))
 
 
+def _mix_pago():
+    # Solo contar ventas confirmadas y pagadas
+    return (
+        Venta.objects.filter(estado='completado', estado_pago='pagado')
+        .values('tipo_pago')
+        .annotate(total=Sum('total'), count=Count('id'))
+        .order_by('-total')
+    )
+
+
 class MixPago(APIView):
     """
     Distribución por tipo de pago basado en Venta.tipo_pago.
     """
+    @reporte_cacheado('venta')
     def get(self, request):
-        # Solo contar ventas confirmadas y pagadas
-        mix = (
-            Venta.objects.filter(estado='completado', estado_pago='pagado')
-            .values('tipo_pago')
-            .annotate(total=Sum('total'), count=Count('id'))
-            .order_by('-total')
+        return Response(list(_mix_pago()))
+
+
+def _stock_bajo(params):
+    umbral = int(params.get('umbral', 5))
+    limit = int(params.get('limit', 20))
+    return (
+        Stock.objects.select_related('producto_variante__producto')
+        .filter(cantidad__lte=umbral)
+        .values(
+            'producto_variante__producto__id',
+            'producto_variante__producto__nombre',
         )
-        return Response(list(mix))
+        .annotate(total_unidades=Sum('cantidad'))
+        .order_by('total_unidades')[:limit]
+    )
 
 
 class StockBajo(APIView):
@@ -319,20 +385,9 @@ class StockBajo(APIView):
     Lista de productos con stock por debajo o igual al umbral.
     Params: ?umbral=5&limit=20
     """
+    @reporte_cacheado('stock', 'producto')
     def get(self, request):
-        umbral = int(request.query_params.get('umbral', 5))
-        limit = int(request.query_params.get('limit', 20))
-        items = (
-            Stock.objects.select_related('producto_variante__producto')
-            .filter(cantidad__lte=umbral)
-            .values(
-                'producto_variante__producto__id',
-                'producto_variante__producto__nombre',
-            )
-            .annotate(total_unidades=Sum('cantidad'))
-            .order_by('total_unidades')[:limit]
-        )
-        return Response(list(items))
+        return Response(list(_stock_bajo(request.query_params)))
 
 
 def _build_summary():
@@ -589,6 +644,7 @@ class PronosticoVentas(APIView):
     Params: ?fecha=YYYY-MM-DD (opcional, default: mañana)
     Retorna productos que probablemente se venderán con estimación de cantidad.
     """
+    @reporte_cacheado('venta', 'venta_detalle', 'producto_variante', 'producto')
     def get(self, request):
         fecha_str = request.query_params.get('fecha')
         if fecha_str:
@@ -668,3 +724,68 @@ class PronosticoVentas(APIView):
             'total_productos': len(resultados)
         })
 
+
+# ================== VARIANTES ASYNC (ASGI, ver VISTAS_ASYNC) ==================
+async def _aresumen(params):
+    consultas = _consultas_resumen()
+    return _armar_resumen(
+        await consultas["ventas"].aaggregate(total=Sum('total'), count=Count('id')),
+        await consultas["ventas_30"].aaggregate(total=Sum('total'), count=Count('id')),
+        [fila async for fila in consultas["canales"]],
+        [fila async for fila in consultas["tipos_pago"]],
+        [fila async for fila in consultas["stock_bajo"]],
+        await Producto.objects.acount(),
+        await ProductoVariante.objects.acount(),
+    )
+
+
+async def _aventas_por_dia(params):
+    return [fila async for fila in _serie_ventas_por_dia(params)]
+
+
+async def _amix_pago(params):
+    return [fila async for fila in _mix_pago()]
+
+
+async def _astock_bajo(params):
+    return [fila async for fila in _stock_bajo(params)]
+
+
+class ReporteAsync(View):
+    """
+    Reporte con el ORM async: mientras espera a la BD el worker atiende otros
+    requests. Comparte consultas y cache con la vista sync de igual `nombre`.
+    Cada reporte define `consulta = staticmethod(<async fn(params) -> datos>)`.
+    """
+    nombre = ""
+    tablas = ()
+
+    async def get(self, request):
+        versiones = await aobtener_versiones(self.tablas)
+        key = await aclave("reportes", *_partes_clave(self.nombre, request, versiones))
+        data = await aobtener_o_calcular(key, lambda: self.consulta(request.GET), timeout=_cache_timeout())
+        return respuesta_json(data)
+
+
+class ReporteResumenAsync(ReporteAsync):
+    nombre = "ReporteResumen"
+    tablas = ('venta', 'stock', 'producto', 'producto_variante')
+    consulta = staticmethod(_aresumen)
+
+
+class VentasPorDiaAsync(ReporteAsync):
+    nombre = "VentasPorDia"
+    tablas = ('venta',)
+    consulta = staticmethod(_aventas_por_dia)
+
+
+class MixPagoAsync(ReporteAsync):
+    nombre = "MixPago"
+    tablas = ('venta',)
+    consulta = staticmethod(_amix_pago)
+
+
+class StockBajoAsync(ReporteAsync):
+    nombre = "StockBajo"
+    tablas = ('stock', 'producto')
+    consulta = staticmethod(_astock_bajo)
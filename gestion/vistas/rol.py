@@ -1,7 +1,8 @@
 from rest_framework import viewsets
 from gestion.models import Rol
 from gestion.serializadores.rol import RolSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class RolViewSet(viewsets.ModelViewSet):
+class RolViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = Rol.objects.all()
     serializer_class = RolSerializer
@@ -1,10 +1,17 @@
 from rest_framework import viewsets
-from gestion.models import Stock
+from gestion.models import Stock, ProductoVariante, Producto, Sucursal
 from gestion.serializadores.stock import StockSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin, FiltrosMixin, filtro_entero
 
-class StockViewSet(viewsets.ModelViewSet):
+class StockViewSet(FiltrosMixin, CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = Stock.objects.select_related(
         'producto_variante__producto',
         'sucursal'
     ).all()
     serializer_class = StockSerializer
+    etag_modelos = (Stock, ProductoVariante, Producto, Sucursal)
+    filtros = {
+        'sucursal': ('sucursal_id', filtro_entero),
+        'producto_variante': ('producto_variante_id', filtro_entero),
+        'producto': ('producto_variante__producto_id', filtro_entero),
+    }
@@ -1,7 +1,8 @@
 from rest_framework import viewsets
 from gestion.models import Sucursal
 from gestion.serializadores.sucursal import SucursalSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class SucursalViewSet(viewsets.ModelViewSet):
+class SucursalViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = Sucursal.objects.all()
     serializer_class = SucursalSerializer
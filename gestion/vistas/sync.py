@@ -0,0 +1,32 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from gestion.services.sync import TABLAS_SYNC, sincronizar
+
+
+class SyncView(APIView):
+    """
+    Sincronización incremental para el cache local de la app.
+    GET /sync/?since=<cursor>&tablas=productos,stocks&limit=<n>
+    - Primera vez (sin since): todas las filas, reinicio=true.
+    - Luego: solo filas cambiadas desde el cursor e ids eliminados.
+    Respuesta: { cursor, hay_mas, reinicio, cambios: {tabla: [...]}, eliminados: {tabla: [ids]} }
+    Guardar `cursor` y volver a llamar con él (inmediatamente si hay_mas=true).
+    Tablas: categorias, productos, producto_variantes, producto_imagenes, stocks (default: todas).
+    """
+    def get(self, request):
+        params = request.query_params
+        try:
+            since = int(params["since"]) if params.get("since") else None
+            limite = int(params.get("limit") or getattr(settings, "SYNC_LIMITE", 5000))
+        except ValueError:
+            return Response({"detail": "since y limit deben ser enteros"}, status=status.HTTP_400_BAD_REQUEST)
+        limite = max(1, min(limite, getattr(settings, "SYNC_LIMITE", 5000)))
+
+        tablas = [t.strip() for t in params["tablas"].split(",") if t.strip()] if params.get("tablas") else list(TABLAS_SYNC)
+        desconocidas = [t for t in tablas if t not in TABLAS_SYNC]
+        if desconocidas:
+            return Response({"detail": f"tablas desconocidas: {', '.join(desconocidas)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sincronizar(since, tablas, limite))
@@ -1,29 +1,242 @@
+import hashlib
 import os
-from uuid import uuid4
-from django.conf import settings
-from django.core.files.storage import FileSystemStorage
+
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+from django.views.static import serve
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from gestion.services import uploads
+from gestion.services.imagenes import (
+    CACHE_CONTROL_INMUTABLE, EscritorImagen, ImagenDemasiadoGrande, ImagenInvalida, archivo_temporal, es_inmutable,
+    registrar_archivo, tamano_maximo,
+)
+from gestion.vistas.auth import autorizar
+
+CHUNK_LECTURA = 64 * 1024
+
+
+def _demasiado_grande(request, limite):
+    try:
+        return int(request.META.get("CONTENT_LENGTH") or 0) > limite
+    except ValueError:
+        return False
+
+
+class ImagenRecibida:
+    """Imagen ya escrita a un temporal por ImagenUploadHandler, pendiente de registrar"""
+
+    def __init__(self, ruta, hash_hex, name, size):
+        self.ruta = ruta
+        self.hash = hash_hex
+        self.name = name
+        self.size = size
+
+    def close(self):
+        pass
+
+
+class ImagenUploadHandler(FileUploadHandler):
+    """
+    Recibe el campo `image` directo a un temporal junto a los originales,
+    calculando el SHA-256 mientras llega: la firma se valida con los primeros
+    bytes y el tamaño se corta en IMAGEN_MAX_BYTES sin leer el resto del body.
+    El error queda en `error` (request.FILES no trae la imagen).
+    """
+    campo = "image"
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.ruta = None
+        self.fh = None
+        self.escritor = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name != self.campo or self.ruta is not None:
+            raise SkipFile()
+        fd, self.ruta = archivo_temporal()
+        self.fh = os.fdopen(fd, "wb")
+        self.escritor = EscritorImagen(self.fh, sha=hashlib.sha256())
+
+    def _rechazar(self, exc):
+        self.error = exc
+        self.upload_interrupted()
+        raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        try:
+            self.escritor.escribir(raw_data)
+        except ImagenInvalida as exc:
+            self._rechazar(exc)
+        return None
+
+    def file_complete(self, file_size):
+        try:
+            self.escritor.cerrar()
+        except ImagenInvalida as exc:
+            self._rechazar(exc)
+        self.fh.close()
+        return ImagenRecibida(self.ruta, self.escritor.sha.hexdigest(), self.file_name, file_size)
+
+    def upload_interrupted(self):
+        if self.fh is not None:
+            self.fh.close()
+        if self.ruta is not None and os.path.exists(self.ruta):
+            os.unlink(self.ruta)
+
 
 class UploadImageView(APIView):
     """
-    Subida simple de imágenes (entorno de desarrollo).
+    Subida de imágenes de producto.
     FormData: image (archivo)
-    Respuesta: { url: '/media/products/<archivo>' }
+    Respuesta: {
+        url: '/media/products/<h[:2]>/<sha256>.<ext>',
+        hash, duplicada,
+        miniaturas: { "<ancho>": { webp, jpg } }   (se generan en segundo plano)
+    }
     """
     def post(self, request):
+        # Rechazar antes de leer el cuerpo si ya se declara más grande que el máximo
+        if _demasiado_grande(request, tamano_maximo() + 64 * 1024):
+            return Response({"detail": "la imagen supera el tamaño máximo"}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        # Firma y tamaño se validan mientras llega el body (sin los handlers por defecto)
+        handler = ImagenUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
         file = request.FILES.get("image")
+        if isinstance(handler.error, ImagenDemasiadoGrande):
+            return Response({"detail": str(handler.error)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if handler.error is not None:
+            return Response({"detail": str(handler.error)}, status=status.HTTP_400_BAD_REQUEST)
         if not file:
             return Response({"detail": "archivo 'image' requerido"}, status=status.HTTP_400_BAD_REQUEST)
-        products_dir = os.path.join(settings.MEDIA_ROOT, "products")
-        os.makedirs(products_dir, exist_ok=True)
-        name, ext = os.path.splitext(file.name)
-        safe_name = f"{uuid4().hex}{ext or '.jpg'}"
-        fs = FileSystemStorage(location=products_dir, base_url=settings.MEDIA_URL + "products/")
-        filename = fs.save(safe_name, file)
-        url = fs.url(filename)
-        return Response({"url": url}, status=status.HTTP_201_CREATED)
+        try:
+            resultado = registrar_archivo(file.ruta, file.hash, file.name)
+        except ImagenInvalida as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_201_CREATED)
 
 
+def servir_media(request, path, document_root=None, show_indexes=False):
+    """
+    django.views.static.serve con cache inmutable para las imágenes direccionadas
+    por contenido (solo con DEBUG; en producción lo hace el servidor web o la CDN).
+    """
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if response.status_code == 200 and es_inmutable(path):
+        response["Cache-Control"] = CACHE_CONTROL_INMUTABLE
+    return response
+
+
+class UploadIniciarView(APIView):
+    """
+    Inicia una subida reanudable.
+    Body: { "tamano": <bytes totales>, "nombre": "<opcional>" }
+    Respuesta: { upload_id, offset: 0, tamano, chunk_max }
+    Luego: PATCH /upload/image/<upload_id>/ con los bytes crudos
+    (Content-Type: application/octet-stream, cabecera Upload-Offset) y al final
+    POST /upload/image/<upload_id>/finalizar/.
+    Requiere token; la subida solo la puede continuar el mismo usuario.
+    """
+    def post(self, request):
+        usuario, error = autorizar(request)
+        if error is not None:
+            return error
+        data = request.data or {}
+        try:
+            tamano = int(data.get("tamano") or 0)
+        except (TypeError, ValueError):
+            return Response({"detail": "tamano debe ser entero"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            resultado = uploads.iniciar(tamano, str(data.get("nombre") or ""), usuario_id=usuario.id)
+        except ImagenDemasiadoGrande as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except ImagenInvalida as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_201_CREATED)
+
+
+class UploadChunkView(APIView):
+    """
+    GET: estado de la subida ({ offset, tamano }) para reanudar tras un corte.
+    PATCH: agrega un chunk. Cabecera Upload-Offset = bytes ya recibidos.
+    Si no coincide responde 409 con el offset correcto.
+    """
+    def get(self, request, upload_id):
+        usuario, error = autorizar(request)
+        if error is not None:
+            return error
+        try:
+            return Response(uploads.estado(upload_id, usuario_id=usuario.id))
+        except uploads.UploadNoEncontrado:
+            return Response({"detail": "upload no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+
+    def patch(self, request, upload_id):
+        usuario, error = autorizar(request)
+        if error is not None:
+            return error
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return Response({"detail": "cabecera Upload-Offset requerida"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            chunk_max = uploads.estado(upload_id, usuario_id=usuario.id)["chunk_max"]
+        except uploads.UploadNoEncontrado:
+            return Response({"detail": "upload no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        if _demasiado_grande(request, chunk_max):
+            return Response({"detail": f"chunk máximo {chunk_max} bytes"}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # Leer el cuerpo en bloques directamente del stream (sin cargarlo entero en memoria)
+        stream = request.stream
+
+        def bloques():
+            if stream is None:
+                return
+            leidos = 0
+            while True:
+                bloque = stream.read(CHUNK_LECTURA)
+                if not bloque:
+                    return
+                leidos += len(bloque)
+                if leidos > chunk_max:
+                    raise ImagenDemasiadoGrande(f"chunk máximo {chunk_max} bytes")
+                yield bloque
+
+        try:
+            resultado = uploads.agregar_chunk(upload_id, offset, bloques(), usuario_id=usuario.id)
+        except uploads.UploadNoEncontrado:
+            return Response({"detail": "upload no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        except uploads.OffsetIncorrecto as exc:
+            return Response(
+                {"detail": str(exc), "offset": exc.offset_actual}, status=status.HTTP_409_CONFLICT
+            )
+        except ImagenDemasiadoGrande as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except ImagenInvalida as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        return Response(resultado)
+
+
+class UploadFinalizarView(APIView):
+    """
+    Cierra una subida reanudable completa: calcula el hash, deduplica y encola miniaturas.
+    Respuesta: igual que UploadImageView.
+    """
+    def post(self, request, upload_id):
+        usuario, error = autorizar(request)
+        if error is not None:
+            return error
+        try:
+            resultado = uploads.finalizar(upload_id, usuario_id=usuario.id)
+        except uploads.UploadNoEncontrado:
+            return Response({"detail": "upload no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        except uploads.OffsetIncorrecto as exc:
+            return Response(
+                {"detail": "la subida está incompleta", "offset": exc.offset_actual},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except ImagenInvalida as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_201_CREATED)
@@ -1,7 +1,8 @@
 from rest_framework import viewsets
 from gestion.models import Usuario
 from gestion.serializadores.usuario import UsuarioSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
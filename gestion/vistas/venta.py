@@ -1,19 +1,39 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Prefetch
 import logging
 from gestion.models import Venta, VentaDetalle, Cliente, Sucursal, Producto, ProductoVariante, Stock, Usuario, ApiToken
 from gestion.serializadores.venta import VentaSerializer
+from gestion.serializadores.venta_detalle import VentaDetalleSerializer
+from gestion.vistas.mixins import (
+    CamposMixin, ETagMixin, FiltrosMixin, filtro_entero, filtro_texto, filtro_desde, filtro_hasta,
+)
 from gestion.services.push_notifications import send_push_to_usuario
+from gestion.services.clientes import (
+    ClienteYaVinculado, buscar_cliente_por_email, obtener_o_crear_cliente, vincular_cliente,
+)
 
 logger = logging.getLogger(__name__)
 
-class VentaViewSet(viewsets.ModelViewSet):
+class VentaViewSet(FiltrosMixin, CamposMixin, ETagMixin, viewsets.ModelViewSet):
     queryset = Venta.objects.select_related('cliente', 'sucursal').all().order_by('-fecha', '-id')
     serializer_class = VentaSerializer
-    
+    etag_modelos = (Venta, Cliente, Sucursal, Usuario)
+    cursor_ordering = ('-fecha', '-id')
+    filtros = {
+        'sucursal': ('sucursal_id', filtro_entero),
+        'cliente': ('cliente_id', filtro_entero),
+        'estado': ('estado', filtro_texto),
+        'estado_pago': ('estado_pago', filtro_texto),
+        'canal': ('canal_venta', filtro_texto),
+        'desde': ('fecha__gte', filtro_desde),
+        'hasta': ('fecha__lt', filtro_hasta),
+    }
+
     def get_queryset(self):
         """
         Si el usuario es cliente, solo mostrar sus propias ventas.
@@ -29,20 +49,39 @@ class VentaViewSet(viewsets.ModelViewSet):
                 tok = ApiToken.objects.select_related("usuario__rol").get(key=token)
                 usuario = tok.usuario
                 rol_nombre = usuario.rol.nombre.lower() if usuario.rol else ""
-                # Si es cliente, filtrar por su email
+                # Si es cliente, filtrar por su Cliente enlazado
                 if rol_nombre == "cliente":
-                    # Buscar el cliente por email del usuario
-                    from gestion.models import Cliente
-                    try:
-                        cliente = Cliente.objects.get(email=usuario.email)
-                        qs = qs.filter(cliente=cliente)
-                    except Cliente.DoesNotExist:
+                    cliente_id = usuario.cliente_id
+                    if cliente_id is None:
+                        # Usuarios aún sin enlace: buscar el cliente por email normalizado
+                        cliente = buscar_cliente_por_email(usuario.email)
+                        cliente_id = cliente.id if cliente else None
+                    if cliente_id is None:
                         # Si no existe cliente, no mostrar nada
                         qs = qs.none()
+                    else:
+                        qs = qs.filter(cliente_id=cliente_id)
             except:
                 pass
+        if self.action == 'detalle':
+            # Líneas de la venta con su variante y producto en una sola consulta adicional
+            qs = qs.prefetch_related(Prefetch(
+                'ventadetalle_set',
+                queryset=VentaDetalle.objects.select_related('producto_variante__producto').order_by('id'),
+            ))
         return qs
 
+    @action(detail=True, methods=['get'], url_path='detalle')
+    def detalle(self, request, pk=None):
+        """
+        Venta con sus líneas: { ...venta, detalles: [ { ...detalle, producto_variante: {...} } ] }
+        Número de consultas constante (venta + líneas), sin importar cuántas líneas tenga.
+        """
+        venta = self.get_object()
+        data = self.get_serializer(venta).data
+        data['detalles'] = VentaDetalleSerializer(venta.ventadetalle_set.all(), many=True).data
+        return Response(data)
+
 
 class POSCheckout(APIView):
     """
@@ -73,9 +112,9 @@ class POSCheckout(APIView):
             except Cliente.DoesNotExist:
                 return Response({"detail": "cliente no encontrado"}, status=status.HTTP_400_BAD_REQUEST)
         elif cliente_email:
-            cliente, _ = Cliente.objects.get_or_create(email=cliente_email, defaults={"nombre": cliente_email})
+            cliente, _ = obtener_o_crear_cliente(cliente_email, cliente_email)
         else:
-            cliente, _ = Cliente.objects.get_or_create(email="mostrador@local", defaults={"nombre": "Mostrador"})
+            cliente, _ = obtener_o_crear_cliente("mostrador@local", "Mostrador")
 
         # Sucursal
         sucursal_id = data.get("sucursal") or 1
@@ -236,29 +275,23 @@ class OnlineCheckout(APIView):
                 return Response({"detail": "cliente no encontrado"}, status=status.HTTP_400_BAD_REQUEST)
 
         if cliente is None:
-            cliente_email = None
-            cliente_nombre = None
-
             if (
                 usuario_autenticado
                 and usuario_autenticado.rol
                 and usuario_autenticado.rol.nombre
                 and usuario_autenticado.rol.nombre.lower() == "cliente"
             ):
-                cliente_email = usuario_autenticado.email
-                cliente_nombre = usuario_autenticado.nombre
+                # Cliente enlazado al usuario (se crea y enlaza si aún no existe)
+                try:
+                    cliente = vincular_cliente(usuario_autenticado)
+                except ClienteYaVinculado as exc:
+                    return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
             elif cliente_email_data:
-                cliente_email = cliente_email_data
-                cliente_nombre = cliente_nombre_data or cliente_email_data
-
-            if cliente_email:
-                cliente, _ = Cliente.objects.get_or_create(
-                    email=cliente_email, defaults={"nombre": cliente_nombre or cliente_email}
+                cliente, _ = obtener_o_crear_cliente(
+                    cliente_email_data, cliente_nombre_data or cliente_email_data
                 )
             else:
-                cliente, _ = Cliente.objects.get_or_create(
-                    email="online@cliente", defaults={"nombre": "Cliente Online"}
-                )
+                cliente, _ = obtener_o_crear_cliente("online@cliente", "Cliente Online")
         # Sucursal genérica 1
         try:
             sucursal = Sucursal.objects.get(id=data.get("sucursal") or 1)
@@ -328,10 +361,13 @@ class ConfirmarPagoVenta(APIView):
         venta.estado = "completado"
         venta.save(update_fields=["estado_pago", "estado"])
 
-        # Intentar notificar al cliente si existe un usuario con ese email
+        # Intentar notificar al usuario enlazado al cliente (o con ese email)
         cliente_email = venta.cliente.email if venta.cliente else None
         if cliente_email:
-            usuario = Usuario.objects.filter(email=cliente_email).first()
+            usuario = (
+                Usuario.objects.filter(cliente_id=venta.cliente_id).first()
+                or Usuario.objects.filter(email=cliente_email).first()
+            )
             if usuario:
                 ok, detail = send_push_to_usuario(
                     usuario,
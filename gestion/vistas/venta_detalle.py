@@ -1,7 +1,13 @@
 from rest_framework import viewsets
-from gestion.models import VentaDetalle
+from gestion.models import VentaDetalle, ProductoVariante, Producto
 from gestion.serializadores.venta_detalle import VentaDetalleSerializer
+from gestion.vistas.mixins import CamposMixin, ETagMixin, FiltrosMixin, filtro_entero
 
-class VentaDetalleViewSet(viewsets.ModelViewSet):
-    queryset = VentaDetalle.objects.select_related('venta', 'producto_variante__producto').all()
+class VentaDetalleViewSet(FiltrosMixin, CamposMixin, ETagMixin, viewsets.ModelViewSet):
+    queryset = VentaDetalle.objects.select_related('producto_variante__producto').all()
     serializer_class = VentaDetalleSerializer
+    etag_modelos = (VentaDetalle, ProductoVariante, Producto)
+    filtros = {
+        'venta': ('venta_id', filtro_entero),
+        'producto_variante': ('producto_variante_id', filtro_entero),
+    }
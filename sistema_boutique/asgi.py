@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sistema_boutique.settings')
 
 application = get_asgi_application()
+
+# Solo en los workers web (gunicorn importa este módulo en cada worker)
+from gestion.services.push_notifications import precalentar_en_segundo_plano  # noqa: E402
+
+precalentar_en_segundo_plano()
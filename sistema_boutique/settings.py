@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Cargar variables de entorno desde .env (solo en desarrollo)
 try:
     from dotenv import load_dotenv
@@ -108,10 +110,36 @@ DATABASES = {
         'OPTIONS': {
             'sslmode': 'require',  # Requerido para Azure PostgreSQL
         },
-        'CONN_MAX_AGE': 60,  # Pooling de conexiones
+        'CONN_MAX_AGE': 60,  # Conexiones persistentes (sin pool)
+        # Verificar la conexión antes de reusarla (con pool: al sacarla del pool)
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pool nativo de psycopg 3 (Django 5.1+): cada worker mantiene conexiones abiertas
+# (con el handshake TLS ya hecho) que comparten sus requests y threads.
+# Requiere psycopg-pool: sin él se usa CONN_MAX_AGE si DB_POOL no está definida
+# (default) y es un error si se pidió DB_POOL=True explícitamente.
+DB_POOL = os.environ.get('DB_POOL', 'True').lower() in ('1', 'true', 'yes')
+if DB_POOL:
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        if 'DB_POOL' in os.environ:
+            raise ImproperlyConfigured("DB_POOL=True requiere psycopg-pool: pip install 'psycopg[pool]'")
+        DB_POOL = False
+if DB_POOL:
+    DATABASES['default']['CONN_MAX_AGE'] = 0  # el pool administra la vida de las conexiones
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '8')),
+        # Segundos que un request espera una conexión libre antes de fallar
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        # Cerrar conexiones ociosas antes de que las corte el balanceador de Azure
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '180')),
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+    }
+
 # NOTA IMPORTANTE: Las credenciales (PASSWORD) NUNCA deben estar hardcodeadas.
 # En producción, configura estas variables de entorno en Azure Portal:
 # - PGDATABASE=ecommerce
@@ -178,4 +206,102 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 # Media (subida de imágenes en entorno de desarrollo)
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Django REST Framework
+# Paginación por cursor en todos los ViewSets (orden estable, sin COUNT(*) ni OFFSET)
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '50'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '500'))
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'gestion.paginacion.CursorPaginacion',
+    'PAGE_SIZE': API_PAGE_SIZE,
+    # JSON con orjson (ver gestion/renderizadores.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'gestion.renderizadores.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'gestion.renderizadores.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Imágenes de producto: anchos de miniaturas (px) y threads que las generan en segundo plano
+IMAGEN_ANCHOS_MINIATURAS = (160, 480, 960)
+IMAGEN_WORKERS = int(os.environ.get('IMAGEN_WORKERS', '2'))
+
+# Subidas de imágenes: tamaño máximo por imagen y por chunk (subida reanudable),
+# carpeta de subidas parciales y segundos antes de descartar una subida abandonada
+IMAGEN_MAX_BYTES = int(os.environ.get('IMAGEN_MAX_BYTES', str(15 * 1024 * 1024)))
+IMAGEN_CHUNK_MAX_BYTES = int(os.environ.get('IMAGEN_CHUNK_MAX_BYTES', str(1024 * 1024)))
+IMAGEN_UPLOAD_DIR = os.environ.get('IMAGEN_UPLOAD_DIR', str(BASE_DIR / 'uploads_parciales'))
+IMAGEN_UPLOAD_TTL = int(os.environ.get('IMAGEN_UPLOAD_TTL', str(24 * 60 * 60)))
+
+# Importación masiva (CSV): filas por INSERT en bulk_create
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '2000'))
+
+# Sync incremental (/sync/): cambios por respuesta y margen (s) antes de avanzar el cursor
+SYNC_LIMITE = int(os.environ.get('SYNC_LIMITE', '5000'))
+SYNC_MARGEN_SEGUNDOS = int(os.environ.get('SYNC_MARGEN_SEGUNDOS', '10'))
+
+# Notificaciones push: threads que envían lotes de 500 tokens a FCM en paralelo
+PUSH_WORKERS = int(os.environ.get('PUSH_WORKERS', '8'))
+# Campañas (envíos masivos) que corren a la vez en segundo plano
+PUSH_CAMPANAS_WORKERS = int(os.environ.get('PUSH_CAMPANAS_WORKERS', '2'))
+# Minutos sin progreso tras los que una campaña "enviando" se da por interrumpida (recuperar_campanas)
+CAMPANAS_TIMEOUT_MINUTOS = int(os.environ.get('CAMPANAS_TIMEOUT_MINUTOS', '15'))
+# Importar e inicializar Firebase al arrancar cada worker web, desde wsgi.py/asgi.py (en vez de en el primer envío)
+PUSH_PRECALENTAR = os.environ.get('PUSH_PRECALENTAR', 'False').lower() in ('1', 'true', 'yes')
+# Si Firebase no se pudo inicializar se reintenta con espera exponencial (segundos, mínima y máxima)
+PUSH_FIREBASE_REINTENTO = float(os.environ.get('PUSH_FIREBASE_REINTENTO', '5'))
+PUSH_FIREBASE_REINTENTO_MAX = float(os.environ.get('PUSH_FIREBASE_REINTENTO_MAX', '300'))
+# Transporte de push (ruta a la clase). Para pruebas de carga sin FCM:
+# 'gestion.services.push_local.TransporteLocal', configurable con PUSH_LOCAL_*
+PUSH_TRANSPORTE = os.environ.get('PUSH_TRANSPORTE', 'gestion.services.push_notifications.TransporteFCM')
+PUSH_LOCAL_LATENCIA_MS = float(os.environ.get('PUSH_LOCAL_LATENCIA_MS', '50'))
+PUSH_LOCAL_LATENCIA_TOKEN_MS = float(os.environ.get('PUSH_LOCAL_LATENCIA_TOKEN_MS', '0.2'))
+PUSH_LOCAL_TASA_INVALIDOS = float(os.environ.get('PUSH_LOCAL_TASA_INVALIDOS', '0.02'))
+PUSH_LOCAL_TASA_ERRORES = float(os.environ.get('PUSH_LOCAL_TASA_ERRORES', '0.001'))
+
+# Cache: 'locmem' (tests, un solo proceso), 'file' (un host: compartido entre los workers)
+# o 'redis' (varias instancias; requiere el paquete redis). Con REDIS_URL el default es redis.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if os.environ.get('REDIS_URL') else 'file')
+if CACHE_BACKEND == 'redis':
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        CACHE_BACKEND = 'file'
+_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sistema-boutique',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '5000'))},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    },
+}
+CACHES = {
+    'default': {
+        **_CACHE_BACKENDS[CACHE_BACKEND],
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', '300')),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'boutique'),
+    },
+}
+# Segundos que un request espera a que otro termine de calcular el mismo valor (single-flight)
+CACHE_SINGLE_FLIGHT_ESPERA = float(os.environ.get('CACHE_SINGLE_FLIGHT_ESPERA', '10'))
+# Vida máxima de una entrada de datos (las de versiones viejas quedan huérfanas hasta expirar)
+CACHE_TIMEOUT_MAXIMO = int(os.environ.get('CACHE_TIMEOUT_MAXIMO', str(60 * 60 * 24)))
+# Reportes (/reportes/...): cacheados por parámetros y versión de las tablas
+REPORTES_CACHE_TIMEOUT = int(os.environ.get('REPORTES_CACHE_TIMEOUT', '300'))
+
+# Despliegue ASGI (startup.sh con SERVIDOR=asgi): servir las variantes async (ORM async)
+# de auth/me, notificaciones/enviar y los reportes JSON
+VISTAS_ASYNC = os.environ.get('VISTAS_ASYNC', 'False').lower() in ('1', 'true', 'yes')
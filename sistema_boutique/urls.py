@@ -3,10 +3,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from gestion.vistas.upload import servir_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('gestion.urls')),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.MEDIA_URL, view=servir_media, document_root=settings.MEDIA_ROOT)
@@ -4,10 +4,20 @@
 # Aplicar migraciones
 python manage.py migrate --noinput
 
+# Campañas push que quedaron a medias por un reinicio (en segundo plano: no demora el arranque)
+python manage.py recuperar_campanas &
+
 # Recopilar archivos estáticos (si los hay)
 python manage.py collectstatic --noinput || true
 
 # Iniciar Gunicorn
 # Azure usa la variable PORT automáticamente
+# SERVIDOR=asgi: workers uvicorn (un event loop por worker) y vistas async; las vistas
+# sync corren en threads, así un envío o reporte lento no ocupa el worker entero
+if [ "${SERVIDOR:-wsgi}" = "asgi" ]; then
+    export VISTAS_ASYNC=${VISTAS_ASYNC:-True}
+    exec gunicorn sistema_boutique.asgi:application -k uvicorn.workers.UvicornWorker \
+        --bind 0.0.0.0:${PORT:-8000} --workers ${WEB_CONCURRENCY:-2} --timeout 120
+fi
 gunicorn sistema_boutique.wsgi --bind 0.0.0.0:${PORT:-8000} --workers 2 --timeout 120
 